@@ -0,0 +1,292 @@
+"""gRPC 压测工具：python -m user_srv.bench
+
+按权重混合调用各个 RPC，结果以 JSON 输出每个方法的吞吐和 p50/p95/p99/max 延迟。
+压测前会用 CreateUsers 写入一批自己的用户，读请求只访问这批用户，不依赖库里已有的数据。
+
+    # 压一个已经启动的服务（背后是本地 MySQL）
+    python -m user_srv.bench --target 127.0.0.1:50051 --concurrency 64 --duration 30
+    # 固定 500 QPS，不指定 --qps 时是闭环压测：每个并发发完一个请求立即发下一个
+    python -m user_srv.bench --qps 500 --mix GetUserById=60,GetUserByMobile=20,CheckPassword=20
+    # 不需要 MySQL：在本进程内启动服务，User 表放在临时目录的 sqlite 里
+    python -m user_srv.bench --in-process
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import grpc
+from google.protobuf import field_mask_pb2
+
+from user_srv.proto import user_pb2, user_pb2_grpc
+
+DEFAULT_MIX = "GetUserById=40,GetUserByMobile=20,GetUserList=10,CreateUser=5,UpdateUser=10,CheckPassword=15"
+BENCH_PASSWORD = "bench123456"
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(text):
+    """"GetUserById=40,GetUserList=10" -> {方法名: 权重}，未知方法或非正权重抛 ValueError"""
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in CALLS:
+            raise ValueError(f"unknown method {name!r}, choose from {', '.join(CALLS)}")
+        mix[name] = float(weight or 1)
+        if mix[name] <= 0:
+            raise ValueError(f"weight of {name} must be positive")
+    return mix
+
+
+def percentile(sorted_values, p):
+    """最近秩法，与 Prometheus/HdrHistogram 的口径一致：不插值，返回某个真实样本"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class MethodStats:
+    """一个方法的延迟样本和按状态码统计的请求数"""
+
+    def __init__(self):
+        self.latencies = []
+        self.codes = {}
+
+    def add(self, seconds, code):
+        self.latencies.append(seconds)
+        self.codes[code] = self.codes.get(code, 0) + 1
+
+    def report(self, elapsed):
+        values = sorted(self.latencies)
+        count = len(values)
+        report = {
+            "count": count,
+            "errors": count - self.codes.get("OK", 0),
+            "codes": self.codes,
+            "qps": round(count / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(sum(values) / count * 1000, 3) if count else 0.0,
+        }
+        for p in PERCENTILES:
+            report[f"p{p}_ms"] = round(percentile(values, p) * 1000, 3)
+        report["max_ms"] = round(values[-1] * 1000, 3) if values else 0.0
+        return report
+
+
+class Workload:
+    """为每个方法构造请求；读请求随机访问 seed 阶段写入的用户"""
+
+    def __init__(self, users, run):
+        self.users = users  # [(id, mobile)]
+        self.run = run
+        self.created = len(users)
+
+    def new_mobile(self):
+        # 16 + 4 位批次号 + 序号，同一批次内不会重复，不同批次极少冲突
+        self.created += 1
+        return f"16{self.run:04d}{self.created:05d}"
+
+    def create_info(self, mobile):
+        return user_pb2.CreateUserInfo(nickName=f"bench{self.run}", passWord=BENCH_PASSWORD, mobile=mobile)
+
+    async def seed(self, stub, n):
+        """用 CreateUsers 流式写入 n 个用户，返回 [(id, mobile)]"""
+        mobiles = [f"16{self.run:04d}{i:05d}" for i in range(n)]
+        rsp = await stub.CreateUsers(iter(self.create_info(mobile) for mobile in mobiles))
+        self.users.extend((result.id, result.mobile) for result in rsp.results if result.created)
+        self.created = max(self.created, n)
+        return rsp
+
+
+async def call_get_user_by_id(stub, workload, rnd):
+    await stub.GetUserById(user_pb2.IdRequest(id=rnd.choice(workload.users)[0]))
+
+
+async def call_get_user_by_mobile(stub, workload, rnd):
+    await stub.GetUserByMobile(user_pb2.MobileRequest(mobile=rnd.choice(workload.users)[1]))
+
+
+async def call_get_user_list(stub, workload, rnd):
+    pages = max(1, len(workload.users) // 10)
+    await stub.GetUserList(user_pb2.PageInfo(pn=rnd.randint(1, pages), pSize=10))
+
+
+async def call_create_user(stub, workload, rnd):
+    await stub.CreateUser(workload.create_info(workload.new_mobile()))
+
+
+async def call_update_user(stub, workload, rnd):
+    await stub.UpdateUser(user_pb2.UpdateUserInfo(
+        id=rnd.choice(workload.users)[0], nickName=f"bench{rnd.randint(0, 9999)}",
+        updateMask=field_mask_pb2.FieldMask(paths=["nickName"])))
+
+
+async def call_check_password(stub, workload, rnd):
+    await stub.CheckPassword(user_pb2.PasswordCheckInfo(mobile=rnd.choice(workload.users)[1], passWord=BENCH_PASSWORD))
+
+
+CALLS = {
+    "GetUserById": call_get_user_by_id,
+    "GetUserByMobile": call_get_user_by_mobile,
+    "GetUserList": call_get_user_list,
+    "CreateUser": call_create_user,
+    "UpdateUser": call_update_user,
+    "CheckPassword": call_check_password,
+}
+
+
+def open_channels(target, n):
+    # 每个 channel 用独立的 subchannel 池，否则同一个 target 的多个 channel 会共用一条 TCP 连接
+    options = [("grpc.use_local_subchannel_pool", 1)]
+    return [grpc.aio.insecure_channel(target, options=options) for _ in range(n)]
+
+
+async def run_load(stubs, workload, mix, args):
+    """启动 concurrency 个协程发请求，返回 ({方法名: MethodStats}, 统计时长)
+
+    指定 qps 时按固定节奏排好每个请求的计划发送时间，延迟从计划时间算起，
+    服务端变慢导致的排队也会体现在延迟里，不会因为客户端跟着变慢而被掩盖。
+    warmup 秒内的请求不计入结果。
+    """
+    names, weights = list(mix), list(mix.values())
+    stats = {name: MethodStats() for name in names}
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    measure_from = start + args.warmup
+    end = measure_from + args.duration
+    sent = 0
+
+    async def worker(k):
+        nonlocal sent
+        stub = stubs[k % len(stubs)]
+        rnd = random.Random(args.seed * 100003 + k)
+        while True:
+            if args.qps:
+                planned = start + sent / args.qps
+                sent += 1
+                if planned >= end:
+                    return
+                if planned > loop.time():
+                    await asyncio.sleep(planned - loop.time())
+            else:
+                planned = loop.time()
+                if planned >= end:
+                    return
+            name = rnd.choices(names, weights)[0]
+            code = "OK"
+            try:
+                await CALLS[name](stub, workload, rnd)
+            except grpc.aio.AioRpcError as e:
+                code = e.code().name
+            if planned >= measure_from:
+                stats[name].add(loop.time() - planned, code)
+
+    await asyncio.gather(*(worker(k) for k in range(args.concurrency)))
+    return stats, max(loop.time(), end) - measure_from
+
+
+def start_in_process(db_path):
+    """在本进程里启动同步服务，User 绑定到 sqlite，代替本地 MySQL，返回 (server, 端口, hasher)"""
+    from concurrent import futures
+
+    from peewee import SqliteDatabase
+
+    from user_srv.common.hasher import PasswordHasher
+    from user_srv.handler.user import UserServicer
+    from user_srv.model.models import User
+
+    db = SqliteDatabase(db_path, pragmas={"journal_mode": "wal"}, timeout=30, check_same_thread=False)
+    User.bind(db)
+    db.create_tables([User])
+    hasher = PasswordHasher()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    user_pb2_grpc.add_UserServicer_to_server(UserServicer(hasher=hasher), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    return server, port, hasher
+
+
+async def bench(args, mix):
+    run = args.seed % 10000
+    channels = open_channels(args.target, args.channels)
+    stubs = [user_pb2_grpc.UserStub(channel) for channel in channels]
+    try:
+        workload = Workload([], run)
+        seeded = time.perf_counter()
+        rsp = await workload.seed(stubs[0], args.seed_users)
+        seeded = time.perf_counter() - seeded
+        if not workload.users:
+            raise RuntimeError(f"seeding created no users ({rsp.failed} failed), try another --seed")
+        print(f"seeded {rsp.created} users ({rsp.failed} failed) in {seeded:.1f}s", file=sys.stderr)
+
+        stats, elapsed = await run_load(stubs, workload, mix, args)
+    finally:
+        for channel in channels:
+            await channel.close()
+
+    methods = {name: s.report(elapsed) for name, s in stats.items()}
+    total = MethodStats()
+    for s in stats.values():
+        for code, n in s.codes.items():
+            total.codes[code] = total.codes.get(code, 0) + n
+        total.latencies.extend(s.latencies)
+    return {
+        "config": {
+            "target": args.target, "in_process": args.in_process, "channels": args.channels,
+            "concurrency": args.concurrency, "qps": args.qps, "duration": args.duration,
+            "warmup": args.warmup, "mix": mix, "seed": args.seed, "seed_users": len(workload.users),
+        },
+        "elapsed": round(elapsed, 3),
+        "total": total.report(elapsed),
+        "methods": methods,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="load test the user service and report latency percentiles as JSON")
+    parser.add_argument('--target', type=str, default='127.0.0.1:50051', help='host:port of a running server')
+    parser.add_argument('--in-process', action='store_true', help='start a server in this process backed by sqlite instead of using --target')
+    parser.add_argument('--channels', type=int, default=4, help='gRPC channels (TCP connections) to open')
+    parser.add_argument('--concurrency', type=int, default=32, help='requests in flight at most')
+    parser.add_argument('--qps', type=float, default=0, help='target request rate, 0 for closed loop (as fast as --concurrency allows)')
+    parser.add_argument('--duration', type=float, default=10, help='seconds to measure')
+    parser.add_argument('--warmup', type=float, default=2, help='seconds to run before measuring')
+    parser.add_argument('--mix', type=str, default=DEFAULT_MIX, help='comma separated Method=weight')
+    parser.add_argument('--seed-users', type=int, default=1000, help='users created before the run for reads to hit')
+    parser.add_argument('--seed', type=int, default=None, help='random seed, also picks the mobile prefix of seeded users')
+    parser.add_argument('--output', type=str, default='-', help='write the JSON report to this file, - for stdout')
+    args = parser.parse_args()
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.seed is None:
+        args.seed = random.randrange(10000)
+
+    server = hasher = tmpdir = None
+    if args.in_process:
+        import tempfile
+
+        tmpdir = tempfile.TemporaryDirectory(prefix="user_srv_bench_")
+        server, port, hasher = start_in_process(f"{tmpdir.name}/bench.db")
+        args.target = f"127.0.0.1:{port}"
+    try:
+        report = asyncio.run(bench(args, mix))
+    finally:
+        if server is not None:
+            server.stop(None)
+            hasher.shutdown(wait=False)
+            tmpdir.cleanup()
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""RPC 访问日志和异常日志，取代 handler 上的 logger.catch
+
+- 正常结束的 RPC 按方法采样记一行（方法、状态码、耗时），默认不记；
+- handler 抛出的异常按（方法、异常类型、抛出位置）限流，同一个异常每 LOG_ERROR_INTERVAL 秒只记一次
+  完整堆栈，其余只计数，下次记录时带上被省略的次数。数据库故障时每个请求都抛同样的异常，
+  不限流的话格式化堆栈和写盘会拖慢恢复。
+"""
+import random
+import time
+
+import grpc
+from loguru import logger
+
+from user_srv.common.interceptors import (
+    AsyncHookInterceptor,
+    HookInterceptor,
+    status_code,
+)
+
+
+def error_key(method, error):
+    """方法、异常类型和最内层的抛出位置；异常消息里常带着 id、手机号，不作为 key"""
+    tb = error.__traceback__
+    while tb is not None and tb.tb_next is not None:
+        tb = tb.tb_next
+    where = f"{tb.tb_frame.f_code.co_filename}:{tb.tb_lineno}" if tb else ""
+    return method, type(error).__name__, where
+
+
+def unknown_details(error):
+    # 与 gRPC 默认的 "Exception calling application" 一致，但不带异常消息
+    return f"Exception calling application: {type(error).__name__}"
+
+
+class _AccessLogHooks:
+    """rates 是 {方法: 采样率}，"*" 是其余方法的采样率；errors 是 log.RepeatLimiter"""
+
+    def __init__(self, rates, errors):
+        self.rates = rates
+        self.default_rate = rates.get("*", 0.0)
+        self.errors = errors
+
+    def begin(self, method, context):
+        return time.perf_counter()
+
+    def end(self, method, context, start, failed, cancelled):
+        rate = self.rates.get(method, self.default_rate)
+        if rate <= 0 or random.random() >= rate:
+            return
+        code = status_code(context, failed, cancelled)
+        if code == grpc.StatusCode.UNKNOWN:
+            # 异常已经由 error 限流记录
+            return
+        ms = (time.perf_counter() - start) * 1000
+        logger.bind(rpc=method, code=code.name, ms=round(ms, 2)).info(f"{method} {code.name} {ms:.1f}ms")
+
+    def error(self, method, start, error):
+        allowed, suppressed = self.errors.allow(error_key(method, error))
+        if not allowed:
+            return
+        ms = (time.perf_counter() - start) * 1000
+        repeats = f" ({suppressed} more in the last {self.errors.interval:g}s)" if suppressed else ""
+        logger.bind(rpc=method, code=grpc.StatusCode.UNKNOWN.name, ms=round(ms, 2), suppressed=suppressed) \
+            .opt(exception=error).error(f"{method} raised {type(error).__name__}: {error}{repeats}")
+
+
+class AccessLogInterceptor(_AccessLogHooks, HookInterceptor):
+    """放在拦截器列表最前面：里层拦截器已经设置了状态码的异常（context.abort）原样抛出"""
+
+    def _unary(self, behavior, method):
+        def wrapper(request, context):
+            start, response = self.begin(method, context), None
+            try:
+                response = behavior(request, context)
+                return response
+            except Exception as e:
+                if context.code() is not None:
+                    raise
+                self.error(method, start, e)
+                context.abort(grpc.StatusCode.UNKNOWN, unknown_details(e))
+            finally:
+                self.end(method, context, start, response is None, False)
+        return wrapper
+
+    def _stream(self, behavior, method):
+        def wrapper(request, context):
+            start, failed, cancelled = self.begin(method, context), True, False
+            try:
+                yield from behavior(request, context)
+                failed = False
+            except GeneratorExit:
+                cancelled = True
+                raise
+            except Exception as e:
+                if context.code() is not None:
+                    raise
+                self.error(method, start, e)
+                context.abort(grpc.StatusCode.UNKNOWN, unknown_details(e))
+            finally:
+                self.end(method, context, start, failed, cancelled)
+        return wrapper
+
+
+class AsyncAccessLogInterceptor(_AccessLogHooks, AsyncHookInterceptor):
+
+    def _unary(self, behavior, method):
+        async def wrapper(request, context):
+            start, response = self.begin(method, context), None
+            try:
+                response = await behavior(request, context)
+                return response
+            except Exception as e:
+                if context.code() is not None:
+                    raise
+                self.error(method, start, e)
+                await context.abort(grpc.StatusCode.UNKNOWN, unknown_details(e))
+            finally:
+                self.end(method, context, start, response is None, False)
+        return wrapper
+
+    def _stream(self, behavior, method):
+        async def wrapper(request, context):
+            start, failed, cancelled = self.begin(method, context), True, False
+            try:
+                async for response in behavior(request, context):
+                    yield response
+                failed = False
+            except GeneratorExit:
+                cancelled = True
+                raise
+            except Exception as e:
+                if context.code() is not None:
+                    raise
+                self.error(method, start, e)
+                await context.abort(grpc.StatusCode.UNKNOWN, unknown_details(e))
+            finally:
+                self.end(method, context, start, failed, cancelled)
+        return wrapper
@@ -0,0 +1,210 @@
+"""准入控制：过载时直接拒绝多出来的请求，不让它们在队列里越排越长
+
+- 整个服务已接收（执行中 + 排队）的 RPC 超过 workers + queue 时，立即返回 RESOURCE_EXHAUSTED，
+  客户端可以马上换个实例重试；
+- ADMISSION_LIMITS 里列出的方法最多 concurrency 个同时执行，另外最多 queue 个排队等名额，
+  再多的返回 RESOURCE_EXHAUSTED；
+- 开始执行前检查截止时间，已经过了或剩余不到 min_deadline_ms 的请求返回 DEADLINE_EXCEEDED，
+  不再为已经没人等的请求查库。
+
+同步模式下整个服务的上限交给 grpc.server 的 maximum_concurrent_rpcs：gRPC 在轮询线程里直接拒绝，
+不占工作线程也不用排队等线程空出来，RPC 在线程池里排队时被取消或超时也会按时还回名额。
+这样拒绝的请求不经过拦截器，不计入 user_srv_rpc_shed_total，健康检查也算在这个上限里。
+方法名额在 handler 开始时计数（结束时一定走到 finally），等名额时占着工作线程，
+所以慢方法的 concurrency + queue 应小于 --threads，给其他方法留出线程。
+健康检查不受方法名额和截止时间的限制。
+"""
+import asyncio
+import threading
+
+import grpc
+
+from user_srv.common import metrics
+from user_srv.common.interceptors import method_name
+
+RPC_SHED = metrics.counter(
+    "user_srv_rpc_shed_total", "RPCs rejected before running, by method and reason (queue_full / deadline)",
+    ["method", "reason"])
+
+EXEMPT_SERVICES = ("/grpc.health.v1.Health/",)
+
+
+class _Slots:
+    """一个方法的名额：最多 concurrency 个同时执行，另外最多 queue 个排队"""
+
+    __slots__ = ("admitted", "capacity", "semaphore")
+
+    def __init__(self, concurrency, queue, semaphore):
+        self.capacity = concurrency + queue
+        self.admitted = 0  # 已开始还没结束的请求，包括等名额的
+        self.semaphore = semaphore(concurrency)
+
+
+class _AdmissionHooks:
+    """capacity 是整个服务的名额，None 表示不在这里限制；limits 是 {方法: (concurrency, queue)}"""
+
+    semaphore = None
+
+    def __init__(self, capacity, limits, min_deadline_ms):
+        self.capacity = capacity
+        self.admitted = 0
+        self.methods = {method: _Slots(concurrency, queue, self.semaphore)
+                        for method, (concurrency, queue) in limits.items()}
+        self.min_deadline = min_deadline_ms / 1000
+        self._lock = threading.Lock()
+
+    def admit(self, slots):
+        """handler 开始时占一个名额，返回是否占到"""
+        with self._lock:
+            if self.capacity is not None and self.admitted >= self.capacity:
+                return False
+            if slots and slots.admitted >= slots.capacity:
+                return False
+            self.admitted += 1
+            if slots:
+                slots.admitted += 1
+        return True
+
+    def release(self, slots):
+        with self._lock:
+            self.admitted -= 1
+            if slots:
+                slots.admitted -= 1
+
+    def budget(self, context):
+        """还能用来排队的秒数：剩余的截止时间减去 min_deadline，None 表示客户端没有设截止时间"""
+        remaining = context.time_remaining()
+        # 同步版没有截止时间时返回一个约 2^63 秒的数，直接传给 acquire(timeout) 会溢出
+        if remaining is None or remaining >= threading.TIMEOUT_MAX:
+            return None
+        return remaining - self.min_deadline
+
+    def shed(self, method, reason):
+        RPC_SHED.inc(method=method, reason=reason)
+        if reason == "queue_full":
+            return grpc.StatusCode.RESOURCE_EXHAUSTED, f"{method} is overloaded, retry later"
+        return grpc.StatusCode.DEADLINE_EXCEEDED, f"not enough time left to run {method}"
+
+    def _exempt(self, handler_call_details):
+        return handler_call_details.method.startswith(EXEMPT_SERVICES)
+
+    def _admitted(self, handler, method, slots):
+        if handler.unary_unary:
+            return handler._replace(unary_unary=self._unary(handler.unary_unary, method, slots))
+        if handler.stream_unary:
+            return handler._replace(stream_unary=self._unary(handler.stream_unary, method, slots))
+        if handler.unary_stream:
+            return handler._replace(unary_stream=self._stream(handler.unary_stream, method, slots))
+        return handler._replace(stream_stream=self._stream(handler.stream_stream, method, slots))
+
+
+class AdmissionInterceptor(_AdmissionHooks, grpc.ServerInterceptor):
+    """整个服务的上限由 grpc.server(maximum_concurrent_rpcs=) 负责，这里只管方法名额和截止时间"""
+
+    semaphore = threading.Semaphore
+
+    def __init__(self, limits, min_deadline_ms):
+        super().__init__(None, limits, min_deadline_ms)
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None or self._exempt(handler_call_details):
+            return handler
+        method = method_name(handler_call_details)
+        return self._admitted(handler, method, self.methods.get(method))
+
+    def _start(self, method, slots, context):
+        """开始执行前占名额、检查截止时间，需要时等方法名额；返回是否拿到了方法名额"""
+        budget = self.budget(context)
+        if budget is not None and budget <= 0:
+            context.abort(*self.shed(method, "deadline"))
+        if slots is None:
+            return False
+        if not slots.semaphore.acquire(timeout=budget):
+            context.abort(*self.shed(method, "deadline"))
+        return True
+
+    def _unary(self, behavior, method, slots):
+        def wrapper(request, context):
+            if not self.admit(slots):
+                context.abort(*self.shed(method, "queue_full"))
+            acquired = False
+            try:
+                acquired = self._start(method, slots, context)
+                return behavior(request, context)
+            finally:
+                if acquired:
+                    slots.semaphore.release()
+                self.release(slots)
+        return wrapper
+
+    def _stream(self, behavior, method, slots):
+        def wrapper(request, context):
+            if not self.admit(slots):
+                context.abort(*self.shed(method, "queue_full"))
+            acquired = False
+            try:
+                acquired = self._start(method, slots, context)
+                yield from behavior(request, context)
+            finally:
+                if acquired:
+                    slots.semaphore.release()
+                self.release(slots)
+        return wrapper
+
+
+class AsyncAdmissionInterceptor(_AdmissionHooks, grpc.aio.ServerInterceptor):
+    """没有工作线程池，接收的 RPC 马上就开始执行，整个服务的名额也在 handler 开始时计数"""
+
+    semaphore = asyncio.Semaphore
+
+    def __init__(self, workers, queue, limits, min_deadline_ms):
+        super().__init__(workers + queue, limits, min_deadline_ms)
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None or self._exempt(handler_call_details):
+            return handler
+        method = method_name(handler_call_details)
+        return self._admitted(handler, method, self.methods.get(method))
+
+    async def _start(self, method, slots, context):
+        budget = self.budget(context)
+        if budget is not None and budget <= 0:
+            await context.abort(*self.shed(method, "deadline"))
+        if slots is None:
+            return False
+        try:
+            await asyncio.wait_for(slots.semaphore.acquire(), budget)
+        except TimeoutError:
+            await context.abort(*self.shed(method, "deadline"))
+        return True
+
+    def _unary(self, behavior, method, slots):
+        async def wrapper(request, context):
+            if not self.admit(slots):
+                await context.abort(*self.shed(method, "queue_full"))
+            acquired = False
+            try:
+                acquired = await self._start(method, slots, context)
+                return await behavior(request, context)
+            finally:
+                if acquired:
+                    slots.semaphore.release()
+                self.release(slots)
+        return wrapper
+
+    def _stream(self, behavior, method, slots):
+        async def wrapper(request, context):
+            if not self.admit(slots):
+                await context.abort(*self.shed(method, "queue_full"))
+            acquired = False
+            try:
+                acquired = await self._start(method, slots, context)
+                async for response in behavior(request, context):
+                    yield response
+            finally:
+                if acquired:
+                    slots.semaphore.release()
+                self.release(slots)
+        return wrapper
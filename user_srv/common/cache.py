@@ -0,0 +1,281 @@
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from user_srv.common import metrics
+
+CACHE_HITS = metrics.counter("user_srv_user_cache_hits_total", "User cache hits", ["tier"])
+CACHE_MISSES = metrics.counter("user_srv_user_cache_misses_total", "User cache misses", ["tier"])
+CACHE_EVICTIONS = metrics.counter("user_srv_user_cache_evictions_total", "User cache entries evicted for space or TTL", ["tier"])
+CACHE_BYTES = metrics.gauge("user_srv_user_cache_bytes", "Estimated memory held by the in-process user cache")
+CACHE_ENTRIES = metrics.gauge("user_srv_user_cache_entries", "Users held by the in-process user cache")
+
+# OrderedDict 节点 + mobile 索引项的大致开销
+_ENTRY_OVERHEAD = 200
+
+
+class CachedUser:
+    """缓存里存放的用户记录，只保留 convUserToRsp 用到的字段"""
+
+    __slots__ = ("birthday", "gender", "id", "mobile", "nick_name", "role")
+
+    def __init__(self, id, mobile, role, nick_name, gender, birthday):
+        self.id = id
+        self.mobile = mobile
+        self.role = role
+        self.nick_name = nick_name
+        self.gender = gender
+        self.birthday = birthday
+
+    @classmethod
+    def from_model(cls, user):
+        return cls(user.id, user.mobile, user.role, user.nick_name, user.gender, user.birthday)
+
+    def size(self):
+        return sys.getsizeof(self) + sum(sys.getsizeof(getattr(self, name)) for name in self.__slots__)
+
+
+class UserCache(ABC):
+    """用户缓存接口
+
+    get_by_id / get_by_mobile / put / invalidate 是各层缓存都要实现的基本操作，
+    load_by_id / load_by_mobile 在未命中时调用 loader 查库（返回 User 或 None）并回填。
+    """
+
+    tier = ""
+    version = 0
+
+    @abstractmethod
+    def get_by_id(self, user_id):
+        """返回 CachedUser，未命中返回 None"""
+
+    @abstractmethod
+    def get_by_mobile(self, mobile):
+        """返回 CachedUser，未命中返回 None"""
+
+    @abstractmethod
+    def put(self, user, version=None):
+        """缓存一个用户（peewee User 或 CachedUser），返回 CachedUser；version 是查库前取的 self.version"""
+
+    @abstractmethod
+    def invalidate(self, user_id=None, mobile=None):
+        """写库之后调用，删掉这个用户按 id 和 mobile 缓存的记录"""
+
+    def stats(self):
+        return {}
+
+    def _load(self, user, loader):
+        if user is not None:
+            return user
+        version = self.version
+        user = loader()
+        if user is None:
+            return None
+        return self.put(user, version)
+
+    def load_by_id(self, user_id, loader):
+        return self._load(self.get_by_id(user_id), loader)
+
+    def load_by_mobile(self, mobile, loader):
+        return self._load(self.get_by_mobile(mobile), loader)
+
+    def get_many_by_id(self, user_ids):
+        """批量读取，返回 {id: CachedUser}，只包含命中的键"""
+        users = ((user_id, self.get_by_id(user_id)) for user_id in user_ids)
+        return {user_id: user for user_id, user in users if user is not None}
+
+    def get_many_by_mobile(self, mobiles):
+        users = ((mobile, self.get_by_mobile(mobile)) for mobile in mobiles)
+        return {mobile: user for mobile, user in users if user is not None}
+
+    def put_many(self, users, version=None):
+        return [self.put(user, version) for user in users]
+
+
+class LocalUserCache(UserCache):
+    """进程内的用户缓存，按 id 和 mobile 两个键读取，LRU + TTL 淘汰
+
+    max_bytes 是缓存记录的估算内存上限，为 0 时不缓存。
+    读穿透时先取 version，查库后再 put：期间这个用户的 id 或 mobile 被失效过的话，这次 put 会被丢弃，
+    避免把更新前读到的旧数据写回缓存；其他用户的写不影响这次回填。
+    """
+
+    tier = "local"
+
+    # 最多记住最近这么多个被失效的键，更早的只记一个下限
+    MAX_INVALIDATIONS = 10000
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=60):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # id -> (CachedUser, 过期时间, 估算大小)
+        self._mobiles = {}  # mobile -> id
+        self._bytes = 0
+        self._sequence = 0  # 每次失效加一
+        self._invalidated = OrderedDict()  # ("id", id) / ("mobile", mobile) -> 最近一次失效的序号
+        self._floor = 0  # 已经忘掉的失效记录里最大的序号
+        CACHE_BYTES.set_function(lambda: self._bytes)
+        CACHE_ENTRIES.set_function(lambda: len(self._entries))
+
+    @property
+    def version(self):
+        return self._sequence
+
+    def _stale(self, user, version):
+        """version 之后 user 的 id 或 mobile 被失效过"""
+        if version < self._floor:
+            return True
+        return any(self._invalidated.get(key, 0) > version for key in (("id", user.id), ("mobile", user.mobile)))
+
+    def _invalidate_key(self, key):
+        self._invalidated.pop(key, None)
+        self._invalidated[key] = self._sequence
+        if len(self._invalidated) > self.MAX_INVALIDATIONS:
+            _, self._floor = self._invalidated.popitem(last=False)
+
+    def _drop(self, user_id):
+        user, _, size = self._entries.pop(user_id)
+        self._mobiles.pop(user.mobile, None)
+        self._bytes -= size
+
+    def _lookup(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            self._drop(user_id)
+            CACHE_EVICTIONS.inc(tier=self.tier)
+            return None
+        self._entries.move_to_end(user_id)
+        return entry[0]
+
+    def _result(self, user):
+        if user is None:
+            CACHE_MISSES.inc(tier=self.tier)
+        else:
+            CACHE_HITS.inc(tier=self.tier)
+        return user
+
+    def get_by_id(self, user_id):
+        with self._lock:
+            user = self._lookup(user_id)
+        return self._result(user)
+
+    def get_by_mobile(self, mobile):
+        with self._lock:
+            user_id = self._mobiles.get(mobile)
+            user = self._lookup(user_id) if user_id is not None else None
+        return self._result(user)
+
+    def put(self, user, version=None):
+        """缓存一个用户（peewee User 或 CachedUser），返回缓存用的 CachedUser"""
+        if not isinstance(user, CachedUser):
+            user = CachedUser.from_model(user)
+        if not self.max_bytes:
+            return user
+        size = user.size() + _ENTRY_OVERHEAD
+        with self._lock:
+            if version is not None and self._stale(user, version):
+                return user
+            if user.id in self._entries:
+                self._drop(user.id)
+            self._entries[user.id] = (user, time.monotonic() + self.ttl, size)
+            self._mobiles[user.mobile] = user.id
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                CACHE_EVICTIONS.inc(tier=self.tier)
+        return user
+
+    def invalidate(self, user_id=None, mobile=None):
+        with self._lock:
+            self._sequence += 1
+            if mobile is not None and user_id is None:
+                user_id = self._mobiles.get(mobile)
+            if user_id is not None and user_id in self._entries:
+                mobile = self._entries[user_id][0].mobile if mobile is None else mobile
+                self._drop(user_id)
+            if user_id is not None:
+                self._invalidate_key(("id", user_id))
+            if mobile is not None:
+                self._invalidate_key(("mobile", mobile))
+
+    def stats(self):
+        with self._lock:
+            entries, used = len(self._entries), self._bytes
+        return {
+            "hits": CACHE_HITS.get(tier=self.tier),
+            "misses": CACHE_MISSES.get(tier=self.tier),
+            "evictions": CACHE_EVICTIONS.get(tier=self.tier),
+            "entries": entries,
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class TieredUserCache(UserCache):
+    """两级缓存：进程内缓存在前，多副本共享的缓存（如 Redis）在后"""
+
+    def __init__(self, local, shared):
+        self.local = local
+        self.shared = shared
+
+    @property
+    def version(self):
+        return self.local.version
+
+    def get_by_id(self, user_id):
+        user = self.local.get_by_id(user_id)
+        if user is None:
+            user = self.shared.get_by_id(user_id)
+            if user is not None:
+                self.local.put(user)
+        return user
+
+    def get_by_mobile(self, mobile):
+        user = self.local.get_by_mobile(mobile)
+        if user is None:
+            user = self.shared.get_by_mobile(mobile)
+            if user is not None:
+                self.local.put(user)
+        return user
+
+    def put(self, user, version=None):
+        user = self.shared.put(user)
+        return self.local.put(user, version)
+
+    def get_many_by_id(self, user_ids):
+        users = self.local.get_many_by_id(user_ids)
+        shared = self.shared.get_many_by_id([user_id for user_id in user_ids if user_id not in users])
+        self.local.put_many(shared.values())
+        users.update(shared)
+        return users
+
+    def get_many_by_mobile(self, mobiles):
+        users = self.local.get_many_by_mobile(mobiles)
+        shared = self.shared.get_many_by_mobile([mobile for mobile in mobiles if mobile not in users])
+        self.local.put_many(shared.values())
+        users.update(shared)
+        return users
+
+    def put_many(self, users, version=None):
+        return self.local.put_many(self.shared.put_many(users), version)
+
+    def invalidate(self, user_id=None, mobile=None):
+        # 先失效共享层，否则本进程的并发读可能从共享层把旧记录填回本地；共享层出错也要清掉本地
+        try:
+            self.shared.invalidate(user_id=user_id, mobile=mobile)
+        finally:
+            self.local.invalidate(user_id=user_id, mobile=mobile)
+
+    def load_by_id(self, user_id, loader):
+        return self.local.load_by_id(user_id, lambda: self.shared.load_by_id(user_id, loader))
+
+    def load_by_mobile(self, mobile, loader):
+        return self.local.load_by_mobile(mobile, lambda: self.shared.load_by_mobile(mobile, loader))
+
+    def stats(self):
+        return {self.local.tier: self.local.stats(), self.shared.tier: self.shared.stats()}
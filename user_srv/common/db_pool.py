@@ -0,0 +1,283 @@
+import asyncio
+import contextlib
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import grpc
+import pymysql
+from loguru import logger
+from playhouse.pool import MaxConnectionsExceeded
+
+from user_srv.common import metrics
+from user_srv.common.interceptors import AsyncHookInterceptor, HookInterceptor
+
+DB_POOL_WAIT_SECONDS = metrics.histogram(
+    "user_srv_db_pool_wait_seconds", "Time spent getting a connection from the database pool",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+DB_POOL_TIMEOUTS = metrics.counter(
+    "user_srv_db_pool_timeouts_total", "RPCs failed fast because no database connection freed up in time", ["method"])
+
+POOL_TIMEOUT_DETAILS = "Database connection pool exhausted, retry later"
+
+# 拦截器为每个 RPC 放一个列表，等待连接超时时往里记一笔
+_timeouts = contextvars.ContextVar("user_srv_db_pool_timeouts", default=None)
+
+
+class PoolTimeout(Exception):
+    """等待空闲连接超过了 timeout"""
+
+
+def _timed_out():
+    timeouts = _timeouts.get()
+    if timeouts is not None:
+        timeouts.append(True)
+
+
+def pool_size(size, threads):
+    """size 为 0 时按 gRPC 工作线程数确定连接数
+
+    peewee 的连接跟着线程走，一个工作线程同时最多占用一个连接，连接数等于线程数时线程不会排队等连接；
+    连接数更少时，多出来的线程等别的 RPC 归还连接，等不到就返回 UNAVAILABLE。
+    """
+    return size or threads
+
+
+def checkin(databases):
+    """把当前线程从这些库借出的连接还回连接池
+
+    peewee 的连接跟着线程走，不 close 的话工作线程会一直占着自己的连接：连接数少于线程数时别的线程永远等不到，
+    stale_timeout 也只在连接放回池里时才检查。每个 RPC 结束时归还，下一个 RPC 再从池里取。
+    """
+    for database in databases:
+        if not database.is_closed():
+            database.close()
+
+
+def warm(database, n):
+    """预先建立 n 个连接（不超过连接池大小）放回 peewee 连接池，返回建好的连接数
+
+    第一批请求不用再等 TCP 握手和 MySQL 认证。连不上时记一条警告照常启动，之后按需建立连接。
+    """
+    if database._max_connections:
+        n = min(n, database._max_connections)
+    conns = []
+    try:
+        for _ in range(n):
+            conns.append(database._connect())
+    except (pymysql.MySQLError, OSError) as e:
+        logger.warning(f"Could not warm the pool of {database.database}, connecting on demand: {e}")
+    finally:
+        for conn in conns:
+            database._close(conn)
+    return len(conns)
+
+
+def warm_all(databases, counts):
+    """同时预热多个库（副本、分片）的连接池，counts[i] 是 databases[i] 预热的连接数，返回建好的连接总数"""
+    if not databases:
+        return 0
+    with ThreadPoolExecutor(max_workers=len(databases), thread_name_prefix="db-warm") as executor:
+        return sum(executor.map(warm, databases, counts))
+
+
+def spread(n, pools):
+    """把 n 个预热连接分给 pools 个连接池，总数还是 n
+
+    分片时每个逻辑分片一个连接池，每个都建 n 个的话 16 个分片就是 16n 个连接，--workers 再乘一次，
+    很容易超过 MySQL 的 max_connections（默认 151）。
+    """
+    return [n // pools + (i < n % pools) for i in range(pools)]
+
+
+class DatabasePool:
+    """peewee PooledDatabase 的连接数配置、等待统计和等待超时
+
+    peewee 在连接用满时按 timeout 轮询等待，超时抛 MaxConnectionsExceeded；
+    这里包一层 connect，记录等待的线程数和耗时，超时记到当前 RPC 上，由 PoolTimeoutInterceptor 返回 UNAVAILABLE。
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.waiting = 0
+        self._lock = threading.Lock()
+        connect = database.connect
+
+        def guarded_connect(*args, **kwargs):
+            start = time.perf_counter()
+            with self._lock:
+                self.waiting += 1
+            try:
+                return connect(*args, **kwargs)
+            except MaxConnectionsExceeded:
+                _timed_out()
+                raise
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+                DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+        database.connect = guarded_connect
+
+    def configure(self, max_connections, timeout, stale_timeout=None):
+        """在建立连接之前调整连接池；timeout 为 0 表示一直等，peewee 里 0 和 None 的含义正好相反"""
+        database = self.database
+        database._max_connections = max_connections
+        database._wait_timeout = timeout or float("inf")
+        if stale_timeout is not None:
+            database._stale_timeout = stale_timeout
+
+    def stats(self):
+        database = self.database
+        return {
+            "in_use": len(database._in_use),
+            "idle": len(database._connections),
+            "waiting": self.waiting,
+            "max": database._max_connections or 0,
+        }
+
+
+class AsyncPool:
+    """给 aiomysql 连接池加上等待超时，acquire 的用法与 aiomysql 相同"""
+
+    def __init__(self, pool, timeout=0):
+        self.pool = pool
+        self.timeout = timeout or None
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                conn = await self.pool.acquire()
+        except TimeoutError:
+            _timed_out()
+            raise PoolTimeout(f"no free connection within {self.timeout}s") from None
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+        try:
+            yield conn
+        finally:
+            await self.pool.release(conn)
+
+    async def warm(self, n):
+        """预先建立 n 个连接（不超过连接池大小）留在池里，返回建好的连接数；连不上时与同步版一样记警告照常启动"""
+        conns = []
+        try:
+            for _ in range(min(n, self.pool.maxsize)):
+                conns.append(await self.pool.acquire())
+        except (pymysql.MySQLError, OSError) as e:
+            logger.warning(f"Could not warm an async database pool, connecting on demand: {e}")
+        finally:
+            for conn in conns:
+                await self.pool.release(conn)
+        return len(conns)
+
+    def stats(self):
+        pool = self.pool
+        return {
+            "in_use": pool.size - pool.freesize,
+            "idle": pool.freesize,
+            "waiting": len(pool._cond._waiters or ()),
+            "max": pool.maxsize,
+        }
+
+    def close(self):
+        self.pool.close()
+
+    async def wait_closed(self):
+        await self.pool.wait_closed()
+
+
+class _PoolTimeoutHooks:
+    """handler 里等待数据库连接超时时返回 UNAVAILABLE
+
+    handler 抛出的异常 gRPC 只能报 UNKNOWN，调用方分不清是 bug 还是过载，
+    这里改成可以换个副本重试的 UNAVAILABLE，并把当时的连接池状态打到日志里。
+    handler 自己捕获了超时异常的话，也能通过 _timeouts 知道这次请求等连接超时了。
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def begin(self, method, context):
+        timeouts = []
+        return timeouts, _timeouts.set(timeouts)
+
+    def end(self, method, context, state, failed, cancelled):
+        timeouts, token = state
+        _timeouts.reset(token)
+        if not timeouts:
+            return False
+        DB_POOL_TIMEOUTS.inc(method=method)
+        logger.warning(f"{method} timed out waiting for a database connection, pool {self.pool.stats()}")
+        return True
+
+
+class PoolTimeoutInterceptor(_PoolTimeoutHooks, HookInterceptor):
+    """同步版在 RPC 结束时还把工作线程占用的连接还给 databases 里的各个连接池（主库、副本、分片）"""
+
+    def __init__(self, pool, databases=()):
+        super().__init__(pool)
+        self.databases = databases
+
+    def _unary(self, behavior, method):
+        def wrapper(request, context):
+            state, response = self.begin(method, context), None
+            try:
+                response = behavior(request, context)
+            except (MaxConnectionsExceeded, PoolTimeout):
+                _timed_out()
+            finally:
+                checkin(self.databases)
+                timed_out = self.end(method, context, state, response is None, False)
+            if timed_out:
+                context.abort(grpc.StatusCode.UNAVAILABLE, POOL_TIMEOUT_DETAILS)
+            return response
+        return wrapper
+
+    def _stream(self, behavior, method):
+        def wrapper(request, context):
+            state = self.begin(method, context)
+            try:
+                yield from behavior(request, context)
+            except (MaxConnectionsExceeded, PoolTimeout):
+                _timed_out()
+            finally:
+                checkin(self.databases)
+                timed_out = self.end(method, context, state, True, False)
+            if timed_out:
+                context.abort(grpc.StatusCode.UNAVAILABLE, POOL_TIMEOUT_DETAILS)
+        return wrapper
+
+
+class AsyncPoolTimeoutInterceptor(_PoolTimeoutHooks, AsyncHookInterceptor):
+
+    def _unary(self, behavior, method):
+        async def wrapper(request, context):
+            state, response = self.begin(method, context), None
+            try:
+                response = await behavior(request, context)
+            except (MaxConnectionsExceeded, PoolTimeout):
+                _timed_out()
+            finally:
+                timed_out = self.end(method, context, state, response is None, False)
+            if timed_out:
+                await context.abort(grpc.StatusCode.UNAVAILABLE, POOL_TIMEOUT_DETAILS)
+            return response
+        return wrapper
+
+    def _stream(self, behavior, method):
+        async def wrapper(request, context):
+            state = self.begin(method, context)
+            try:
+                async for response in behavior(request, context):
+                    yield response
+            except (MaxConnectionsExceeded, PoolTimeout):
+                _timed_out()
+            finally:
+                timed_out = self.end(method, context, state, True, False)
+            if timed_out:
+                await context.abort(grpc.StatusCode.UNAVAILABLE, POOL_TIMEOUT_DETAILS)
+        return wrapper
@@ -0,0 +1,190 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from loguru import logger
+from passlib.hash import pbkdf2_sha256
+
+from user_srv.common import metrics
+
+HASH_QUEUE_DEPTH = metrics.gauge(
+    "user_srv_password_hash_queue_depth", "Password hash jobs submitted but not finished")
+HASH_SECONDS = metrics.histogram(
+    "user_srv_password_hash_seconds", "CPU time of one password hash job in the worker process", ["op"])
+HASH_WAIT_SECONDS = metrics.histogram(
+    "user_srv_password_hash_wait_seconds", "Submit-to-result latency of password hash jobs, queueing included", ["op"])
+
+
+def _hash(password, rounds=None):
+    start = time.perf_counter()
+    return pbkdf2_sha256.using(rounds=rounds).hash(password), time.perf_counter() - start
+
+
+def _verify(password, hashed):
+    start = time.perf_counter()
+    try:
+        ok = pbkdf2_sha256.verify(password, hashed)
+    except ValueError:
+        # 不是 pbkdf2_sha256 格式的哈希
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def _calibrate(target_seconds, min_rounds, max_rounds, samples=3):
+    """在当前机器上估算单次哈希耗时约为 target_seconds 的 rounds"""
+    rounds = min_rounds
+    for _ in range(samples):
+        start = time.perf_counter()
+        pbkdf2_sha256.using(rounds=rounds).hash("calibration")
+        elapsed = time.perf_counter() - start
+        rounds = int(rounds * target_seconds / elapsed)
+        rounds = max(min_rounds, min(max_rounds, rounds))
+    # 取整到千位，避免每次重启的微小差异触发重新哈希
+    return max(min_rounds, rounds // 1000 * 1000)
+
+
+class PasswordHasher:
+    """把 pbkdf2 这类 CPU 密集的计算放到独立的进程池里
+
+    gRPC 工作线程只是等待 Future，等待期间会释放 GIL，不会拖慢同进程里的读请求。
+    rounds 为 None 时使用 passlib 的默认值，可以在启动时用 calibrate 按目标耗时重新选定。
+    工作进程意外退出后换一个新的进程池，受影响的任务重试一次，不用重启服务。
+    """
+
+    # 已有哈希的 rounds 比当前值低出这个比例以上时，登录成功后重新哈希
+    REHASH_TOLERANCE = 1.25
+
+    def __init__(self, workers=None, rounds=None, min_rounds=0):
+        self.workers = workers
+        self.rounds = rounds
+        self.min_rounds = min_rounds
+        self._lock = threading.Lock()
+        self._pool = None
+        self._broken = None
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                # 用 spawn 而不是 fork，避免子进程继承 gRPC 的线程状态
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _replace(self, pool):
+        """有工作进程意外退出（OOM kill、崩溃）时整个进程池不能再用，换一个新的；别的线程已经换过就不再换"""
+        with self._lock:
+            if self._pool is pool:
+                logger.warning("Password hash process pool is broken, starting a new one")
+                # 这里通常是在坏掉的进程池的管理线程里、持有它的 shutdown_lock 时被调用的，
+                # 放掉它的最后一个引用会触发它的 weakref 回调再去拿这把锁，死锁，所以先留着
+                self._broken, self._pool = pool, None
+
+    def _submit(self, op, fn, *args):
+        """提交到进程池，进程池坏了时换一个新的进程池重试一次"""
+        submitted = time.perf_counter()
+        HASH_QUEUE_DEPTH.inc()
+        future = Future()
+        # 置为运行中，asyncio.wrap_future 取消时不会把还在算的任务标成已取消
+        future.set_running_or_notify_cancel()
+
+        def done(f):
+            HASH_QUEUE_DEPTH.dec()
+            HASH_WAIT_SECONDS.observe(time.perf_counter() - submitted, op=op)
+            if f.exception() is None:
+                HASH_SECONDS.observe(f.result()[1], op=op)
+
+        def start(retry):
+            pool = self.pool
+            try:
+                job = pool.submit(fn, *args)
+            except BrokenProcessPool as e:
+                broken(pool, retry, e)
+            except RuntimeError as e:
+                # 进程池已经 shutdown；重试是在进程池的回调线程里提交的，异常只能交给 future
+                future.set_exception(e)
+            else:
+                job.add_done_callback(lambda job: finish(job, pool, retry))
+
+        def broken(pool, retry, error):
+            self._replace(pool)
+            if retry:
+                start(False)
+            else:
+                future.set_exception(error)
+
+        def finish(job, pool, retry):
+            if job.cancelled():
+                # shutdown(wait=False) 取消了还没开始的任务
+                future.set_exception(CancelledError())
+            elif isinstance(job.exception(), BrokenProcessPool):
+                broken(pool, retry, job.exception())
+            elif job.exception() is not None:
+                future.set_exception(job.exception())
+            else:
+                future.set_result(job.result())
+
+        future.add_done_callback(done)
+        start(True)
+        return future
+
+    def warm(self):
+        """启动全部工作进程，返回进程数
+
+        进程池按需启动进程，每个 spawn 出来的进程都要重新导入 passlib，不预热的话由最先到的一批登录请求承担。
+        一次提交进程数个任务，提交时没有空闲进程，进程池会把进程开满。
+        """
+        workers = self.workers or os.process_cpu_count() or 1
+        for future in [self.pool.submit(os.getpid) for _ in range(workers)]:
+            future.result()
+        return workers
+
+    def calibrate(self, target_ms, min_rounds, max_rounds):
+        """在工作进程里测一次耗时，选出满足 target_ms 的 rounds"""
+        self.rounds = self.pool.submit(_calibrate, target_ms / 1000, min_rounds, max_rounds).result()
+        self.min_rounds = min_rounds
+        return self.rounds
+
+    def needs_update(self, hashed):
+        """已存的哈希参数是否过期：算法不同，rounds 低于 min_rounds，或比当前设置低得多
+
+        只升不降：各副本按自己的机器校准出的 rounds 不同，rounds 比当前设置高的哈希不动，
+        否则快慢机器会在登录时来回重新哈希同一个密码。
+        """
+        if not pbkdf2_sha256.identify(hashed):
+            return True
+        rounds = pbkdf2_sha256.from_string(hashed).rounds
+        current = self.rounds or pbkdf2_sha256.default_rounds
+        return rounds < self.min_rounds or rounds * self.REHASH_TOLERANCE < current
+
+    def hash(self, password):
+        return self._submit("hash", _hash, password, self.rounds).result()[0]
+
+    def hash_many(self, passwords):
+        """一次提交一批密码，由进程池并行计算，结果与输入顺序一致"""
+        futures = [self._submit("hash", _hash, password, self.rounds) for password in passwords]
+        return [future.result()[0] for future in futures]
+
+    def verify(self, password, hashed):
+        return self._submit("verify", _verify, password, hashed).result()[0]
+
+    async def ahash(self, password):
+        result, _ = await asyncio.wrap_future(self._submit("hash", _hash, password, self.rounds))
+        return result
+
+    async def ahash_many(self, passwords):
+        return list(await asyncio.gather(*(self.ahash(password) for password in passwords)))
+
+    async def averify(self, password, hashed):
+        result, _ = await asyncio.wrap_future(self._submit("verify", _verify, password, hashed))
+        return result
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait, cancel_futures=not wait)
+                self._pool = None
@@ -0,0 +1,41 @@
+import grpc
+
+from user_srv.proto import health_pb2, health_pb2_grpc
+
+SERVING = health_pb2.HealthCheckResponse.SERVING
+NOT_SERVING = health_pb2.HealthCheckResponse.NOT_SERVING
+
+# "" 表示整个进程，"User" 是 user.proto 里的服务名
+SERVICES = ("", "User")
+
+
+class HealthServicer(health_pb2_grpc.HealthServicer):
+    """grpc.health.v1.Health 的 Check
+
+    启动时是 NOT_SERVING，连接池预热完、开始监听后才改成 SERVING，
+    Kubernetes 的 grpc 探针据此判断什么时候可以把流量切过来。
+    """
+
+    def __init__(self, services=SERVICES):
+        self._status = dict.fromkeys(services, NOT_SERVING)
+
+    def set(self, status):
+        for service in self._status:
+            self._status[service] = status
+
+    def status(self, request, context):
+        status = self._status.get(request.service)
+        if status is None:
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            context.set_details(f"unknown service {request.service!r}")
+            return health_pb2.HealthCheckResponse()
+        return health_pb2.HealthCheckResponse(status=status)
+
+    def Check(self, request, context):
+        return self.status(request, context)
+
+
+class AsyncHealthServicer(HealthServicer):
+
+    async def Check(self, request, context):
+        return self.status(request, context)
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+
+from user_srv.common import log, metrics
+
+IDEMPOTENT_REPLAYS = metrics.counter(
+    "user_srv_idempotent_replays_total", "Requests answered with the remembered response of an idempotency key")
+
+
+class IdempotencyStore:
+    """在一段时间内记住带幂等键的请求的响应，网关重试时直接返回，不再重复哈希和写库
+
+    client 为 None 时存在进程内（LRU + TTL，最多 max_keys 个），
+    否则存到 Redis 这类共享存储里，重试落到其他副本上也能命中。存的是序列化后的 protobuf。
+    Redis 出错时当作没记住，请求照常执行，由 errors（log.RepeatLimiter）限流记日志。
+    """
+
+    def __init__(self, ttl=600, max_keys=100000, client=None, prefix="user_srv:idem:", errors=None):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.client = client
+        self.prefix = prefix
+        self.errors = errors
+        self._client_errors = ()
+        if client is not None:
+            from user_srv.common import redis_cache
+
+            self._client_errors = (redis_cache.RedisError,)
+            self.errors = errors or log.RepeatLimiter(60)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (响应, 过期时间)
+
+    def _failed(self, operation, error):
+        from user_srv.common import redis_cache
+
+        redis_cache.failed(self.errors, f"idempotency {operation}", error)
+
+    def _get(self, key):
+        if self.client is not None:
+            try:
+                return self.client.get(self.prefix + key)
+            except self._client_errors as e:
+                self._failed("get", e)
+                return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[0]
+
+    def _put(self, key, value):
+        if self.client is not None:
+            try:
+                self.client.set(self.prefix + key, value, ex=self.ttl)
+            except self._client_errors as e:
+                self._failed("set", e)
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+
+    def lookup(self, key, message_cls):
+        """返回 key 记住的响应（message_cls 实例），没有或已过期时返回 None"""
+        raw = self._get(key)
+        if raw is None:
+            return None
+        IDEMPOTENT_REPLAYS.inc()
+        return message_cls.FromString(raw)
+
+    def remember(self, key, message):
+        if self.ttl:
+            self._put(key, message.SerializeToString())
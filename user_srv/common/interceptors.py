@@ -0,0 +1,114 @@
+import grpc
+
+
+def method_name(handler_call_details):
+    # "/User/GetUserById" -> "GetUserById"
+    return handler_call_details.method.rsplit("/", 1)[-1]
+
+
+def _cancelled(context):
+    # grpc.aio 的 context 有 cancelled()，同步版只能看 is_active()
+    cancelled = getattr(context, "cancelled", None)
+    return cancelled() if cancelled else not context.is_active()
+
+
+def status_code(context, failed, cancelled=False):
+    """RPC 结束时的状态码
+
+    handler 没有设置状态码时：正常返回是 OK；抛了异常或没有返回响应会被 gRPC 报成 UNKNOWN；
+    响应流在发完之前被关闭（客户端取消或断开）算作 CANCELLED。
+    """
+    code = context.code()
+    if code is not None:
+        return code
+    if not failed:
+        return grpc.StatusCode.OK
+    if cancelled or _cancelled(context):
+        return grpc.StatusCode.CANCELLED
+    return grpc.StatusCode.UNKNOWN
+
+
+class _Hooks:
+    """子类实现 begin / end：begin 在 handler 执行前调用，返回值原样传给 end"""
+
+    def begin(self, method, context):
+        return None
+
+    def end(self, method, context, state, failed, cancelled):
+        pass
+
+    def _wrap(self, handler, method):
+        if handler.unary_unary:
+            return handler._replace(unary_unary=self._unary(handler.unary_unary, method))
+        if handler.stream_unary:
+            return handler._replace(stream_unary=self._unary(handler.stream_unary, method))
+        if handler.unary_stream:
+            return handler._replace(unary_stream=self._stream(handler.unary_stream, method))
+        return handler._replace(stream_stream=self._stream(handler.stream_stream, method))
+
+
+class HookInterceptor(_Hooks, grpc.ServerInterceptor):
+    """在每个 RPC 前后调用 begin / end 的同步拦截器基类"""
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None:
+            return None
+        return self._wrap(handler, method_name(handler_call_details))
+
+    def _unary(self, behavior, method):
+        def wrapper(request, context):
+            state, response = self.begin(method, context), None
+            try:
+                response = behavior(request, context)
+                return response
+            finally:
+                self.end(method, context, state, response is None, False)
+        return wrapper
+
+    def _stream(self, behavior, method):
+        def wrapper(request, context):
+            state, failed, cancelled = self.begin(method, context), True, False
+            try:
+                yield from behavior(request, context)
+                failed = False
+            except GeneratorExit:
+                cancelled = True
+                raise
+            finally:
+                self.end(method, context, state, failed, cancelled)
+        return wrapper
+
+
+class AsyncHookInterceptor(_Hooks, grpc.aio.ServerInterceptor):
+    """HookInterceptor 的 grpc.aio 版本"""
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+        return self._wrap(handler, method_name(handler_call_details))
+
+    def _unary(self, behavior, method):
+        async def wrapper(request, context):
+            state, response = self.begin(method, context), None
+            try:
+                response = await behavior(request, context)
+                return response
+            finally:
+                self.end(method, context, state, response is None, False)
+        return wrapper
+
+    def _stream(self, behavior, method):
+        async def wrapper(request, context):
+            state, failed, cancelled = self.begin(method, context), True, False
+            try:
+                async for response in behavior(request, context):
+                    yield response
+                failed = False
+            except GeneratorExit:
+                cancelled = True
+                raise
+            finally:
+                self.end(method, context, state, failed, cancelled)
+        return wrapper
@@ -0,0 +1,75 @@
+"""日志管道
+
+所有 sink 都用 enqueue=True：gRPC 工作线程只把格式化好的一行放进队列，写文件由 loguru 的后台线程完成，
+磁盘慢的时候请求线程不会跟着卡住。退出前调用 logger.complete() 等队列写完。
+"""
+import json
+import sys
+import threading
+import time
+import traceback
+
+from loguru import logger
+
+# 限流表最多记住的异常种类，超过时清空重新计数
+MAX_ERROR_KEYS = 1000
+
+
+def _json_line(record):
+    """一条日志一行 JSON，extra 里的字段（rpc、code、ms 等）放在顶层"""
+    line = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "pid": record["process"].id,
+    }
+    line.update(record["extra"])
+    line.pop("json", None)
+    if record["exception"]:
+        error_type, error, tb = record["exception"]
+        line["exception"] = "".join(traceback.format_exception(error_type, error, tb))
+    return json.dumps(line, ensure_ascii=False, default=str)
+
+
+def _json_format(record):
+    record["extra"]["json"] = _json_line(record)
+    return "{extra[json]}\n"
+
+
+def setup(path, slow_query_path, use_json):
+    """替换 loguru 默认的同步 stderr sink，stderr 和日志文件都改为异步写
+
+    backtrace / diagnose 关闭：堆栈里不展开变量值，格式化更快，也不会把请求参数写进日志。
+    """
+    options = {"enqueue": True, "backtrace": False, "diagnose": False}
+    if use_json:
+        options["format"] = _json_format
+    logger.remove()
+    logger.add(sys.stderr, **options)
+    logger.add(path, rotation="10 MB", retention="10 days", **options)
+    logger.add(slow_query_path, rotation="10 MB", retention="10 days",
+               filter=lambda record: record["extra"].get("slow_query", False), **options)
+
+
+class RepeatLimiter:
+    """同一个 key 每 interval 秒只放行一次，返回 (是否放行, 上次放行之后省略的次数)"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._windows = {}  # key -> [窗口开始时间, 省略次数]
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is not None and now - window[0] < self.interval:
+                window[1] += 1
+                return False, 0
+            if window is None and len(self._windows) >= MAX_ERROR_KEYS:
+                self._windows.clear()
+            self._windows[key] = [now, 0]
+            return True, window[1] if window else 0
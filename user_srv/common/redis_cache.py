@@ -0,0 +1,298 @@
+import json
+import threading
+import time
+import uuid
+from datetime import date
+
+from loguru import logger
+
+from user_srv.common import log, metrics
+from user_srv.common.cache import CACHE_HITS, CACHE_MISSES, CachedUser, UserCache
+
+try:
+    from redis import RedisError
+except ImportError:
+    # 没装 redis-py 时只能用 memory://，MemoryRedis 不会抛出 RedisError
+    class RedisError(Exception):
+        pass
+
+REDIS_ERRORS = metrics.counter(
+    "user_srv_redis_errors_total", "Redis commands that failed and fell back to the database, by operation",
+    ["operation"])
+
+
+def failed(errors, operation, error):
+    """Redis 出错时计数，并按操作限流记一条警告；errors 是 log.RepeatLimiter
+
+    Redis 故障时每个请求都会失败一次，调用方退回查库或跳过缓存，不让缓存的故障变成请求的错误。
+    """
+    REDIS_ERRORS.inc(operation=operation)
+    allowed, suppressed = errors.allow(operation)
+    if allowed:
+        repeats = f" ({suppressed} more in the last {errors.interval:g}s)" if suppressed else ""
+        logger.warning(f"Redis {operation} failed, falling back: {type(error).__name__}: {error}{repeats}")
+
+
+class _MemoryPipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+        return call
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        return [getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+
+class MemoryRedis:
+    """进程内的 Redis 替身，只实现 RedisUserCache 用到的命令，用于测试和本地开发"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}  # key -> (value, 过期时间或 None)
+
+    def _alive(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] < time.monotonic():
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, name):
+        with self._lock:
+            item = self._alive(name)
+            return item[0] if item else None
+
+    def mget(self, keys):
+        with self._lock:
+            return [item[0] if item else None for item in map(self._alive, keys)]
+
+    def set(self, name, value, ex=None, px=None, nx=False):
+        if isinstance(value, str):
+            value = value.encode()
+        expire_at = None
+        if ex is not None:
+            expire_at = time.monotonic() + ex
+        elif px is not None:
+            expire_at = time.monotonic() + px / 1000
+        with self._lock:
+            if nx and self._alive(name):
+                return None
+            self._data[name] = (value, expire_at)
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def exists(self, *names):
+        with self._lock:
+            return sum(self._alive(name) is not None for name in names)
+
+    def pipeline(self, transaction=False):
+        return _MemoryPipeline(self)
+
+
+def connect(url):
+    """memory:// 返回 MemoryRedis，其余交给 redis-py"""
+    if url.startswith("memory://"):
+        return MemoryRedis()
+    import redis
+
+    return redis.Redis.from_url(url)
+
+
+class RedisUserCache(UserCache):
+    """多副本共享的 Redis 用户缓存
+
+    同一条记录按 id 和 mobile 各存一份，读任意一个键都只需一次往返。
+    写操作删除两个键并留下短期墓碑，墓碑存在期间不回填，避免并发读把旧数据写回。
+    未命中时用 SET NX 抢一个短期锁，只有抢到锁的请求回源查库，其余请求等待缓存被填上，
+    防止热点键过期时大量请求同时打到 MySQL。
+    Redis 出错时读当作未命中、直接查库，写和失效跳过，由 errors（log.RepeatLimiter）限流记日志。
+    """
+
+    tier = "redis"
+
+    def __init__(self, client, ttl=300, prefix="user_srv:user:", lock_ms=3000,
+                 lock_wait=0.02, lock_retries=10, tombstone_ttl=5, errors=None):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.lock_ms = lock_ms
+        self.lock_wait = lock_wait
+        self.lock_retries = lock_retries
+        self.tombstone_ttl = tombstone_ttl
+        self.errors = errors or log.RepeatLimiter(60)
+
+    def _id_key(self, user_id):
+        return f"{self.prefix}id:{user_id}"
+
+    def _mobile_key(self, mobile):
+        return f"{self.prefix}mobile:{mobile}"
+
+    def _keys(self, user):
+        return self._id_key(user.id), self._mobile_key(user.mobile)
+
+    def _tombs(self, user):
+        return tuple(key + ":tomb" for key in self._keys(user))
+
+    @staticmethod
+    def _dumps(user):
+        birthday = user.birthday.isoformat() if user.birthday else None
+        return json.dumps([user.id, user.mobile, user.role, user.nick_name, user.gender, birthday])
+
+    @staticmethod
+    def _loads(raw):
+        user_id, mobile, role, nick_name, gender, birthday = json.loads(raw)
+        return CachedUser(user_id, mobile, role, nick_name, gender,
+                          date.fromisoformat(birthday) if birthday else None)
+
+    def _read(self, key):
+        raw = self.client.get(key)
+        if raw is None:
+            CACHE_MISSES.inc(tier=self.tier)
+            return None
+        CACHE_HITS.inc(tier=self.tier)
+        return self._loads(raw)
+
+    def _get(self, key):
+        try:
+            return self._read(key)
+        except RedisError as e:
+            failed(self.errors, "get", e)
+            return None
+
+    def get_by_id(self, user_id):
+        return self._get(self._id_key(user_id))
+
+    def get_by_mobile(self, mobile):
+        return self._get(self._mobile_key(mobile))
+
+    def _get_many(self, keys):
+        if not keys:
+            return []
+        try:
+            raws = self.client.mget(keys)
+        except RedisError as e:
+            failed(self.errors, "mget", e)
+            return [None] * len(keys)
+        users = []
+        for raw in raws:
+            if raw is None:
+                CACHE_MISSES.inc(tier=self.tier)
+                users.append(None)
+            else:
+                CACHE_HITS.inc(tier=self.tier)
+                users.append(self._loads(raw))
+        return users
+
+    def get_many_by_id(self, user_ids):
+        users = zip(user_ids, self._get_many([self._id_key(user_id) for user_id in user_ids]))
+        return {user_id: user for user_id, user in users if user is not None}
+
+    def get_many_by_mobile(self, mobiles):
+        users = zip(mobiles, self._get_many([self._mobile_key(mobile) for mobile in mobiles]))
+        return {mobile: user for mobile, user in users if user is not None}
+
+    def put(self, user, version=None):
+        return self.put_many([user], version)[0]
+
+    def put_many(self, users, version=None):
+        """两次往返写入一批用户：先查墓碑，再写没有墓碑的记录
+
+        查墓碑和写入之间可能有 invalidate 插进来，所以写完在同一个 pipeline 里再查一次墓碑，
+        这时有墓碑的记录删掉。invalidate 先写墓碑再删键：再查时没看到墓碑，说明它的删除排在这次写入之后，
+        不会留下旧数据。
+        """
+        users = [user if isinstance(user, CachedUser) else CachedUser.from_model(user) for user in users]
+        if not users:
+            return users
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for user in users:
+                pipe.exists(*self._tombs(user))
+            fresh = [user for user, tomb in zip(users, pipe.execute()) if not tomb]
+            if fresh:
+                pipe = self.client.pipeline(transaction=False)
+                for user in fresh:
+                    raw = self._dumps(user)
+                    pipe.set(self._id_key(user.id), raw, ex=self.ttl)
+                    pipe.set(self._mobile_key(user.mobile), raw, ex=self.ttl)
+                for user in fresh:
+                    pipe.exists(*self._tombs(user))
+                raced = [user for user, tomb in zip(fresh, pipe.execute()[2 * len(fresh):]) if tomb]
+                if raced:
+                    self.client.delete(*(key for user in raced for key in self._keys(user)))
+        except RedisError as e:
+            failed(self.errors, "put", e)
+        return users
+
+    def invalidate(self, user_id=None, mobile=None):
+        """写库已经提交，失效失败只记日志，Redis 里的旧记录最多保留到 ttl 过期"""
+        keys = []
+        try:
+            if user_id is not None:
+                keys.append(self._id_key(user_id))
+                if mobile is None:
+                    cached = self.client.get(keys[0])
+                    if cached is not None:
+                        mobile = self._loads(cached).mobile
+            if mobile is not None:
+                keys.append(self._mobile_key(mobile))
+            # 先写墓碑再删键，put_many 靠这个顺序发现和它并发的回填
+            for key in keys:
+                self.client.set(key + ":tomb", b"1", ex=self.tombstone_ttl)
+            if keys:
+                self.client.delete(*keys)
+        except RedisError as e:
+            failed(self.errors, "invalidate", e)
+
+    def _unlock(self, lock_key, token):
+        try:
+            if self.client.get(lock_key) == token.encode():
+                self.client.delete(lock_key)
+        except RedisError as e:
+            # 锁在 lock_ms 后自己过期
+            failed(self.errors, "unlock", e)
+
+    def _load_locked(self, key, loader):
+        lock_key, token = key + ":lock", uuid.uuid4().hex
+        try:
+            user = self._read(key)
+            if user is not None:
+                return user
+            for _ in range(self.lock_retries):
+                if self.client.set(lock_key, token, px=self.lock_ms, nx=True):
+                    try:
+                        user = loader()
+                        return self.put(user) if user is not None else None
+                    finally:
+                        self._unlock(lock_key, token)
+                time.sleep(self.lock_wait)
+                raw = self.client.get(key)
+                if raw is not None:
+                    return self._loads(raw)
+        except RedisError as e:
+            failed(self.errors, "load", e)
+        # 等不到别人回填（比如持锁的副本挂了）或 Redis 不可用，直接查库
+        return loader()
+
+    def load_by_id(self, user_id, loader):
+        return self._load_locked(self._id_key(user_id), loader)
+
+    def load_by_mobile(self, mobile, loader):
+        return self._load_locked(self._mobile_key(mobile), loader)
+
+    def stats(self):
+        return {
+            "hits": CACHE_HITS.get(tier=self.tier),
+            "misses": CACHE_MISSES.get(tier=self.tier),
+        }
@@ -0,0 +1,165 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import pymysql
+from loguru import logger
+
+from user_srv.common import metrics
+from user_srv.settings import setting
+
+DB_READS = metrics.counter(
+    "user_srv_db_reads_total", "Routed reads by the database that served them (primary or replica address)", ["target"])
+REPLICA_HEALTHY = metrics.gauge(
+    "user_srv_db_replica_healthy", "1 if the read replica passed its last health check", ["replica"])
+REPLICA_LAG = metrics.gauge(
+    "user_srv_db_replica_lag_seconds", "Replication lag reported by the replica, -1 if unknown", ["replica"])
+
+
+class Replica:
+    """一个只读副本；target 是查询要用的连接池（同步版为 peewee database，async 版为 db_pool.AsyncPool）"""
+
+    def __init__(self, host, port, target):
+        self.name = f"{host}:{port}"
+        self.host = host
+        self.port = port
+        self.target = target
+        self.healthy = True
+        self.down_until = 0.0
+        self.lag = None
+        self._conn = None
+
+    def available(self, now):
+        return self.healthy and now >= self.down_until
+
+    def probe(self):
+        """健康检查，返回 (是否可用, 复制延迟秒数)
+
+        用单独的连接，不占用查询连接池。查不到复制状态（不是副本或没有 REPLICATION CLIENT 权限）时
+        延迟为 None，只要能连上就算可用；复制线程停了（延迟为 NULL）算作不可用。
+        """
+        try:
+            if self._conn is None:
+                self._conn = pymysql.connect(
+                    host=self.host, port=self.port, user=setting.MYSQL_USER, password=setting.MYSQL_PASSWORD,
+                    database=setting.MYSQL_DB, connect_timeout=2, read_timeout=2,
+                    cursorclass=pymysql.cursors.DictCursor)
+            with self._conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                status = self._replication_status(cursor)
+        except (pymysql.MySQLError, OSError) as e:
+            logger.debug(f"replica {self.name} health check failed: {e}")
+            self.close()
+            return False, None
+        if status is None:
+            return True, None
+        lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+        return lag is not None, lag
+
+    def _replication_status(self, cursor):
+        # MySQL 8.0.22 起改名为 SHOW REPLICA STATUS
+        for sql in ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS"):
+            try:
+                cursor.execute(sql)
+                return cursor.fetchone()
+            except pymysql.MySQLError:
+                continue
+        return None
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except pymysql.MySQLError:
+                pass
+            self._conn = None
+
+
+class ReplicaRouter:
+    """读写分离：读请求分给健康的只读副本，写请求和刚写过的用户的读请求走主库
+
+    wrote 记下被写过的用户，sticky_seconds 内按 id 或手机号读这个用户时走主库，
+    避免客户端改完资料马上读回时从有延迟的副本读到旧数据。
+    """
+
+    def __init__(self, replicas, sticky_seconds=5, max_lag=10, cooldown=10, max_keys=100000):
+        self.replicas = replicas
+        self.sticky_seconds = sticky_seconds
+        self.max_lag = max_lag
+        self.cooldown = cooldown
+        self.max_keys = max_keys
+        self._written = OrderedDict()  # 键 -> 过期时间，按写入时间排序
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        for replica in replicas:
+            REPLICA_HEALTHY.set(1, replica=replica.name)
+            REPLICA_LAG.set(-1, replica=replica.name)
+
+    def _keys(self, user_id, mobile):
+        keys = []
+        if user_id:
+            keys.append(("id", user_id))
+        if mobile:
+            keys.append(("mobile", mobile))
+        return keys
+
+    def wrote(self, user_id=None, mobile=None):
+        now = time.monotonic()
+        with self._lock:
+            for key in self._keys(user_id, mobile):
+                self._written.pop(key, None)
+                self._written[key] = now + self.sticky_seconds
+            while self._written:
+                key, expires = next(iter(self._written.items()))
+                if expires > now and len(self._written) <= self.max_keys:
+                    break
+                del self._written[key]
+
+    def sticky(self, user_id=None, mobile=None):
+        now = time.monotonic()
+        with self._lock:
+            return any(self._written.get(key, 0) > now for key in self._keys(user_id, mobile))
+
+    def pick(self, user_id=None, mobile=None):
+        """选一个副本处理读请求，返回 None 表示走主库"""
+        if not self.sticky(user_id, mobile):
+            now = time.monotonic()
+            candidates = [replica for replica in self.replicas if replica.available(now)]
+            if candidates:
+                replica = random.choice(candidates)
+                DB_READS.inc(target=replica.name)
+                return replica
+        DB_READS.inc(target="primary")
+        return None
+
+    def failed(self, replica, error):
+        """副本上的查询出错，暂停使用 cooldown 秒，这次读请求由调用方回到主库重试"""
+        replica.down_until = time.monotonic() + self.cooldown
+        logger.warning(f"replica {replica.name} failed, using primary for {self.cooldown}s: {error}")
+
+    def check(self):
+        for replica in self.replicas:
+            ok, lag = replica.probe()
+            healthy = ok and (lag is None or lag <= self.max_lag)
+            if healthy != replica.healthy:
+                logger.warning(f"replica {replica.name} is now {'healthy' if healthy else 'unhealthy'} "
+                               f"(reachable={ok}, lag={lag})")
+            replica.healthy, replica.lag = healthy, lag
+            REPLICA_HEALTHY.set(int(healthy), replica=replica.name)
+            REPLICA_LAG.set(-1 if lag is None else lag, replica=replica.name)
+
+    def start(self, interval):
+        """后台线程定期做健康检查；启动时先同步检查一次，不把请求发给连不上的副本"""
+        self.check()
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.check()
+
+        threading.Thread(target=loop, name="replica-health", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        for replica in self.replicas:
+            replica.close()
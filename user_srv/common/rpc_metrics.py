@@ -0,0 +1,60 @@
+import time
+
+from user_srv.common import metrics
+from user_srv.common.interceptors import (
+    AsyncHookInterceptor,
+    HookInterceptor,
+    status_code,
+)
+
+RPC_REQUESTS = metrics.counter(
+    "user_srv_rpc_requests_total", "Finished RPCs by method and status code", ["method", "code"])
+RPC_LATENCY = metrics.histogram(
+    "user_srv_rpc_latency_seconds", "Time from the handler starting to the RPC finishing", ["method"])
+RPC_IN_FLIGHT = metrics.gauge(
+    "user_srv_rpc_in_flight", "RPCs currently running in a handler", ["method"])
+WORKER_QUEUE_DEPTH = metrics.gauge(
+    "user_srv_grpc_worker_queue_depth", "RPCs accepted but waiting for a free gRPC worker thread")
+WORKER_THREADS = metrics.gauge(
+    "user_srv_grpc_worker_threads", "Size of the gRPC worker thread pool")
+DB_POOL_CONNECTIONS = metrics.gauge(
+    "user_srv_db_pool_connections", "Database pool connections by state (in_use / idle / waiting)", ["state"])
+DB_POOL_MAX = metrics.gauge(
+    "user_srv_db_pool_max_connections", "Maximum connections the database pool may open")
+
+
+class _MetricsHooks:
+    """按方法统计请求数、状态码、延迟和正在处理的请求数"""
+
+    def begin(self, method, context):
+        RPC_IN_FLIGHT.inc(method=method)
+        return time.perf_counter()
+
+    def end(self, method, context, start, failed, cancelled):
+        RPC_IN_FLIGHT.dec(method=method)
+        RPC_LATENCY.observe(time.perf_counter() - start, method=method)
+        RPC_REQUESTS.inc(method=method, code=status_code(context, failed, cancelled).name)
+
+
+class MetricsInterceptor(_MetricsHooks, HookInterceptor):
+    pass
+
+
+class AsyncMetricsInterceptor(_MetricsHooks, AsyncHookInterceptor):
+    pass
+
+
+def watch_executor(executor):
+    """采集 gRPC 工作线程池的排队数，排队持续大于 0 说明工作线程不够用"""
+    WORKER_QUEUE_DEPTH.set_function(executor._work_queue.qsize)
+    WORKER_THREADS.set(executor._max_workers)
+
+
+def watch_db_pool(pool):
+    """采集连接池的连接数，pool 是 db_pool.DatabasePool 或 db_pool.AsyncPool
+
+    waiting 是正在等待空闲连接的线程或协程数，同步版还包括建立新连接的耗时。
+    """
+    for state in ("in_use", "idle", "waiting"):
+        DB_POOL_CONNECTIONS.set_function(lambda state=state: pool.stats()[state], state=state)
+    DB_POOL_MAX.set_function(lambda: pool.stats()["max"])
@@ -0,0 +1,138 @@
+import contextlib
+import contextvars
+import re
+import time
+
+from loguru import logger
+
+from user_srv.common import metrics
+from user_srv.common.interceptors import AsyncHookInterceptor, HookInterceptor
+
+SQL_STATEMENTS = metrics.histogram(
+    "user_srv_rpc_sql_statements", "SQL statements run by one RPC", ["method"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+SQL_SECONDS = metrics.histogram(
+    "user_srv_rpc_db_seconds", "Time one RPC spent executing SQL", ["method"])
+SLOW_QUERIES = metrics.counter(
+    "user_srv_slow_queries_total", "SQL statements slower than the slow query threshold", ["method"])
+BUDGET_EXCEEDED = metrics.counter(
+    "user_srv_query_budget_exceeded_total", "RPCs that ran more SQL statements than their budget", ["method"])
+
+# 客户端在请求元数据里带上 x-sql-trace 时，服务端在 trailing metadata 里返回本次的 SQL 条数和耗时
+TRACE_METADATA_KEY = "x-sql-trace"
+STATEMENTS_METADATA_KEY = "x-sql-statements"
+SECONDS_METADATA_KEY = "x-sql-seconds"
+
+# 每个请求最多记下这么多条语句的耗时，防止 StreamUsers 这类长请求占用过多内存
+MAX_RECORDED_STATEMENTS = 50
+
+_current = contextvars.ContextVar("user_srv_sql_trace", default=None)
+_PLACEHOLDERS = re.compile(r"(%s|\?)(?:, (?:%s|\?))+")
+_VALUES_ROWS = re.compile(r"(\([^()]*\))(?:, \1)+")
+
+
+def sql_shape(sql):
+    """把 IN (%s, %s, ...) 折叠成 IN (%s*N)、多行 VALUES 折叠成 (...)*N，批量大小不同的语句归为同一类"""
+    sql = _PLACEHOLDERS.sub(lambda m: f"{m.group(1)}*{m.group(0).count(',') + 1}", sql)
+    return _VALUES_ROWS.sub(lambda m: f"{m.group(1)}*{m.group(0).count('), (') + 1}", sql)
+
+
+def params_shape(params):
+    """只记录参数的个数和类型，不记录值，避免手机号、密码哈希进入日志"""
+    if not params:
+        return "()"
+    names = [type(param).__name__ for param in params]
+    if len(names) > 8:
+        return f"({len(names)} params: {', '.join(sorted(set(names)))})"
+    return "(" + ", ".join(names) + ")"
+
+
+class RequestTrace:
+    """一个 RPC 执行过的 SQL"""
+
+    __slots__ = ("method", "queries", "seconds", "slow_ms", "statements")
+
+    def __init__(self, method, slow_ms):
+        self.method = method
+        self.slow_ms = slow_ms
+        self.statements = 0
+        self.seconds = 0.0
+        self.queries = []  # [(sql, 秒)]
+
+    def add(self, sql, params, seconds):
+        self.statements += 1
+        self.seconds += seconds
+        if len(self.queries) < MAX_RECORDED_STATEMENTS:
+            self.queries.append((sql, seconds))
+        if self.slow_ms and seconds * 1000 >= self.slow_ms:
+            SLOW_QUERIES.inc(method=self.method)
+            logger.bind(slow_query=True).warning(
+                f"slow query {seconds * 1000:.1f}ms in {self.method}: {sql_shape(sql)} params={params_shape(params)}")
+
+
+def record(sql, params, seconds):
+    trace = _current.get()
+    if trace is not None:
+        trace.add(sql, params, seconds)
+
+
+@contextlib.contextmanager
+def timed(sql, params):
+    """计时执行一条 SQL 并记到当前请求上，给不经过 peewee execute_sql 的 aiomysql 路径用"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(sql, params, time.perf_counter() - start)
+
+
+def trace_database(database):
+    """包一层 database.execute_sql，peewee 发出的每条语句都记到当前请求上"""
+    execute_sql = database.execute_sql
+
+    def traced_execute_sql(sql, params=None, *args, **kwargs):
+        with timed(sql, params):
+            return execute_sql(sql, params, *args, **kwargs)
+
+    database.execute_sql = traced_execute_sql
+
+
+class _TraceHooks:
+    """为每个 RPC 建一个 RequestTrace，结束时汇总到指标，超过 budgets 里的条数时告警
+
+    budgets 是 {方法名: 最多执行的 SQL 条数}，用来在 CI 或线上发现多查了一次库的回归。
+    """
+
+    def __init__(self, slow_ms=0, budgets=None):
+        self.slow_ms = slow_ms
+        self.budgets = budgets or {}
+
+    def begin(self, method, context):
+        trace = RequestTrace(method, self.slow_ms)
+        return trace, _current.set(trace)
+
+    def end(self, method, context, state, failed, cancelled):
+        trace, token = state
+        _current.reset(token)
+        SQL_STATEMENTS.observe(trace.statements, method=method)
+        SQL_SECONDS.observe(trace.seconds, method=method)
+        budget = self.budgets.get(method)
+        if budget is not None and trace.statements > budget:
+            BUDGET_EXCEEDED.inc(method=method)
+            logger.warning(f"{method} ran {trace.statements} SQL statements, budget is {budget}: "
+                           + "; ".join(sql_shape(sql) for sql, _ in trace.queries))
+        logger.trace(f"{method}: {trace.statements} statements in {trace.seconds * 1000:.1f}ms "
+                     + "; ".join(f"{seconds * 1000:.1f}ms {sql_shape(sql)}" for sql, seconds in trace.queries))
+        if any(key == TRACE_METADATA_KEY for key, _ in context.invocation_metadata() or ()):
+            context.set_trailing_metadata((
+                (STATEMENTS_METADATA_KEY, str(trace.statements)),
+                (SECONDS_METADATA_KEY, f"{trace.seconds:.6f}"),
+            ))
+
+
+class SqlTraceInterceptor(_TraceHooks, HookInterceptor):
+    pass
+
+
+class AsyncSqlTraceInterceptor(_TraceHooks, AsyncHookInterceptor):
+    pass
@@ -0,0 +1,84 @@
+"""启动耗时统计
+
+profile_imports 在导入其他模块之前替换 builtins.__import__，记下每条 import 第一次加载模块的累计耗时
+和扣掉嵌套导入后的自身耗时，口径与 python -X importtime 相同。Phases 记录启动各阶段的耗时，
+服务就绪时打到日志里，不开 --profile-startup 也能看出冷启动慢在哪一步。
+
+这个模块只用标准库里已经加载的模块，本身不增加启动时间。
+"""
+import builtins
+import sys
+import threading
+import time
+
+_import = builtins.__import__
+_local = threading.local()
+_imports = {}  # 模块名 -> (累计秒数, 自身秒数)
+
+
+def _resolve(name, globals, level):
+    """相对导入换成绝对模块名"""
+    if not level:
+        return name
+    package = (globals or {}).get("__package__") or ""
+    base = package.rsplit(".", level - 1)[0]
+    return f"{base}.{name}" if name else base
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if not level and not fromlist and name in sys.modules:
+        return _import(name, globals, locals, fromlist, level)
+    stack = _local.__dict__.setdefault("stack", [])
+    loaded = len(sys.modules)
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        children = stack.pop()
+        # 没有加载新模块的 import 只是一次字典查找，算在外层模块的自身耗时里
+        if len(sys.modules) > loaded:
+            if stack:
+                stack[-1] += elapsed
+            module = _resolve(name, globals, level)
+            if fromlist and fromlist != ("*",):
+                # from package import a, b 加载的是子模块，记在语句上
+                module = f"{module} [{', '.join(fromlist)}]"
+            if module not in _imports:
+                _imports[module] = (elapsed, elapsed - children)
+
+
+def profile_imports():
+    builtins.__import__ = _timed_import
+
+
+def import_report(limit=25):
+    """停止计时，返回 [(模块名, 累计毫秒, 自身毫秒)]，按累计耗时从大到小取前 limit 个"""
+    builtins.__import__ = _import
+    rows = sorted(_imports.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+    return [(module, total * 1000, own * 1000) for module, (total, own) in rows]
+
+
+def imports_ms():
+    return sum(own for _, own in _imports.values()) * 1000
+
+
+class Phases:
+    """按顺序记录启动阶段的耗时，mark(name) 结束当前阶段"""
+
+    def __init__(self, started):
+        self.started = started
+        self._last = started
+        self.timings = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.timings.append((name, (now - self._last) * 1000))
+        self._last = now
+
+    def total_ms(self):
+        return (self._last - self.started) * 1000
+
+    def summary(self):
+        return ", ".join(f"{name} {ms:.0f}ms" for name, ms in self.timings)
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+
+from peewee import MySQLDatabase, fn
+
+from user_srv.model.models import User
+from user_srv.proto import user_pb2
+
+MODES = {
+    "exact": user_pb2.TOTAL_EXACT,
+    "cached": user_pb2.TOTAL_CACHED,
+    "approx": user_pb2.TOTAL_APPROX,
+    "skip": user_pb2.TOTAL_SKIP,
+}
+
+# 表统计信息里的估算行数；MySQL 8 会按 information_schema_stats_expiry 缓存这个值
+APPROX_SQL = ("SELECT TABLE_ROWS FROM information_schema.TABLES "
+              "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s")
+
+
+class TotalCounter:
+    """GetUserList 的 total 统计
+
+    exact 每次 SELECT COUNT(*)；cached 在 ttl 秒内复用上一次的精确值，
+    CreateUser 成功后就地加一；approx 读 InnoDB 的表统计估算值；skip 不统计。
+    请求里没指定时使用 mode 作为默认方式。
+    """
+
+    def __init__(self, mode="exact", ttl=30):
+        self.mode = MODES[mode]
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._expire_at = 0
+
+    def resolve(self, mode):
+        return mode or self.mode
+
+    def _cached(self):
+        with self._lock:
+            if self._value is not None and time.monotonic() < self._expire_at:
+                return self._value
+        return None
+
+    def _store(self, value):
+        with self._lock:
+            self._value = value
+            self._expire_at = time.monotonic() + self.ttl
+        return value
+
+    def on_create(self, n=1):
+        with self._lock:
+            if self._value is not None:
+                self._value += n
+
+    def count(self, mode, database=None):
+        """按 mode 统计 total，mode 为 TOTAL_SKIP 时返回 0；database 为空时用 User 绑定的库"""
+        database = database or User._meta.database
+        if mode == user_pb2.TOTAL_SKIP:
+            return 0
+        if mode == user_pb2.TOTAL_CACHED:
+            value = self._cached()
+            if value is None:
+                value = self._store(User.select().count(database))
+            return value
+        # 估算值只有 MySQL 的 information_schema 才有，其他库退回精确统计
+        if mode == user_pb2.TOTAL_APPROX and isinstance(database, MySQLDatabase):
+            row = database.execute_sql(APPROX_SQL, (User._meta.table_name,)).fetchone()
+            if row and row[0] is not None:
+                return row[0]
+        return User.select().count(database)
+
+    def count_all(self, mode, databases):
+        """分片时的 total：各分片分别统计后相加，cached 模式缓存的是总和"""
+        if mode == user_pb2.TOTAL_CACHED:
+            value = self._cached()
+            if value is None:
+                value = self._store(sum(self.count(user_pb2.TOTAL_EXACT, database) for database in databases))
+            return value
+        return sum(self.count(mode, database) for database in databases)
+
+    async def acount(self, mode, scalar):
+        """count 的协程版本，scalar(sql, params) 是返回第一行第一列的协程函数"""
+        if mode == user_pb2.TOTAL_SKIP:
+            return 0
+        exact_sql, exact_params = User.select(fn.COUNT(User.id)).sql()
+        if mode == user_pb2.TOTAL_CACHED:
+            value = self._cached()
+            if value is None:
+                value = self._store(await scalar(exact_sql, exact_params))
+            return value
+        if mode == user_pb2.TOTAL_APPROX:
+            value = await scalar(APPROX_SQL, (User._meta.table_name,))
+            if value is not None:
+                return value
+        return await scalar(exact_sql, exact_params)
+
+    async def acount_all(self, mode, scalars):
+        """count_all 的协程版本，scalars 是每个分片的 scalar，各分片同时统计"""
+        if mode == user_pb2.TOTAL_CACHED:
+            value = self._cached()
+            if value is None:
+                values = await asyncio.gather(*(self.acount(user_pb2.TOTAL_EXACT, scalar) for scalar in scalars))
+                value = self._store(sum(values))
+            return value
+        return sum(await asyncio.gather(*(self.acount(mode, scalar) for scalar in scalars)))
@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+
+from loguru import logger
+
+
+class Supervisor:
+    """启动 n 个工作进程并看护它们
+
+    工作进程用 spawn 启动，不继承父进程里的 gRPC、数据库连接等状态；target(index, *args) 在子进程里运行服务。
+    工作进程意外退出时重启同一个序号，刚启动就退出的按指数退避，避免配置错误时疯狂重启。
+    父进程收到 SIGTERM/SIGINT 后把 SIGTERM 转发给所有工作进程，等它们各自处理完手上的请求，
+    超过 grace 秒仍未退出的强制结束。
+    """
+
+    # 运行不到这么多秒就退出算作启动失败，重启前退避
+    MIN_UPTIME = 10
+    MAX_BACKOFF = 30
+
+    def __init__(self, target, n, args=(), grace=30):
+        self.target = target
+        self.n = n
+        self.args = args
+        self.grace = grace
+        self.stopping = False
+        self._ctx = multiprocessing.get_context("spawn")
+        self._procs = {}     # 序号 -> Process
+        self._started = {}   # 序号 -> 启动时间
+        self._failures = {}  # 序号 -> 连续启动失败次数
+        self._restarts = {}  # 序号 -> 计划重启的时间
+
+    def _start(self, index):
+        proc = self._ctx.Process(target=self.target, args=(index, *self.args), name=f"user_srv-worker-{index}")
+        proc.start()
+        self._procs[index] = proc
+        self._started[index] = time.monotonic()
+        logger.info(f"Started worker {index} (pid {proc.pid})")
+
+    def _exited(self, index):
+        proc = self._procs.pop(index)
+        proc.join()
+        uptime = time.monotonic() - self._started[index]
+        if uptime < self.MIN_UPTIME:
+            self._failures[index] = self._failures.get(index, 0) + 1
+            delay = min(self.MAX_BACKOFF, 0.5 * 2 ** (self._failures[index] - 1))
+        else:
+            self._failures[index] = 0
+            delay = 0
+        logger.warning(f"Worker {index} (pid {proc.pid}) exited with code {proc.exitcode} "
+                       f"after {uptime:.1f}s, restarting in {delay:.1f}s")
+        self._restarts[index] = time.monotonic() + delay
+
+    def _on_signal(self, signo, frame):
+        if not self.stopping:
+            logger.info(f"Received {signal.Signals(signo).name}, stopping {len(self._procs)} workers...")
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        for index in range(self.n):
+            self._start(index)
+        while not self.stopping:
+            sentinels = {proc.sentinel: index for index, proc in self._procs.items()}
+            for sentinel in wait(list(sentinels), timeout=0.5):
+                if not self.stopping:
+                    self._exited(sentinels[sentinel])
+            now = time.monotonic()
+            for index, at in list(self._restarts.items()):
+                if at <= now and not self.stopping:
+                    del self._restarts[index]
+                    self._start(index)
+        self.shutdown()
+
+    def shutdown(self):
+        for proc in self._procs.values():
+            if proc.is_alive():
+                os.kill(proc.pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.grace
+        for index, proc in self._procs.items():
+            proc.join(max(0, deadline - time.monotonic()))
+            if proc.is_alive():
+                logger.warning(f"Worker {index} (pid {proc.pid}) did not stop within {self.grace}s, killing it")
+                proc.kill()
+                proc.join()
+        logger.info("All workers stopped")
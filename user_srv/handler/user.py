@@ -1,100 +1,517 @@
 from user_srv.model.models import User
-from peewee import DoesNotExist
+from user_srv.common.cache import LocalUserCache
+from user_srv.common.hasher import PasswordHasher
+from user_srv.common.idempotency import IdempotencyStore
+from user_srv.common.total import TotalCounter
+from user_srv.model.sharding import merge_rows
+from user_srv.settings import setting
+from peewee import DoesNotExist, IntegrityError, InterfaceError, OperationalError
 import grpc
 from datetime import date
 from google.protobuf import empty_pb2
 from user_srv.proto import user_pb2_grpc, user_pb2
-from loguru import logger
-from passlib.hash import pbkdf2_sha256
+import base64
+import functools
 import time
 
+PAGE_SIZE = 10
+
+# UserInfoResponse 字段 -> User 列，读接口只查这些列，不取 password、desc 等大字段
+READ_COLUMNS = {
+    'id': User.id,
+    'mobile': User.mobile,
+    'role': User.role,
+    'nickName': User.nick_name,
+    'gender': User.gender,
+    'birthday': User.birthday,
+}
+USER_NAMES = list(READ_COLUMNS)
+USER_COLUMNS = list(READ_COLUMNS.values())
+
+
+def read_fields(mask):
+    """把 readMask 转成要返回的字段集合，mask 为空时返回 None 表示全部字段，未知字段抛 ValueError
+
+    id 总是返回，分页游标和调用方关联数据都要用到。
+    """
+    if not mask.paths:
+        return None
+    unknown = [path for path in mask.paths if path not in READ_COLUMNS]
+    if unknown:
+        raise ValueError(f"unknown read mask paths: {', '.join(unknown)}")
+    return set(mask.paths) | {'id'}
+
+
+def read_names(fields):
+    return [name for name in READ_COLUMNS if fields is None or name in fields]
+
+
+def read_columns(fields):
+    return [READ_COLUMNS[name] for name in read_names(fields)]
+
+
+@functools.lru_cache(maxsize=65536)
+def birthday_epoch(birthday):
+    """生日转成本地时间 0 点的时间戳；生日的取值很有限，缓存后每行只剩一次字典查找"""
+    return int(time.mktime(birthday.timetuple()))
+
+
+def row_values(row, names):
+    """按 names 顺序排列的行元组 -> UserInfoResponse 的字段，空值不设置，与 convUserToRsp 一致"""
+    values = {name: value for name, value in zip(names, row) if value}
+    birthday = values.get('birthday')
+    if birthday:
+        values['birthday'] = birthday_epoch(birthday)
+    return values
+
+
+def fill_users(data, rows, names):
+    """把行元组直接填进 repeated UserInfoResponse
+
+    不创建 peewee 模型，也不先建消息再 append（append 会再拷贝一次）。
+    """
+    add = data.add
+    for row in rows:
+        add(**row_values(row, names))
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """解析 nextCursor，格式不对时抛 ValueError"""
+    try:
+        prefix, last_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+    except (ValueError, UnicodeError):
+        raise ValueError(f"invalid cursor: {cursor!r}")
+    if prefix != "id" or not last_id.isdigit():
+        raise ValueError(f"invalid cursor: {cursor!r}")
+    return int(last_id)
+
 
 class UserServicer(user_pb2_grpc.UserServicer):
-    def convUserToRsp(self, user):
-        rsp = user_pb2.UserInfoResponse()
+    def __init__(self, counter=None, hasher=None, cache=None, idempotency=None, router=None, shards=None):
+        self.counter = counter or TotalCounter(setting.USER_LIST_TOTAL_MODE, setting.USER_COUNT_CACHE_TTL)
+        self.hasher = hasher or PasswordHasher(setting.PASSWORD_HASH_WORKERS)
+        self.cache = cache or LocalUserCache(setting.USER_CACHE_MAX_BYTES, setting.USER_CACHE_TTL)
+        self.idempotency = idempotency or IdempotencyStore(setting.IDEMPOTENCY_TTL, setting.IDEMPOTENCY_MAX_KEYS)
+        # 配置了只读副本时的读写分离，None 表示读写都走主库
+        self.router = router
+        # 按手机号分片时的 model.sharding.Shards，None 表示所有用户都在主库；与 router 不同时使用
+        self.shards = shards
 
+    def convUserToRsp(self, user, fields=None):
+        """fields 为 read_fields 的结果，None 表示全部字段"""
         user_info_rsp = user_pb2.UserInfoResponse()
 
         user_info_rsp.id = user.id
-        user_info_rsp.mobile = user.mobile
-        user_info_rsp.role = user.role
-        if user.nick_name:
+        if fields is None or 'mobile' in fields:
+            user_info_rsp.mobile = user.mobile
+        if fields is None or 'role' in fields:
+            user_info_rsp.role = user.role
+        if user.nick_name and (fields is None or 'nickName' in fields):
             user_info_rsp.nickName = user.nick_name
-        if user.gender:
+        if user.gender and (fields is None or 'gender' in fields):
             user_info_rsp.gender = user.gender
-        if user.birthday:
-            user_info_rsp.birthday = int(
-                time.mktime(user.birthday.timetuple()))
+        if user.birthday and (fields is None or 'birthday' in fields):
+            user_info_rsp.birthday = birthday_epoch(user.birthday)
 
         return user_info_rsp
 
-    @logger.catch
+    def primary(self):
+        """不分片时所有读写用的库"""
+        return User._meta.database
+
+    def userDatabase(self, user_id=None, mobile=None):
+        """按 id 或手机号找到用户所在的库（async 版为连接池），不分片时是主库"""
+        if self.shards is None:
+            return self.primary()
+        if user_id is not None:
+            return self.shards.for_id(user_id)
+        return self.shards.for_mobile(mobile)
+
+    def databases(self):
+        return self.shards.all() if self.shards else [self.primary()]
+
+    def groupByDatabase(self, items, field, key=lambda item: item):
+        """[(库, 落在这个库上的 items)]，key 取出每项的 id 或手机号，field 说明是哪一种"""
+        if self.shards is None:
+            return [(self.primary(), items)] if items else []
+        if field.name == 'id':
+            return self.shards.group_by_id(items, key)
+        return self.shards.group_by_mobile(items, key)
+
+    def pageOffset(self, request, per_page_numbers):
+        if request.cursor or not request.pn:
+            return 0
+        return per_page_numbers * (request.pn - 1)
+
+    def pageQuery(self, request, users):
+        """给查询加上分页条件，返回 (query, 每页条数)
+
+        带 cursor 时走 WHERE id > ? ORDER BY id LIMIT n 的 keyset 分页，
+        否则兼容老的 pn/pSize。两种方式都多取一行，用来判断是否还有下一页。
+        """
+        per_page_numbers = request.pSize or PAGE_SIZE
+        users = users.order_by(User.id)
+        if request.cursor:
+            users = users.where(User.id > decode_cursor(request.cursor))
+        elif request.pn:
+            users = users.offset(self.pageOffset(request, per_page_numbers))
+        return users.limit(per_page_numbers + 1), per_page_numbers
+
+    def shardPage(self, request, users, per_page_numbers):
+        """分片上的分页查询，返回 (每个分片上执行的 query, 合并后要跳过的行数)
+
+        id 在各分片间交错，pn 分页时每个分片都要从头取到 offset + pSize + 1 行，归并后再跳过 offset 行，
+        页码越深越贵；cursor 分页每个分片只取 pSize + 1 行。
+        """
+        offset = self.pageOffset(request, per_page_numbers)
+        return users.offset(None).limit(offset + per_page_numbers + 1), offset
+
+    def fillPage(self, rsp, rows, per_page_numbers, fields=None):
+        """rows 是按 read_names(fields) 顺序排列的元组，第一列总是 id"""
+        rows = list(rows)
+        if len(rows) > per_page_numbers:
+            rows = rows[:per_page_numbers]
+            rsp.nextCursor = encode_cursor(rows[-1][0])
+        fill_users(rsp.data, rows, read_names(fields))
+        return rsp
+
+    def onReplica(self, read, user_id=None, mobile=None):
+        """在 router 选出的副本上执行 read(database)，返回 (结果, 是否在副本上执行)
+
+        没有副本、用户刚被写过或副本都不可用时在主库执行；副本上的查询出错时暂停这个副本并回到主库重试。
+        """
+        replica = self.router.pick(user_id, mobile) if self.router else None
+        if replica is not None:
+            try:
+                return read(replica.target), True
+            except (OperationalError, InterfaceError) as e:
+                self.router.failed(replica, e)
+        return read(self.userDatabase(user_id, mobile)), False
+
+    def readUser(self, read, user_id=None, mobile=None):
+        """读单个用户；按手机号从副本读到的用户如果刚被写过，再到主库读一次"""
+        user, on_replica = self.onReplica(read, user_id, mobile)
+        if on_replica and user is not None and self.router.sticky(user_id=user.id):
+            user = read(User._meta.database)
+        return user
+
+    def wrote(self, user_id=None, mobile=None):
+        if self.router:
+            self.router.wrote(user_id, mobile)
+
+    def batchResponse(self, keys, users):
+        rsp = user_pb2.BatchUserResponse()
+        for key in keys:
+            user = users.get(key)
+            rsp.data.append(self.convUserToRsp(user) if user is not None else user_pb2.UserInfoResponse())
+            rsp.found.append(user is not None)
+        return rsp
+
+    def batchUsers(self, keys, field, cached):
+        """按 keys 的顺序批量取用户
+
+        先批量查缓存，未命中的键去重后按 BATCH_CHUNK_SIZE 分块，每块一条 WHERE field IN (...)。
+        """
+        unique = list(dict.fromkeys(keys))
+        users = cached(unique)
+        misses = [key for key in unique if key not in users]
+        version = self.cache.version
+        for database, group in self.groupByDatabase(misses, field):
+            for start in range(0, len(group), setting.BATCH_CHUNK_SIZE):
+                rows = User.select(*USER_COLUMNS).where(
+                    field.in_(group[start:start + setting.BATCH_CHUNK_SIZE])).bind(database)
+                for user in self.cache.put_many(rows, version):
+                    users[getattr(user, field.name)] = user
+        return self.batchResponse(keys, users)
+
+    def batchTooLarge(self, keys, context):
+        if len(keys) <= setting.BATCH_MAX_SIZE:
+            return False
+        context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+        context.set_details(f'At most {setting.BATCH_MAX_SIZE} keys per batch')
+        return True
+
+    def splitBatch(self, batch, existing, seen):
+        """按手机号去重，返回 (待插入的 [(index, info)], 失败结果)
+
+        existing 是数据库里已有的手机号，seen 是本次流里已经收到过的手机号。
+        """
+        pending, failed = [], []
+        for index, info in batch:
+            if info.mobile in existing:
+                error = 'User already exists'
+            elif info.mobile in seen:
+                error = 'Duplicate mobile in stream'
+            else:
+                seen.add(info.mobile)
+                pending.append((index, info))
+                continue
+            failed.append(user_pb2.CreateUserResult(index=index, mobile=info.mobile, error=error))
+        return pending, failed
+
+    def batchRows(self, pending, passwords):
+        return [{'mobile': info.mobile, 'nick_name': info.nickName, 'password': password}
+                for (_, info), password in zip(pending, passwords)]
+
+    def batchCreated(self, created, ids):
+        """插入完成后的收尾：更新计数、失效缓存，生成成功结果"""
+        self.counter.on_create(len(created))
+        for _, info in created:
+            self.cache.invalidate(mobile=info.mobile)
+        return [user_pb2.CreateUserResult(index=index, mobile=info.mobile, id=ids[info.mobile], created=True)
+                for index, info in created]
+
+    def createBatch(self, batch, seen):
+        """创建一批用户：按手机号分到各自的库，每个库上一次查重、并行哈希、一条多行 INSERT"""
+        results = []
+        for database, group in self.groupByDatabase(batch, User.mobile, key=lambda item: item[1].mobile):
+            results.extend(self.createBatchIn(database, group, seen))
+        return results
+
+    def createBatchIn(self, database, batch, seen):
+        mobiles = [info.mobile for _, info in batch]
+        existing = {user.mobile for user in User.select(User.mobile).where(User.mobile.in_(mobiles)).bind(database)}
+        pending, results = self.splitBatch(batch, existing, seen)
+        if not pending:
+            return results
+
+        rows = self.batchRows(pending, self.hasher.hash_many([info.passWord for _, info in pending]))
+        try:
+            with database.atomic():
+                User.insert_many(rows).execute(database)
+            created = pending
+        except IntegrityError:
+            # 和并发的 CreateUser 撞了手机号，逐行插入找出冲突的行，其余照常创建
+            created = []
+            for (index, info), row in zip(pending, rows):
+                try:
+                    with database.atomic():
+                        User.insert(row).execute(database)
+                    created.append((index, info))
+                except IntegrityError:
+                    results.append(user_pb2.CreateUserResult(
+                        index=index, mobile=info.mobile, error='User already exists'))
+        if created:
+            query = User.select(User.mobile, User.id).where(User.mobile.in_([info.mobile for _, info in created]))
+            results.extend(self.batchCreated(created, dict(query.bind(database).tuples())))
+        return results
+
+    def batchResult(self, results):
+        rsp = user_pb2.CreateUsersResponse()
+        rsp.results.extend(sorted(results, key=lambda result: result.index))
+        rsp.created = sum(result.created for result in results)
+        rsp.failed = len(results) - rsp.created
+        return rsp
+
+    def streamChunk(self, request):
+        """StreamUsers 每次查库的行数，不超过 STREAM_MAX_CHUNK_SIZE"""
+        return min(request.chunkSize or setting.STREAM_CHUNK_SIZE, setting.STREAM_MAX_CHUNK_SIZE)
+
+    def updateFields(self, request):
+        """把 updateMask 转成 {列: 新值}，mask 为空时更新全部字段，未知字段抛 ValueError"""
+        columns = {
+            'nickName': (User.nick_name, lambda: request.nickName),
+            'gender': (User.gender, lambda: request.gender),
+            'birthday': (User.birthday, lambda: date.fromtimestamp(request.birthday)),
+        }
+        paths = request.updateMask.paths or columns.keys()
+        unknown = [path for path in paths if path not in columns]
+        if unknown:
+            raise ValueError(f"unknown update mask paths: {', '.join(unknown)}")
+        return {columns[path][0]: columns[path][1]() for path in paths}
+
     def GetUserList(self, request, context):
         rsp = user_pb2.UserListResponse()
 
-        users = User.select()
-        rsp.total = users.count()
+        try:
+            fields = read_fields(request.readMask)
+            users, per_page_numbers = self.pageQuery(request, User.select(*read_columns(fields)))
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+            return rsp
 
-        start = 0
-        per_page_numbers = 10
-        if request.pSize:
-            per_page_numbers = request.pSize
-        if request.pn:
-            start = per_page_numbers * (request.pn - 1)
-        users = users.offset(start).limit(per_page_numbers)
-        for user in users:
-            user_info_rsp = self.convUserToRsp(user)
-            rsp.data.append(user_info_rsp)
+        rsp.totalMode = self.counter.resolve(request.totalMode)
+        if self.shards:
+            rsp.total, rows = self.gatherPage(rsp.totalMode, request, users, per_page_numbers)
+            return self.fillPage(rsp, rows, per_page_numbers, fields)
 
-        return rsp
+        def readPage(database):
+            return self.counter.count(rsp.totalMode, database), list(users.bind(database).tuples())
 
-    @logger.catch
-    def GetUserById(self, request, context):
+        (rsp.total, rows), _ = self.onReplica(readPage)
+        return self.fillPage(rsp, rows, per_page_numbers, fields)
+
+    def gatherPage(self, mode, request, users, per_page_numbers):
+        """在每个分片上查一页再按 id 归并，返回 (total, 行)"""
+        users, offset = self.shardPage(request, users, per_page_numbers)
+        databases = self.databases()
+        pages = [list(users.bind(database).tuples()) for database in databases]
+        return self.counter.count_all(mode, databases), list(merge_rows(pages, offset, per_page_numbers + 1))
+
+    def scanRows(self, database, last_id, chunk, context):
+        """按 id 顺序逐块读出一个库里 id > last_id 的用户，产出行元组"""
+        while context.is_active():
+            users = User.select(*USER_COLUMNS).where(User.id > last_id).order_by(User.id).limit(chunk)
+            n = 0
+            for row in users.bind(database).tuples().iterator():
+                yield row
+                last_id = row[0]
+                n += 1
+            if n < chunk:
+                return
+
+    def StreamUsers(self, request, context):
+        """按 id 顺序导出全部用户
+
+        每次用 WHERE id > ? ORDER BY id LIMIT n 取一块，发送完再取下一块，
+        内存里最多只有一块数据，也不需要 COUNT 和 OFFSET。分片时每个分片各读各的块，按 id 归并后发送。
+        """
+        chunk = self.streamChunk(request)
+        for row in merge_rows([self.scanRows(database, request.afterId, chunk, context)
+                               for database in self.databases()]):
+            yield user_pb2.UserInfoResponse(**row_values(row, USER_NAMES))
+
+    def readMask(self, request, context):
+        """解析单条读接口的 readMask，返回 (是否有效, 字段集合)"""
         try:
-            user = User.get(User.id == request.id)
-            return self.convUserToRsp(user)
-        except DoesNotExist:
+            return True, read_fields(request.readMask)
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+            return False, None
+
+    def userFound(self, user, fields, context):
+        if user is None:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details('User not found')
             return user_pb2.UserInfoResponse()
+        return self.convUserToRsp(user, fields)
+
+    # 缓存里存的是完整的读字段，readMask 只裁剪返回给调用方的字段
+    def GetUserById(self, request, context):
+        ok, fields = self.readMask(request, context)
+        if not ok:
+            return user_pb2.UserInfoResponse()
+        query = User.select(*USER_COLUMNS).where(User.id == request.id)
+        user = self.cache.load_by_id(request.id, lambda: self.readUser(
+            lambda database: query.bind(database).get_or_none(), user_id=request.id))
+        return self.userFound(user, fields, context)
 
-    @logger.catch
     def GetUserByMobile(self, request, context):
-        try:
-            user = User.get(User.mobile == request.mobile)
-            return self.convUserToRsp(user)
-        except DoesNotExist:
-            context.set_code(grpc.StatusCode.NOT_FOUND)
-            context.set_details('User not found')
+        ok, fields = self.readMask(request, context)
+        if not ok:
             return user_pb2.UserInfoResponse()
+        query = User.select(*USER_COLUMNS).where(User.mobile == request.mobile)
+        user = self.cache.load_by_mobile(request.mobile, lambda: self.readUser(
+            lambda database: query.bind(database).get_or_none(), mobile=request.mobile))
+        return self.userFound(user, fields, context)
+
+    def BatchGetUsersById(self, request, context):
+        if self.batchTooLarge(request.ids, context):
+            return user_pb2.BatchUserResponse()
+        return self.batchUsers(list(request.ids), User.id, self.cache.get_many_by_id)
+
+    def BatchGetUsersByMobile(self, request, context):
+        if self.batchTooLarge(request.mobiles, context):
+            return user_pb2.BatchUserResponse()
+        return self.batchUsers(list(request.mobiles), User.mobile, self.cache.get_many_by_mobile)
+
+    def idempotencyKey(self, request):
+        """幂等键按手机号隔离，同一个键换了手机号不会拿到别人的结果"""
+        if request.idempotencyKey:
+            return f"CreateUser:{request.mobile}:{request.idempotencyKey}"
+        return None
+
+    def createConflict(self, key, context):
+        # 同一个幂等键的并发重试可能刚刚插入成功
+        if key:
+            rsp = self.idempotency.lookup(key, user_pb2.UserInfoResponse)
+            if rsp is not None:
+                return rsp
+        context.set_details('User already exists')
+        context.set_code(grpc.StatusCode.ALREADY_EXISTS)
+        return user_pb2.UserInfoResponse()
+
+    def userCreated(self, user, key):
+        self.counter.on_create()
+        self.wrote(user.id, user.mobile)
+        self.cache.invalidate(mobile=user.mobile)
+        rsp = self.convUserToRsp(user)
+        if key:
+            self.idempotency.remember(key, rsp)
+        return rsp
 
-    @logger.catch
     def CreateUser(self, request, context):
-        try:
-            user = User.get(User.mobile == request.mobile)
-            context.set_details('User already exists')
-            context.set_code(grpc.StatusCode.ALREADY_EXISTS)
-            return user_pb2.UserInfoResponse()
-        except DoesNotExist:
-            pass
+        """一条 INSERT 完成创建，手机号冲突由唯一索引判断并返回 ALREADY_EXISTS"""
+        key = self.idempotencyKey(request)
+        if key:
+            rsp = self.idempotency.lookup(key, user_pb2.UserInfoResponse)
+            if rsp is not None:
+                return rsp
+
         user = User()
         user.nick_name = request.nickName
-        user.password = pbkdf2_sha256.hash(request.passWord)
+        user.password = self.hasher.hash(request.passWord)
         user.mobile = request.mobile
-        user.save()
+        try:
+            user.id = User.insert(nick_name=user.nick_name, password=user.password, mobile=user.mobile).execute(
+                self.userDatabase(mobile=user.mobile))
+        except IntegrityError:
+            return self.createConflict(key, context)
 
-        return self.convUserToRsp(user)
+        return self.userCreated(user, key)
+
+    def CreateUsers(self, request_iterator, context):
+        """客户端流式批量创建，每凑满 CREATE_USERS_BATCH_SIZE 条处理一批
+
+        重复的手机号只在对应行的结果里报错，不会中断整个流。
+        """
+        results, batch, seen = [], [], set()
+        for index, info in enumerate(request_iterator):
+            batch.append((index, info))
+            if len(batch) >= setting.CREATE_USERS_BATCH_SIZE:
+                results.extend(self.createBatch(batch, seen))
+                batch = []
+        if batch:
+            results.extend(self.createBatch(batch, seen))
+        return self.batchResult(results)
 
-    @logger.catch
     def UpdateUser(self, request, context):
+        """只更新 updateMask 里的列，一条 UPDATE，按影响行数判断用户是否存在"""
         try:
-            user = User.get(User.id == request.id)
-            user.nick_name = request.nickName
-            user.gender = request.gender
-            user.birthday = date.fromtimestamp(request.birthday)
-            user.save()
+            fields = self.updateFields(request)
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
             return empty_pb2.Empty()
-        except DoesNotExist:
+
+        if not User.update(fields).where(User.id == request.id).execute(self.userDatabase(user_id=request.id)):
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details('User not found')
             return empty_pb2.Empty()
+        self.wrote(user_id=request.id)
+        self.cache.invalidate(user_id=request.id)
+        return empty_pb2.Empty()
+
+    def CheckPassword(self, request, context):
+        database = self.userDatabase(mobile=request.mobile)
+        try:
+            user = User.select(User.id, User.password).where(User.mobile == request.mobile).bind(database).get()
+        except DoesNotExist:
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            context.set_details('User not found')
+            return user_pb2.CheckResponse()
+
+        if not self.hasher.verify(request.passWord, user.password):
+            return user_pb2.CheckResponse(success=False)
+
+        if self.hasher.needs_update(user.password):
+            # 哈希参数已过期，趁登录成功拿到明文时就地升级；期间密码被改过就放弃
+            User.update(password=self.hasher.hash(request.passWord)).where(
+                (User.id == user.id) & (User.password == user.password)).execute(database)
+        return user_pb2.CheckResponse(success=True, id=user.id)
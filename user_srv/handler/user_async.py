@@ -0,0 +1,305 @@
+import asyncio
+import functools
+
+import aiomysql
+import grpc
+import pymysql
+from google.protobuf import empty_pb2
+from pymysql.constants import CLIENT
+
+from user_srv.common import sql_trace
+from user_srv.handler.user import (
+    USER_COLUMNS,
+    USER_NAMES,
+    UserServicer,
+    read_columns,
+    read_fields,
+    row_values,
+)
+from user_srv.model.models import User
+from user_srv.model.sharding import amerge_rows, merge_rows
+from user_srv.proto import user_pb2
+from user_srv.settings import setting
+
+
+async def create_pool(minsize=1, maxsize=setting.ASYNC_POOL_SIZE, host=setting.MYSQL_HOST, port=setting.MYSQL_PORT,
+                      db=setting.MYSQL_DB, init_command=None):
+    return await aiomysql.create_pool(
+        host=host,
+        port=port,
+        user=setting.MYSQL_USER,
+        password=setting.MYSQL_PASSWORD,
+        db=db,
+        charset="utf8mb4",
+        autocommit=True,
+        client_flag=CLIENT.FOUND_ROWS,
+        init_command=init_command,
+        minsize=minsize,
+        maxsize=maxsize,
+    )
+
+
+class AsyncUserServicer(UserServicer):
+    """grpc.aio 版本的 UserServicer
+
+    SQL 仍由 peewee 的查询构造器生成，只是通过 aiomysql 连接池非阻塞地执行，
+    所有请求共享一个事件循环。
+    """
+
+    def __init__(self, pool, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = pool
+
+    def primary(self):
+        return self.pool
+
+    async def _fetchall(self, query, pool=None):
+        sql, params = query.sql()
+        async with (pool or self.pool).acquire() as conn, conn.cursor(aiomysql.DictCursor) as cursor:
+            with sql_trace.timed(sql, params):
+                await cursor.execute(sql, params)
+            return await cursor.fetchall()
+
+    async def _fetchrows(self, query, pool=None):
+        """返回元组形式的结果，列顺序与 query 的 select 一致"""
+        sql, params = query.sql()
+        async with (pool or self.pool).acquire() as conn, conn.cursor() as cursor:
+            with sql_trace.timed(sql, params):
+                await cursor.execute(sql, params)
+            return await cursor.fetchall()
+
+    async def _scalar(self, sql, params, pool=None):
+        async with (pool or self.pool).acquire() as conn, conn.cursor() as cursor:
+            with sql_trace.timed(sql, params):
+                await cursor.execute(sql, params)
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+    async def _get(self, query, pool=None):
+        rows = await self._fetchall(query.limit(1), pool)
+        if not rows:
+            return None
+        return User(**rows[0])
+
+    async def _execute(self, query, pool=None):
+        sql, params = query.sql()
+        async with (pool or self.pool).acquire() as conn, conn.cursor() as cursor:
+            with sql_trace.timed(sql, params):
+                await cursor.execute(sql, params)
+            return cursor.lastrowid
+
+    async def _affected(self, query, pool=None):
+        """执行 UPDATE/DELETE，返回匹配的行数（连接带 FOUND_ROWS）"""
+        sql, params = query.sql()
+        async with (pool or self.pool).acquire() as conn, conn.cursor() as cursor:
+            with sql_trace.timed(sql, params):
+                await cursor.execute(sql, params)
+            return cursor.rowcount
+
+    async def _onReplica(self, read, user_id=None, mobile=None):
+        """UserServicer.onReplica 的协程版本，read(pool) 是协程函数"""
+        replica = self.router.pick(user_id, mobile) if self.router else None
+        if replica is not None:
+            try:
+                return await read(replica.target), True
+            except (pymysql.OperationalError, pymysql.InterfaceError, OSError) as e:
+                self.router.failed(replica, e)
+        return await read(self.userDatabase(user_id, mobile)), False
+
+    async def _readUser(self, query, user_id=None, mobile=None):
+        user, on_replica = await self._onReplica(functools.partial(self._get, query), user_id, mobile)
+        if on_replica and user is not None and self.router.sticky(user_id=user.id):
+            user = await self._get(query)
+        return user
+
+    async def GetUserList(self, request, context):
+        rsp = user_pb2.UserListResponse()
+
+        try:
+            fields = read_fields(request.readMask)
+            users, per_page_numbers = self.pageQuery(request, User.select(*read_columns(fields)))
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+            return rsp
+
+        rsp.totalMode = self.counter.resolve(request.totalMode)
+        if self.shards:
+            rsp.total, rows = await self._gatherPage(rsp.totalMode, request, users, per_page_numbers)
+            return self.fillPage(rsp, rows, per_page_numbers, fields)
+
+        async def readPage(pool):
+            total = await self.counter.acount(rsp.totalMode, functools.partial(self._scalar, pool=pool))
+            return total, await self._fetchrows(users, pool)
+
+        (rsp.total, rows), _ = await self._onReplica(readPage)
+        return self.fillPage(rsp, rows, per_page_numbers, fields)
+
+    async def _gatherPage(self, mode, request, users, per_page_numbers):
+        """UserServicer.gatherPage 的协程版本，各分片同时查询"""
+        users, offset = self.shardPage(request, users, per_page_numbers)
+        pools = self.databases()
+        total, *pages = await asyncio.gather(
+            self.counter.acount_all(mode, [functools.partial(self._scalar, pool=pool) for pool in pools]),
+            *(self._fetchrows(users, pool) for pool in pools))
+        return total, list(merge_rows(pages, offset, per_page_numbers + 1))
+
+    async def _scanRows(self, pool, last_id, chunk, context):
+        while not context.done():
+            rows = await self._fetchrows(
+                User.select(*USER_COLUMNS).where(User.id > last_id).order_by(User.id).limit(chunk), pool)
+            for row in rows:
+                yield row
+            if len(rows) < chunk:
+                return
+            last_id = rows[-1][0]
+
+    async def StreamUsers(self, request, context):
+        chunk = self.streamChunk(request)
+        async for row in amerge_rows([self._scanRows(pool, request.afterId, chunk, context)
+                                      for pool in self.databases()]):
+            yield user_pb2.UserInfoResponse(**row_values(row, USER_NAMES))
+
+    async def GetUserById(self, request, context):
+        ok, fields = self.readMask(request, context)
+        if not ok:
+            return user_pb2.UserInfoResponse()
+        user = self.cache.get_by_id(request.id)
+        if user is None:
+            version = self.cache.version
+            user = await self._readUser(User.select(*USER_COLUMNS).where(User.id == request.id), user_id=request.id)
+            if user is not None:
+                user = self.cache.put(user, version)
+        return self.userFound(user, fields, context)
+
+    async def GetUserByMobile(self, request, context):
+        ok, fields = self.readMask(request, context)
+        if not ok:
+            return user_pb2.UserInfoResponse()
+        user = self.cache.get_by_mobile(request.mobile)
+        if user is None:
+            version = self.cache.version
+            user = await self._readUser(User.select(*USER_COLUMNS).where(User.mobile == request.mobile),
+                                        mobile=request.mobile)
+            if user is not None:
+                user = self.cache.put(user, version)
+        return self.userFound(user, fields, context)
+
+    async def _batchUsers(self, keys, field, cached):
+        unique = list(dict.fromkeys(keys))
+        users = cached(unique)
+        misses = [key for key in unique if key not in users]
+        version = self.cache.version
+        for pool, group in self.groupByDatabase(misses, field):
+            for start in range(0, len(group), setting.BATCH_CHUNK_SIZE):
+                rows = await self._fetchall(
+                    User.select(*USER_COLUMNS).where(field.in_(group[start:start + setting.BATCH_CHUNK_SIZE])), pool)
+                for user in self.cache.put_many([User(**row) for row in rows], version):
+                    users[getattr(user, field.name)] = user
+        return self.batchResponse(keys, users)
+
+    async def BatchGetUsersById(self, request, context):
+        if self.batchTooLarge(request.ids, context):
+            return user_pb2.BatchUserResponse()
+        return await self._batchUsers(list(request.ids), User.id, self.cache.get_many_by_id)
+
+    async def BatchGetUsersByMobile(self, request, context):
+        if self.batchTooLarge(request.mobiles, context):
+            return user_pb2.BatchUserResponse()
+        return await self._batchUsers(list(request.mobiles), User.mobile, self.cache.get_many_by_mobile)
+
+    async def CreateUser(self, request, context):
+        key = self.idempotencyKey(request)
+        if key:
+            rsp = self.idempotency.lookup(key, user_pb2.UserInfoResponse)
+            if rsp is not None:
+                return rsp
+
+        password = await self.hasher.ahash(request.passWord)
+
+        user = User(nick_name=request.nickName, password=password, mobile=request.mobile)
+        try:
+            user.id = await self._execute(User.insert(
+                nick_name=user.nick_name, password=user.password, mobile=user.mobile), self.userDatabase(mobile=user.mobile))
+        except aiomysql.IntegrityError:
+            return self.createConflict(key, context)
+
+        return self.userCreated(user, key)
+
+    async def _createBatch(self, batch, seen):
+        # 各库上的手机号互不相同，分别查重和插入互不影响，可以同时进行
+        groups = await asyncio.gather(*(self._createBatchIn(pool, group, seen) for pool, group in
+                                        self.groupByDatabase(batch, User.mobile, key=lambda item: item[1].mobile)))
+        return [result for results in groups for result in results]
+
+    async def _createBatchIn(self, pool, batch, seen):
+        mobiles = [info.mobile for _, info in batch]
+        rows = await self._fetchall(User.select(User.mobile).where(User.mobile.in_(mobiles)), pool)
+        pending, results = self.splitBatch(batch, {row['mobile'] for row in rows}, seen)
+        if not pending:
+            return results
+
+        rows = self.batchRows(pending, await self.hasher.ahash_many([info.passWord for _, info in pending]))
+        try:
+            # 连接池是 autocommit 的，一条多行 INSERT 本身就是一个事务
+            await self._execute(User.insert_many(rows), pool)
+            created = pending
+        except aiomysql.IntegrityError:
+            created = []
+            for (index, info), row in zip(pending, rows):
+                try:
+                    await self._execute(User.insert(row), pool)
+                    created.append((index, info))
+                except aiomysql.IntegrityError:
+                    results.append(user_pb2.CreateUserResult(
+                        index=index, mobile=info.mobile, error='User already exists'))
+        if created:
+            rows = await self._fetchall(User.select(User.mobile, User.id).where(
+                User.mobile.in_([info.mobile for _, info in created])), pool)
+            results.extend(self.batchCreated(created, {row['mobile']: row['id'] for row in rows}))
+        return results
+
+    async def CreateUsers(self, request_iterator, context):
+        results, batch, seen, index = [], [], set(), 0
+        async for info in request_iterator:
+            batch.append((index, info))
+            index += 1
+            if len(batch) >= setting.CREATE_USERS_BATCH_SIZE:
+                results.extend(await self._createBatch(batch, seen))
+                batch = []
+        if batch:
+            results.extend(await self._createBatch(batch, seen))
+        return self.batchResult(results)
+
+    async def UpdateUser(self, request, context):
+        try:
+            fields = self.updateFields(request)
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+            return empty_pb2.Empty()
+
+        if not await self._affected(User.update(fields).where(User.id == request.id), self.userDatabase(user_id=request.id)):
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            context.set_details('User not found')
+            return empty_pb2.Empty()
+        self.wrote(user_id=request.id)
+        self.cache.invalidate(user_id=request.id)
+        return empty_pb2.Empty()
+
+    async def CheckPassword(self, request, context):
+        pool = self.userDatabase(mobile=request.mobile)
+        user = await self._get(User.select(User.id, User.password).where(User.mobile == request.mobile), pool)
+        if user is None:
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            context.set_details('User not found')
+            return user_pb2.CheckResponse()
+
+        if not await self.hasher.averify(request.passWord, user.password):
+            return user_pb2.CheckResponse(success=False)
+
+        if self.hasher.needs_update(user.password):
+            password = await self.hasher.ahash(request.passWord)
+            await self._execute(User.update(password=password).where(
+                (User.id == user.id) & (User.password == user.password)), pool)
+        return user_pb2.CheckResponse(success=True, id=user.id)
@@ -0,0 +1,163 @@
+"""分片的建库、迁移和扩容工具：python -m user_srv.model.reshard
+
+    # 按 MYSQL_SHARDS 建出每个逻辑分片的库和 user 表
+    python -m user_srv.model.reshard init
+    # 把不分片时的 user 表（MYSQL_DB.user）搬进各分片，id 重新分配，新旧 id 对应关系写进 MYSQL_DB.user_id_map
+    python -m user_srv.model.reshard backfill
+    # 扩容：把逻辑分片 8-15 原样复制到新实例，核对行数后输出新的 MYSQL_SHARDS
+    python -m user_srv.model.reshard move --slots 8-15 --to 10.0.0.4:3306
+
+backfill 和 move 都按 id 分块、可以中断后重跑：backfill 从 user_id_map 里最大的旧 id 之后继续，
+move 用 REPLACE 写入，重复复制同一行没有副作用。move 不停写，复制完成后先把这些分片设为只读
+（或停掉服务）再重跑一次补上增量，然后用输出的 MYSQL_SHARDS 重启服务，最后删除旧实例上的库。
+"""
+import argparse
+import sys
+
+import pymysql
+from loguru import logger
+from peewee import IntegerField, Model
+
+from user_srv.model.models import User
+from user_srv.model.sharding import Shards, shard_database
+from user_srv.settings import setting
+
+CHUNK_SIZE = 1000
+
+
+class UserIdMap(Model):
+    """backfill 时旧 id 到新 id 的对应关系，留在原来的库里给下游按旧 id 关联的数据迁移用"""
+    old_id = IntegerField(primary_key=True)
+    new_id = IntegerField(index=True)
+
+    class Meta:
+        database = setting.DB
+        table_name = 'user_id_map'
+
+
+def parse_slots(text, slots):
+    """"8-15" 或 "3" -> [8, ..., 15]"""
+    first, _, last = text.partition("-")
+    chosen = list(range(int(first), int(last or first) + 1))
+    if not chosen or chosen[0] < 0 or chosen[-1] >= slots:
+        raise ValueError(f"slots {text!r} out of range 0-{slots - 1}")
+    return chosen
+
+
+def create_database(host, port, name):
+    conn = pymysql.connect(host=host, port=port, user=setting.MYSQL_USER, password=setting.MYSQL_PASSWORD)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{name}` DEFAULT CHARACTER SET utf8mb4")
+    finally:
+        conn.close()
+
+
+def init_slot(slot, host, port, slots):
+    create_database(host, port, setting.shard_name(slot))
+    database = shard_database(slot, host, port, slots)
+    with User.bind_ctx(database):
+        database.create_tables([User])
+    return database
+
+
+def chunks(query, database, last_id=0):
+    """按 id 顺序逐块读出 query 的结果（模型实例），每块一个列表"""
+    while True:
+        rows = list(query.where(User.id > last_id).order_by(User.id).limit(CHUNK_SIZE).bind(database))
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def init(addresses):
+    for slot, (host, port) in enumerate(addresses):
+        init_slot(slot, host, port, len(addresses))
+        logger.info(f"slot {slot}: {host}:{port}/{setting.shard_name(slot)} ready")
+
+
+def backfill(addresses):
+    """把 setting.DB 上不分片的 user 表按手机号分进各分片，新 id 由分片按自己的剩余类分配"""
+    shards = Shards(init_slot(slot, host, port, len(addresses)) for slot, (host, port) in enumerate(addresses))
+    source = setting.DB
+    source.create_tables([UserIdMap])
+    last_id = UserIdMap.select(UserIdMap.old_id).order_by(UserIdMap.old_id.desc()).scalar() or 0
+    copied = 0
+    for users in chunks(User.select(), source, last_id):
+        new_ids = {}
+        for database, group in shards.group_by_mobile(users, key=lambda user: user.mobile):
+            rows = [{field: getattr(user, field) for field in User._meta.fields if field != 'id'} for user in group]
+            with database.atomic():
+                # 上次在写 user_id_map 之前中断的话，这些手机号已经在分片里了
+                User.insert_many(rows).on_conflict_ignore().execute(database)
+            query = User.select(User.mobile, User.id).where(User.mobile.in_([user.mobile for user in group]))
+            new_ids.update(query.bind(database).tuples())
+        with source.atomic():
+            UserIdMap.insert_many([(user.id, new_ids[user.mobile]) for user in users],
+                                  fields=[UserIdMap.old_id, UserIdMap.new_id]).on_conflict_ignore().execute()
+        copied += len(users)
+        logger.info(f"backfilled {copied} users, up to old id {users[-1].id}")
+    logger.info(f"backfill done, {copied} users copied this run")
+
+
+def move(addresses, slots, host, port):
+    """把 slots 原样复制到 host:port 上，id 不变；返回新的分片地址"""
+    moved = list(addresses)
+    for slot in slots:
+        old_host, old_port = addresses[slot]
+        source = shard_database(slot, old_host, old_port, len(addresses))
+        target = init_slot(slot, host, port, len(addresses))
+        copied = 0
+        for users in chunks(User.select(), source):
+            rows = [{field: getattr(user, field) for field in User._meta.fields} for user in users]
+            with target.atomic():
+                User.insert_many(rows).on_conflict_replace().execute(target)
+            copied += len(users)
+        expected, actual = User.select().count(source), User.select().count(target)
+        if expected != actual:
+            raise RuntimeError(f"slot {slot}: {actual} rows on {host}:{port}, expected {expected}")
+        logger.info(f"slot {slot}: copied {copied} rows from {old_host}:{old_port} to {host}:{port}")
+        moved[slot] = (host, port)
+    return moved
+
+
+def format_addresses(addresses):
+    """shard_addresses 的逆运算，连续的分片合并成一段"""
+    ranges = []
+    for slot, address in enumerate(addresses):
+        if ranges and ranges[-1][2] == address and ranges[-1][1] == slot - 1:
+            ranges[-1][1] = slot
+        else:
+            ranges.append([slot, slot, address])
+    return ",".join(f"{first}-{last}={host}:{port}" if first != last else f"{first}={host}:{port}"
+                    for first, last, (host, port) in ranges)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="create, backfill and rebalance the mobile-sharded user databases")
+    parser.add_argument('--shards', type=str, default=setting.MYSQL_SHARDS, help='current slot map, e.g. 0-7=10.0.0.2:3306,8-15=10.0.0.3:3306')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('init', help='create every slot database and its user table')
+    commands.add_parser('backfill', help='copy the unsharded user table into the shards, recording new ids in user_id_map')
+    move_parser = commands.add_parser('move', help='copy slots to another MySQL instance and print the new slot map')
+    move_parser.add_argument('--slots', type=str, required=True, help='slot or slot range to move, e.g. 8-15')
+    move_parser.add_argument('--to', type=str, required=True, help='host:port of the new instance')
+    args = parser.parse_args()
+
+    if not args.shards:
+        parser.error("--shards (or MYSQL_SHARDS) is required")
+    addresses = setting.shard_addresses(args.shards)
+    if args.command == 'init':
+        init(addresses)
+    elif args.command == 'backfill':
+        backfill(addresses)
+    else:
+        host, _, port = args.to.partition(":")
+        moved = move(addresses, parse_slots(args.slots, len(addresses)), host, int(port or setting.MYSQL_PORT))
+        print(f"MYSQL_SHARDS={format_addresses(moved)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
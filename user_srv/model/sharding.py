@@ -0,0 +1,89 @@
+"""按手机号哈希分片的用户存储
+
+用户按 crc32(mobile) 分到 SHARD_SLOTS 个逻辑分片，每个逻辑分片是某个 MySQL 实例上单独的库
+{MYSQL_DB}_{slot:02d}，表结构与不分片时相同。逻辑分片数写进了用户 id：连接上设置
+auto_increment_increment = SHARD_SLOTS、auto_increment_offset = slot + 1，分片 slot 里的 id 都满足
+(id - 1) % SHARD_SLOTS == slot，按 id 或手机号都能直接算出唯一的分片，不需要目录表。
+
+扩容时不改逻辑分片数，而是把一部分逻辑分片搬到新的实例上（见 user_srv.model.reshard）。
+"""
+import asyncio
+import heapq
+import itertools
+import zlib
+from operator import itemgetter
+
+from user_srv.settings import setting
+
+
+def slot_for_mobile(mobile, slots):
+    # crc32 在各个进程、各个版本的 Python 里结果一致，不能用受 PYTHONHASHSEED 影响的 hash()
+    return zlib.crc32(mobile.encode()) % slots
+
+
+def slot_for_id(user_id, slots):
+    return (user_id - 1) % slots
+
+
+def id_init_command(slot, slots):
+    """新连接上执行的语句，让这个分片自增出来的 id 落在 slot 对应的剩余类里"""
+    return f"SET SESSION auto_increment_increment = {slots}, auto_increment_offset = {slot + 1}"
+
+
+def shard_database(slot, host, port, slots):
+    """逻辑分片 slot 的 peewee 连接池"""
+    return setting.mysql_database(host, port, setting.shard_name(slot), init_command=id_init_command(slot, slots))
+
+
+def merge_rows(pages, offset=0, limit=None):
+    """把各分片按 id 升序排好的行元组归并成一个有序迭代器，第一列是 id；跳过前 offset 行，最多取 limit 行"""
+    rows = heapq.merge(*pages, key=itemgetter(0))
+    return itertools.islice(rows, offset, None if limit is None else offset + limit)
+
+
+async def amerge_rows(iterators):
+    """merge_rows 的异步版本，iterators 是按 id 升序产出行元组的异步迭代器，各分片同时取第一块"""
+    firsts = await asyncio.gather(*(anext(iterator, None) for iterator in iterators))
+    heap = [(row[0], i, row) for i, row in enumerate(firsts) if row is not None]
+    heapq.heapify(heap)
+    while heap:
+        _, i, row = heap[0]
+        yield row
+        row = await anext(iterators[i], None)
+        if row is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (row[0], i, row))
+
+
+class Shards:
+    """逻辑分片 -> 连接池，targets[slot] 是同步版的 peewee database 或 async 版的 db_pool.AsyncPool
+
+    按 id 或手机号的读写只落到一个分片上；列表、计数这类全量的读由调用方在 all() 上分发再合并。
+    """
+
+    def __init__(self, targets):
+        self.targets = list(targets)
+        self.slots = len(self.targets)
+
+    def for_id(self, user_id):
+        return self.targets[slot_for_id(user_id, self.slots)]
+
+    def for_mobile(self, mobile):
+        return self.targets[slot_for_mobile(mobile, self.slots)]
+
+    def _group(self, items, slot_of, key):
+        groups = {}
+        for item in items:
+            groups.setdefault(slot_of(key(item), self.slots), []).append(item)
+        return [(self.targets[slot], group) for slot, group in sorted(groups.items())]
+
+    def group_by_id(self, items, key=lambda item: item):
+        """[(分片, 落在这个分片上的 items)]，按分片号排序；key 取出每项的 id"""
+        return self._group(items, slot_for_id, key)
+
+    def group_by_mobile(self, items, key=lambda item: item):
+        return self._group(items, slot_for_mobile, key)
+
+    def all(self):
+        return self.targets
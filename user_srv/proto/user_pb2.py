@@ -23,9 +23,10 @@ _sym_db = _symbol_database.Default()
 
 
 from google.protobuf import empty_pb2 as google_dot_protobuf_dot_empty__pb2
+from google.protobuf import field_mask_pb2 as google_dot_protobuf_dot_field__mask__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\nuser.proto\x1a\x1bgoogle/protobuf/empty.proto\"%\n\x08PageInfo\x12\n\n\x02pn\x18\x01 \x01(\r\x12\r\n\x05pSize\x18\x02 \x01(\r\"\x1f\n\rMobileRequest\x12\x0e\n\x06mobile\x18\x01 \x01(\t\"\x17\n\tIdRequest\x12\n\n\x02id\x18\x01 \x01(\x05\"D\n\x0e\x43reateUserInfo\x12\x10\n\x08nickName\x18\x01 \x01(\t\x12\x10\n\x08passWord\x18\x02 \x01(\t\x12\x0e\n\x06mobile\x18\x03 \x01(\t\"P\n\x0eUpdateUserInfo\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x10\n\x08nickName\x18\x02 \x01(\t\x12\x0e\n\x06gender\x18\x03 \x01(\t\x12\x10\n\x08\x62irthday\x18\x04 \x01(\x04\"B\n\x10UserListResponse\x12\r\n\x05total\x18\x01 \x01(\x05\x12\x1f\n\x04\x64\x61ta\x18\x02 \x03(\x0b\x32\x11.UserInfoResponse\"\x82\x01\n\x10UserInfoResponse\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x10\n\x08password\x18\x02 \x01(\t\x12\x0e\n\x06mobile\x18\x03 \x01(\t\x12\x10\n\x08nickName\x18\x04 \x01(\t\x12\x10\n\x08\x62irthday\x18\x05 \x01(\x04\x12\x0e\n\x06gender\x18\x06 \x01(\t\x12\x0c\n\x04role\x18\x07 \x01(\x05\x32\x80\x02\n\x04User\x12+\n\x0bGetUserList\x12\t.PageInfo\x1a\x11.UserListResponse\x12\x34\n\x0fGetUserByMobile\x12\x0e.MobileRequest\x1a\x11.UserInfoResponse\x12,\n\x0bGetUserById\x12\n.IdRequest\x1a\x11.UserInfoResponse\x12\x30\n\nCreateUser\x12\x0f.CreateUserInfo\x1a\x11.UserInfoResponse\x12\x35\n\nUpdateUser\x12\x0f.UpdateUserInfo\x1a\x16.google.protobuf.EmptyB\tZ\x07.;protob\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\nuser.proto\x1a\x1bgoogle/protobuf/empty.proto\x1a google/protobuf/field_mask.proto\"\x82\x01\n\x08PageInfo\x12\n\n\x02pn\x18\x01 \x01(\r\x12\r\n\x05pSize\x18\x02 \x01(\r\x12\x0e\n\x06\x63ursor\x18\x03 \x01(\t\x12\x1d\n\ttotalMode\x18\x04 \x01(\x0e\x32\n.TotalMode\x12,\n\x08readMask\x18\x05 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\"8\n\x12StreamUsersRequest\x12\x0f\n\x07\x61\x66terId\x18\x01 \x01(\x05\x12\x11\n\tchunkSize\x18\x02 \x01(\r\"M\n\rMobileRequest\x12\x0e\n\x06mobile\x18\x01 \x01(\t\x12,\n\x08readMask\x18\x02 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\"E\n\tIdRequest\x12\n\n\x02id\x18\x01 \x01(\x05\x12,\n\x08readMask\x18\x02 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\"\\\n\x0e\x43reateUserInfo\x12\x10\n\x08nickName\x18\x01 \x01(\t\x12\x10\n\x08passWord\x18\x02 \x01(\t\x12\x0e\n\x06mobile\x18\x03 \x01(\t\x12\x16\n\x0eidempotencyKey\x18\x04 \x01(\t\"\x80\x01\n\x0eUpdateUserInfo\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x10\n\x08nickName\x18\x02 \x01(\t\x12\x0e\n\x06gender\x18\x03 \x01(\t\x12\x10\n\x08\x62irthday\x18\x04 \x01(\x04\x12.\n\nupdateMask\x18\x05 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\"5\n\x11PasswordCheckInfo\x12\x0e\n\x06mobile\x18\x01 \x01(\t\x12\x10\n\x08passWord\x18\x02 \x01(\t\",\n\rCheckResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\n\n\x02id\x18\x02 \x01(\x05\"\x1d\n\x0e\x42\x61tchIdRequest\x12\x0b\n\x03ids\x18\x01 \x03(\x05\"%\n\x12\x42\x61tchMobileRequest\x12\x0f\n\x07mobiles\x18\x01 \x03(\t\"C\n\x11\x42\x61tchUserResponse\x12\x1f\n\x04\x64\x61ta\x18\x01 \x03(\x0b\x32\x11.UserInfoResponse\x12\r\n\x05\x66ound\x18\x02 \x03(\x08\"]\n\x10\x43reateUserResult\x12\r\n\x05index\x18\x01 \x01(\x05\x12\x0e\n\x06mobile\x18\x02 \x01(\t\x12\n\n\x02id\x18\x03 \x01(\x05\x12\x0f\n\x07\x63reated\x18\x04 \x01(\x08\x12\r\n\x05\x65rror\x18\x05 \x01(\t\"Z\n\x13\x43reateUsersResponse\x12\x0f\n\x07\x63reated\x18\x01 \x01(\x05\x12\x0e\n\x06\x66\x61iled\x18\x02 \x01(\x05\x12\"\n\x07results\x18\x03 \x03(\x0b\x32\x11.CreateUserResult\"u\n\x10UserListResponse\x12\r\n\x05total\x18\x01 \x01(\x05\x12\x1f\n\x04\x64\x61ta\x18\x02 \x03(\x0b\x32\x11.UserInfoResponse\x12\x12\n\nnextCursor\x18\x03 \x01(\t\x12\x1d\n\ttotalMode\x18\x04 \x01(\x0e\x32\n.TotalMode\"\x82\x01\n\x10UserInfoResponse\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x10\n\x08password\x18\x02 \x01(\t\x12\x0e\n\x06mobile\x18\x03 \x01(\t\x12\x10\n\x08nickName\x18\x04 \x01(\t\x12\x10\n\x08\x62irthday\x18\x05 \x01(\x04\x12\x0e\n\x06gender\x18\x06 \x01(\t\x12\x0c\n\x04role\x18\x07 \x01(\x05*c\n\tTotalMode\x12\x11\n\rTOTAL_DEFAULT\x10\x00\x12\x0f\n\x0bTOTAL_EXACT\x10\x01\x12\x10\n\x0cTOTAL_CACHED\x10\x02\x12\x10\n\x0cTOTAL_APPROX\x10\x03\x12\x0e\n\nTOTAL_SKIP\x10\x04\x32\xa2\x04\n\x04User\x12+\n\x0bGetUserList\x12\t.PageInfo\x1a\x11.UserListResponse\x12\x34\n\x0fGetUserByMobile\x12\x0e.MobileRequest\x1a\x11.UserInfoResponse\x12,\n\x0bGetUserById\x12\n.IdRequest\x1a\x11.UserInfoResponse\x12\x30\n\nCreateUser\x12\x0f.CreateUserInfo\x1a\x11.UserInfoResponse\x12\x35\n\nUpdateUser\x12\x0f.UpdateUserInfo\x1a\x16.google.protobuf.Empty\x12\x33\n\rCheckPassword\x12\x12.PasswordCheckInfo\x1a\x0e.CheckResponse\x12\x38\n\x11\x42\x61tchGetUsersById\x12\x0f.BatchIdRequest\x1a\x12.BatchUserResponse\x12@\n\x15\x42\x61tchGetUsersByMobile\x12\x13.BatchMobileRequest\x1a\x12.BatchUserResponse\x12\x36\n\x0b\x43reateUsers\x12\x0f.CreateUserInfo\x1a\x14.CreateUsersResponse(\x01\x12\x37\n\x0bStreamUsers\x12\x13.StreamUsersRequest\x1a\x11.UserInfoResponse0\x01\x42\tZ\x07.;protob\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -33,20 +34,38 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'user_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   _globals['DESCRIPTOR']._loaded_options = None
   _globals['DESCRIPTOR']._serialized_options = b'Z\007.;proto'
-  _globals['_PAGEINFO']._serialized_start=43
-  _globals['_PAGEINFO']._serialized_end=80
-  _globals['_MOBILEREQUEST']._serialized_start=82
-  _globals['_MOBILEREQUEST']._serialized_end=113
-  _globals['_IDREQUEST']._serialized_start=115
-  _globals['_IDREQUEST']._serialized_end=138
-  _globals['_CREATEUSERINFO']._serialized_start=140
-  _globals['_CREATEUSERINFO']._serialized_end=208
-  _globals['_UPDATEUSERINFO']._serialized_start=210
-  _globals['_UPDATEUSERINFO']._serialized_end=290
-  _globals['_USERLISTRESPONSE']._serialized_start=292
-  _globals['_USERLISTRESPONSE']._serialized_end=358
-  _globals['_USERINFORESPONSE']._serialized_start=361
-  _globals['_USERINFORESPONSE']._serialized_end=491
-  _globals['_USER']._serialized_start=494
-  _globals['_USER']._serialized_end=750
+  _globals['_TOTALMODE']._serialized_start=1322
+  _globals['_TOTALMODE']._serialized_end=1421
+  _globals['_PAGEINFO']._serialized_start=78
+  _globals['_PAGEINFO']._serialized_end=208
+  _globals['_STREAMUSERSREQUEST']._serialized_start=210
+  _globals['_STREAMUSERSREQUEST']._serialized_end=266
+  _globals['_MOBILEREQUEST']._serialized_start=268
+  _globals['_MOBILEREQUEST']._serialized_end=345
+  _globals['_IDREQUEST']._serialized_start=347
+  _globals['_IDREQUEST']._serialized_end=416
+  _globals['_CREATEUSERINFO']._serialized_start=418
+  _globals['_CREATEUSERINFO']._serialized_end=510
+  _globals['_UPDATEUSERINFO']._serialized_start=513
+  _globals['_UPDATEUSERINFO']._serialized_end=641
+  _globals['_PASSWORDCHECKINFO']._serialized_start=643
+  _globals['_PASSWORDCHECKINFO']._serialized_end=696
+  _globals['_CHECKRESPONSE']._serialized_start=698
+  _globals['_CHECKRESPONSE']._serialized_end=742
+  _globals['_BATCHIDREQUEST']._serialized_start=744
+  _globals['_BATCHIDREQUEST']._serialized_end=773
+  _globals['_BATCHMOBILEREQUEST']._serialized_start=775
+  _globals['_BATCHMOBILEREQUEST']._serialized_end=812
+  _globals['_BATCHUSERRESPONSE']._serialized_start=814
+  _globals['_BATCHUSERRESPONSE']._serialized_end=881
+  _globals['_CREATEUSERRESULT']._serialized_start=883
+  _globals['_CREATEUSERRESULT']._serialized_end=976
+  _globals['_CREATEUSERSRESPONSE']._serialized_start=978
+  _globals['_CREATEUSERSRESPONSE']._serialized_end=1068
+  _globals['_USERLISTRESPONSE']._serialized_start=1070
+  _globals['_USERLISTRESPONSE']._serialized_end=1187
+  _globals['_USERINFORESPONSE']._serialized_start=1190
+  _globals['_USERINFORESPONSE']._serialized_end=1320
+  _globals['_USER']._serialized_start=1424
+  _globals['_USER']._serialized_end=1970
 # @@protoc_insertion_point(module_scope)
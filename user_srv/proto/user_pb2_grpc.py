@@ -60,6 +60,31 @@ class UserStub(object):
                 request_serializer=user__pb2.UpdateUserInfo.SerializeToString,
                 response_deserializer=google_dot_protobuf_dot_empty__pb2.Empty.FromString,
                 _registered_method=True)
+        self.CheckPassword = channel.unary_unary(
+                '/User/CheckPassword',
+                request_serializer=user__pb2.PasswordCheckInfo.SerializeToString,
+                response_deserializer=user__pb2.CheckResponse.FromString,
+                _registered_method=True)
+        self.BatchGetUsersById = channel.unary_unary(
+                '/User/BatchGetUsersById',
+                request_serializer=user__pb2.BatchIdRequest.SerializeToString,
+                response_deserializer=user__pb2.BatchUserResponse.FromString,
+                _registered_method=True)
+        self.BatchGetUsersByMobile = channel.unary_unary(
+                '/User/BatchGetUsersByMobile',
+                request_serializer=user__pb2.BatchMobileRequest.SerializeToString,
+                response_deserializer=user__pb2.BatchUserResponse.FromString,
+                _registered_method=True)
+        self.CreateUsers = channel.stream_unary(
+                '/User/CreateUsers',
+                request_serializer=user__pb2.CreateUserInfo.SerializeToString,
+                response_deserializer=user__pb2.CreateUsersResponse.FromString,
+                _registered_method=True)
+        self.StreamUsers = channel.unary_stream(
+                '/User/StreamUsers',
+                request_serializer=user__pb2.StreamUsersRequest.SerializeToString,
+                response_deserializer=user__pb2.UserInfoResponse.FromString,
+                _registered_method=True)
 
 
 class UserServicer(object):
@@ -95,6 +120,36 @@ class UserServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def CheckPassword(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def BatchGetUsersById(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def BatchGetUsersByMobile(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CreateUsers(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamUsers(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_UserServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -123,6 +178,31 @@ def add_UserServicer_to_server(servicer, server):
                     request_deserializer=user__pb2.UpdateUserInfo.FromString,
                     response_serializer=google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
             ),
+            'CheckPassword': grpc.unary_unary_rpc_method_handler(
+                    servicer.CheckPassword,
+                    request_deserializer=user__pb2.PasswordCheckInfo.FromString,
+                    response_serializer=user__pb2.CheckResponse.SerializeToString,
+            ),
+            'BatchGetUsersById': grpc.unary_unary_rpc_method_handler(
+                    servicer.BatchGetUsersById,
+                    request_deserializer=user__pb2.BatchIdRequest.FromString,
+                    response_serializer=user__pb2.BatchUserResponse.SerializeToString,
+            ),
+            'BatchGetUsersByMobile': grpc.unary_unary_rpc_method_handler(
+                    servicer.BatchGetUsersByMobile,
+                    request_deserializer=user__pb2.BatchMobileRequest.FromString,
+                    response_serializer=user__pb2.BatchUserResponse.SerializeToString,
+            ),
+            'CreateUsers': grpc.stream_unary_rpc_method_handler(
+                    servicer.CreateUsers,
+                    request_deserializer=user__pb2.CreateUserInfo.FromString,
+                    response_serializer=user__pb2.CreateUsersResponse.SerializeToString,
+            ),
+            'StreamUsers': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamUsers,
+                    request_deserializer=user__pb2.StreamUsersRequest.FromString,
+                    response_serializer=user__pb2.UserInfoResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'User', rpc_method_handlers)
@@ -268,3 +348,138 @@ class User(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def CheckPassword(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/User/CheckPassword',
+            user__pb2.PasswordCheckInfo.SerializeToString,
+            user__pb2.CheckResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def BatchGetUsersById(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/User/BatchGetUsersById',
+            user__pb2.BatchIdRequest.SerializeToString,
+            user__pb2.BatchUserResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def BatchGetUsersByMobile(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/User/BatchGetUsersByMobile',
+            user__pb2.BatchMobileRequest.SerializeToString,
+            user__pb2.BatchUserResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def CreateUsers(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/User/CreateUsers',
+            user__pb2.CreateUserInfo.SerializeToString,
+            user__pb2.CreateUsersResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def StreamUsers(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/User/StreamUsers',
+            user__pb2.StreamUsersRequest.SerializeToString,
+            user__pb2.UserInfoResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -1,37 +1,450 @@
-from loguru import logger
-import argparse
-import logging
-import grpc
-from concurrent import futures
-from user_srv.handler.user import UserServicer
-from user_srv.proto import user_pb2_grpc, user_pb2
-import signal
-import sys
+import math
 import os
+import sys
+import time
 
+# 直接运行 python user_srv/server.py 时 sys.path 里只有 user_srv 目录，要在导入 user_srv 包之前加上项目根目录
 BASE_DIR= os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, BASE_DIR)
 
+from user_srv.common import startup
+
+# --profile-startup 要统计所有模块的导入耗时（包括 log 导入的 loguru），等不到解析完命令行参数就得开始计时
+PHASES = startup.Phases(time.perf_counter())
+if "--profile-startup" in sys.argv:
+    startup.profile_imports()
+
+# 这里只导入解析参数和启动所需的模块；gRPC、handler、peewee 模型等在 serve 里导入，
+# 副本、分片、redis、指标、多进程这些可选功能用到时才导入，--workers 的父进程不加载服务端代码
+import argparse
+import asyncio
+import logging
+import signal
+import threading
+
+from loguru import logger
+
+from user_srv.common import log
+from user_srv.settings import setting
+
+
 def on_exit(signo, frame):
+    # 启动完成之前收到信号，直接退出；开始监听后换成 drain_signals
     logger.info("Server exiting...")
     sys.exit(0)
 
+def drain_signals(args, health, drain, stop_now):
+    """SIGTERM / SIGINT 的处理函数：健康检查改为 NOT_SERVING，由 drain 在后台排空进行中的请求
+
+    排空时再按一次 Ctrl-C（SIGINT）调用 stop_now 立即取消所有请求；重复的 SIGTERM 忽略，
+    --workers 模式下 Ctrl-C 让工作进程先后收到终端的 SIGINT 和父进程转发的 SIGTERM。
+    """
+    from user_srv.common.health import NOT_SERVING
+
+    draining = []
+
+    def on_signal(signo, frame=None):
+        name = signal.Signals(signo).name
+        if draining:
+            if signo == signal.SIGINT:
+                logger.warning(f"Received {name} while draining, cancelling in-flight RPCs")
+                stop_now()
+            return
+        draining.append(signo)
+        health.set(NOT_SERVING)
+        logger.info(f"Received {name}, draining: NOT_SERVING for {args.shutdown_delay:g}s, "
+                    f"then up to {args.shutdown_grace:g}s for in-flight RPCs")
+        drain()
+    return on_signal
+
+def drain(args, server):
+    """停止接收新请求，最多等 --shutdown-grace 秒让进行中的 RPC 结束，wait_for_termination 随后返回"""
+    time.sleep(args.shutdown_delay)
+    server.stop(args.shutdown_grace).wait()
+
+async def drain_async(args, server):
+    await asyncio.sleep(args.shutdown_delay)
+    await server.stop(args.shutdown_grace)
+
+def calibrate(hasher, args):
+    if args.hash_target_ms:
+        rounds = hasher.calibrate(args.hash_target_ms, setting.PASSWORD_HASH_MIN_ROUNDS, setting.PASSWORD_HASH_MAX_ROUNDS)
+        logger.info(f"pbkdf2_sha256 calibrated to {rounds} rounds for ~{args.hash_target_ms}ms")
+
+def connect_redis(args):
+    if not args.redis_url:
+        return None
+    from user_srv.common.redis_cache import connect
+
+    logger.info(f"Using redis at {args.redis_url}")
+    return connect(args.redis_url)
+
+def build_cache(args, redis=None, errors=None):
+    from user_srv.common.cache import LocalUserCache, TieredUserCache
+
+    cache = LocalUserCache(args.user_cache_mb * 1024 * 1024, args.user_cache_ttl)
+    if redis is not None:
+        from user_srv.common.redis_cache import RedisUserCache
+
+        shared = RedisUserCache(redis, args.redis_cache_ttl, errors=errors)
+        if args.replicas:
+            # 墓碑盖住副本可能落后的时间，其他进程从副本读到的旧数据不会回填进 Redis
+            shared.tombstone_ttl = max(shared.tombstone_ttl, math.ceil(args.replica_sticky_seconds))
+        cache = TieredUserCache(cache, shared)
+    return cache
+
+def access_log(args, interceptor):
+    return interceptor(args.log_sample, log.RepeatLimiter(args.log_error_interval))
+
+def start_metrics(args):
+    if not args.metrics_port:
+        return False
+    from user_srv.common import metrics
+
+    metrics.start_http_server(args.metrics_port, args.host)
+    logger.info(f"Serving metrics on http://{args.host}:{args.metrics_port}/metrics")
+    return True
+
+def pooled_database(args, database):
+    """副本、分片的 peewee 连接池与主库使用相同的连接数和等待超时"""
+    from user_srv.common import db_pool, sql_trace
+
+    db_pool.DatabasePool(database).configure(db_pool.pool_size(args.db_pool_size, args.threads), args.db_pool_timeout)
+    sql_trace.trace_database(database)
+    return database
+
+def replica_database(args, host, port):
+    return pooled_database(args, setting.mysql_database(host, port))
+
+def build_replicas(args, target):
+    """target(host, port) 建立一个副本的连接池"""
+    addresses = setting.replica_addresses(args.replicas)
+    if not addresses:
+        return []
+    from user_srv.common.replicas import Replica
+
+    return [Replica(host, port, target(host, port)) for host, port in addresses]
+
+def shard_addresses(args):
+    if not args.shards:
+        return []
+    addresses = setting.shard_addresses(args.shards)
+    logger.info(f"Sharding users across {len(addresses)} slots on "
+                f"{', '.join(sorted({f'{host}:{port}' for host, port in addresses}))}")
+    return addresses
+
+def query_budgets(args):
+    """分片时列表和批量读要在每个涉及的分片上各查一次，预算按分片数放大"""
+    if not args.shards:
+        return setting.QUERY_BUDGETS
+    fanout = {"GetUserList", "BatchGetUsersById", "BatchGetUsersByMobile"}
+    return {method: budget * setting.SHARD_SLOTS if method in fanout else budget
+            for method, budget in setting.QUERY_BUDGETS.items()}
+
+def build_shards(args):
+    addresses = shard_addresses(args)
+    if not addresses:
+        return None
+    from user_srv.model import sharding
+
+    return sharding.Shards(pooled_database(args, sharding.shard_database(slot, host, port, len(addresses)))
+                           for slot, (host, port) in enumerate(addresses))
+
+def build_router(args, replicas):
+    if not replicas:
+        return None
+    from user_srv.common.replicas import ReplicaRouter
+
+    router = ReplicaRouter(replicas, args.replica_sticky_seconds, setting.REPLICA_MAX_LAG, setting.REPLICA_COOLDOWN)
+    router.start(setting.REPLICA_CHECK_INTERVAL)
+    logger.info(f"Reading from replicas {', '.join(replica.name for replica in replicas)}, "
+                f"sticky to primary for {args.replica_sticky_seconds}s after a write")
+    return router
+
+def server_options(args):
+    # 多个工作进程用 SO_REUSEPORT 绑定同一个端口，由内核把新连接分给各个进程
+    if args.workers > 1:
+        return [("grpc.so_reuseport", 1)]
+    return []
+
+def warm_hasher(args, hasher):
+    """一次启动全部哈希进程，再在其中一个上校准 rounds"""
+    processes = hasher.warm()
+    calibrate(hasher, args)
+    return processes
+
+def warm(args, hasher, databases, sharded=False):
+    """开始监听前预热数据库连接池和密码哈希进程池，第一批请求不用等建连接和启动进程
+
+    每个库（主库、副本）各建 --db-pool-warm 个连接，分片时这么多个连接分给所有逻辑分片。
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from user_srv.common import db_pool
+
+    # 建数据库连接和启动哈希进程互不依赖，同时进行
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        counts = db_pool.spread(args.db_pool_warm, len(databases)) if sharded else [args.db_pool_warm] * len(databases)
+        connections = executor.submit(db_pool.warm_all, databases, counts)
+        processes = warm_hasher(args, hasher)
+    logger.info(f"Warmed {connections.result()} database connections and {processes} password hash processes")
+
+def ready(args, health):
+    """开始监听后把健康检查改为 SERVING，打出启动各阶段的耗时"""
+    from user_srv.common.health import SERVING
+
+    health.set(SERVING)
+    PHASES.mark("listen")
+    logger.info(f"Ready in {PHASES.total_ms():.0f}ms: {PHASES.summary()}")
+    if args.profile_startup:
+        rows = startup.import_report()
+        logger.info(f"Imports took {startup.imports_ms():.0f}ms, slowest by cumulative time (cumulative / self ms):\n"
+                    + "\n".join(f"  {total:8.1f} {own:8.1f}  {module}" for module, total, own in rows))
+
+def serve(args):
+    from concurrent import futures
+
+    import grpc
+
+    from user_srv.common import db_pool, sql_trace
+    from user_srv.common.access_log import AccessLogInterceptor
+    from user_srv.common.admission import AdmissionInterceptor
+    from user_srv.common.hasher import PasswordHasher
+    from user_srv.common.health import HealthServicer
+    from user_srv.common.idempotency import IdempotencyStore
+    from user_srv.common.total import TotalCounter
+    from user_srv.handler.user import UserServicer
+    from user_srv.proto import health_pb2_grpc, user_pb2_grpc
+    PHASES.mark("imports")
+
+    counter = TotalCounter(args.total_mode, args.total_cache_ttl)
+    hasher = PasswordHasher(args.hash_workers)
+    redis = connect_redis(args)
+    # Redis 出错时退回查库，同一种操作每 --log-error-interval 秒只记一条
+    redis_errors = log.RepeatLimiter(args.log_error_interval)
+    cache = build_cache(args, redis, redis_errors)
+    idempotency = IdempotencyStore(args.idempotency_ttl, setting.IDEMPOTENCY_MAX_KEYS, client=redis,
+                                   errors=redis_errors)
+    executor = futures.ThreadPoolExecutor(max_workers=args.threads)
+    pool = db_pool.DatabasePool(setting.DB)
+    pool.configure(db_pool.pool_size(args.db_pool_size, args.threads), args.db_pool_timeout)
+    logger.info(f"Database {setting.MYSQL_USER}@{setting.MYSQL_HOST}:{setting.MYSQL_PORT}/{setting.MYSQL_DB}, "
+                f"pool of {pool.stats()['max']} connections for {args.threads} threads")
+    sql_trace.trace_database(setting.DB)
+    replicas = build_replicas(args, lambda host, port: replica_database(args, host, port))
+    router = build_router(args, replicas)
+    shards = build_shards(args)
+    databases = shards.all() if shards else [pool.database] + [replica.target for replica in replicas]
+    # 访问日志在最外层：里层拦截器已经转换成状态码的异常（如连接池超时）不再当作未处理的异常记录
+    interceptors = [access_log(args, AccessLogInterceptor)]
+    if start_metrics(args):
+        from user_srv.common import rpc_metrics
+
+        interceptors.append(rpc_metrics.MetricsInterceptor())
+        rpc_metrics.watch_executor(executor)
+        rpc_metrics.watch_db_pool(pool)
+    interceptors.append(AdmissionInterceptor(setting.ADMISSION_LIMITS, args.min_deadline_ms))
+    interceptors.append(sql_trace.SqlTraceInterceptor(args.slow_query_ms, query_budgets(args)))
+    interceptors.append(db_pool.PoolTimeoutInterceptor(pool, {pool.database, *databases}))
+    PHASES.mark("setup")
+    warm(args, hasher, databases, sharded=shards is not None)
+    PHASES.mark("warm")
+
+    # 执行中和排队的 RPC 超过 threads + admission_queue 时由 gRPC 在轮询线程里直接返回 RESOURCE_EXHAUSTED
+    server = grpc.server(executor, interceptors=interceptors, options=server_options(args),
+                         maximum_concurrent_rpcs=args.threads + args.admission_queue)
+    user_pb2_grpc.add_UserServicer_to_server(
+        UserServicer(counter=counter, hasher=hasher, cache=cache, idempotency=idempotency, router=router,
+                     shards=shards), server)
+    health = HealthServicer()
+    health_pb2_grpc.add_HealthServicer_to_server(health, server)
+    server.add_insecure_port(f'{args.host}:{args.port}')
+    logger.info(f"Starting server on {args.host}:{args.port}")
+    server.start()
+    ready(args, health)
+    on_signal = drain_signals(
+        args, health, lambda: threading.Thread(target=drain, args=(args, server), name="drain", daemon=True).start(),
+        lambda: server.stop(0))
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+    try:
+        server.wait_for_termination()
+    finally:
+        hasher.shutdown(wait=False)
+        if router:
+            router.stop()
+        # 请求都已结束或被取消，关掉连接池里的连接，MySQL 那边不会留下半开的连接
+        for database in databases:
+            database.close_all()
+
+async def serve_async(args):
+    import grpc
+
+    from user_srv.common import db_pool, sql_trace
+    from user_srv.common.access_log import AsyncAccessLogInterceptor
+    from user_srv.common.admission import AsyncAdmissionInterceptor
+    from user_srv.common.hasher import PasswordHasher
+    from user_srv.common.health import AsyncHealthServicer
+    from user_srv.common.idempotency import IdempotencyStore
+    from user_srv.common.total import TotalCounter
+    from user_srv.handler.user_async import AsyncUserServicer, create_pool
+    from user_srv.model.sharding import Shards, id_init_command
+    from user_srv.proto import health_pb2_grpc, user_pb2_grpc
+    PHASES.mark("imports")
+
+    counter = TotalCounter(args.total_mode, args.total_cache_ttl)
+    hasher = PasswordHasher(args.hash_workers)
+    # redis-py 是阻塞客户端，async 模式只使用进程内缓存和幂等键
+    if args.redis_url:
+        logger.warning("--redis-url is ignored in --async mode")
+    cache = build_cache(args)
+    idempotency = IdempotencyStore(args.idempotency_ttl, setting.IDEMPOTENCY_MAX_KEYS)
+    replica_addresses = setting.replica_addresses(args.replicas)
+    slots = shard_addresses(args)
+    PHASES.mark("setup")
+    # 主库、副本、分片的连接池和哈希进程池同时预热；连接池用 minsize=0 创建，MySQL 连不上时不会启动失败，
+    # 与同步模式一样记一条警告，之后按需建立连接
+    maxsize = args.db_pool_size or setting.ASYNC_POOL_SIZE
+    warm_size = max(0, min(args.db_pool_warm, maxsize))
+
+    async def warm_pools():
+        pools = [db_pool.AsyncPool(p, args.db_pool_timeout) for p in await asyncio.gather(
+            create_pool(0, maxsize),
+            *(create_pool(0, maxsize, host, port) for host, port in replica_addresses),
+            *(create_pool(0, maxsize, host, port, setting.shard_name(slot), init_command=id_init_command(slot, len(slots)))
+              for slot, (host, port) in enumerate(slots)))]
+        counts = [warm_size] * (1 + len(replica_addresses)) + (db_pool.spread(warm_size, len(slots)) if slots else [])
+        return pools, sum(await asyncio.gather(*(p.warm(n) for p, n in zip(pools, counts))))
+
+    (pools, connections), processes = await asyncio.gather(warm_pools(), asyncio.to_thread(warm_hasher, args, hasher))
+    logger.info(f"Warmed {connections} database connections and {processes} password hash processes")
+    PHASES.mark("warm")
+    pool, replica_pools, shard_pools = pools[0], pools[1:1 + len(replica_addresses)], pools[1 + len(replica_addresses):]
+    logger.info(f"Database {setting.MYSQL_USER}@{setting.MYSQL_HOST}:{setting.MYSQL_PORT}/{setting.MYSQL_DB}, "
+                f"pool of {pool.stats()['max']} connections")
+    targets = iter(replica_pools)
+    replicas = build_replicas(args, lambda host, port: next(targets))
+    router = build_router(args, replicas)
+    shards = Shards(shard_pools) if shard_pools else None
+    interceptors = [access_log(args, AsyncAccessLogInterceptor)]
+    if start_metrics(args):
+        from user_srv.common import rpc_metrics
+
+        interceptors.append(rpc_metrics.AsyncMetricsInterceptor())
+        rpc_metrics.watch_db_pool(pool)
+    # 没有工作线程，按连接池大小算同时执行的 RPC 数
+    interceptors.append(AsyncAdmissionInterceptor(maxsize, args.admission_queue, setting.ADMISSION_LIMITS, args.min_deadline_ms))
+    interceptors.append(sql_trace.AsyncSqlTraceInterceptor(args.slow_query_ms, query_budgets(args)))
+    interceptors.append(db_pool.AsyncPoolTimeoutInterceptor(pool))
+
+    server = grpc.aio.server(interceptors=interceptors, options=server_options(args))
+    user_pb2_grpc.add_UserServicer_to_server(
+        AsyncUserServicer(pool, counter=counter, hasher=hasher, cache=cache, idempotency=idempotency, router=router,
+                          shards=shards), server)
+    health = AsyncHealthServicer()
+    health_pb2_grpc.add_HealthServicer_to_server(health, server)
+    server.add_insecure_port(f'{args.host}:{args.port}')
+    logger.info(f"Starting async server on {args.host}:{args.port}")
+    await server.start()
+    ready(args, health)
+
+    # 在事件循环里处理信号，让 server.stop 正常结束 wait_for_termination
+    on_signal = drain_signals(args, health, lambda: asyncio.ensure_future(drain_async(args, server)),
+                              lambda: asyncio.ensure_future(server.stop(0)))
+    loop = asyncio.get_running_loop()
+    for signo in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signo, on_signal, signo)
+    try:
+        await server.wait_for_termination()
+    finally:
+        hasher.shutdown(wait=False)
+        if router:
+            router.stop()
+        for p in pools:
+            p.close()
+            await p.wait_closed()
+
 def server():
     parser = argparse.ArgumentParser()
     parser.add_argument('--host', nargs="?", type=str, default='127.0.0.1', help='host')
     parser.add_argument('--port', nargs="?", type=int, default=50051, help='port')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='use grpc.aio server with an aiomysql pool')
+    parser.add_argument('--threads', type=int, default=setting.GRPC_THREADS, help='gRPC worker threads (sync server only)')
+    parser.add_argument('--db-pool-size', type=int, default=setting.DB_POOL_SIZE, help='max database connections, 0 to match --threads (ASYNC_POOL_SIZE with --async)')
+    parser.add_argument('--db-pool-warm', type=int, default=setting.DB_POOL_WARM, help='database connections each pool opens before the server starts listening, 0 to connect on demand; with --shards this many are spread over all SHARD_SLOTS pools, each of which still grows to --db-pool-size under load, per worker process')
+    parser.add_argument('--db-pool-timeout', type=float, default=setting.DB_POOL_TIMEOUT, help='seconds to wait for a free database connection before failing with UNAVAILABLE, 0 to wait forever')
+    parser.add_argument('--replicas', type=str, default=setting.MYSQL_REPLICAS, help='read replicas for GetUserById/GetUserByMobile/GetUserList, e.g. 10.0.0.2:3306,10.0.0.3:3306')
+    parser.add_argument('--shards', type=str, default=setting.MYSQL_SHARDS, help='shard users by mobile across SHARD_SLOTS databases, e.g. 0-7=10.0.0.2:3306,8-15=10.0.0.3:3306')
+    parser.add_argument('--replica-sticky-seconds', type=float, default=setting.REPLICA_STICKY_SECONDS, help='seconds reads of a just-written user go to the primary and skip the redis cache fill, at least REPLICA_MAX_LAG + REPLICA_CHECK_INTERVAL')
+    parser.add_argument('--total-mode', choices=['exact', 'cached', 'approx', 'skip'], default=setting.USER_LIST_TOTAL_MODE, help='default GetUserList total mode')
+    parser.add_argument('--total-cache-ttl', type=int, default=setting.USER_COUNT_CACHE_TTL, help='seconds a cached total stays valid')
+    parser.add_argument('--hash-workers', type=int, default=setting.PASSWORD_HASH_WORKERS, help='processes in the password hashing pool (default: cpu count)')
+    parser.add_argument('--hash-target-ms', type=int, default=setting.PASSWORD_HASH_TARGET_MS, help='calibrate pbkdf2 rounds to this latency at startup, 0 to disable')
+    parser.add_argument('--user-cache-mb', type=int, default=setting.USER_CACHE_MAX_BYTES // (1024 * 1024), help='memory budget of the in-process user cache, 0 to disable')
+    parser.add_argument('--user-cache-ttl', type=int, default=setting.USER_CACHE_TTL, help='seconds a cached user stays valid')
+    parser.add_argument('--redis-url', type=str, default=setting.REDIS_URL, help='shared redis user cache, e.g. redis://127.0.0.1:6379/0 or memory://')
+    parser.add_argument('--redis-cache-ttl', type=int, default=setting.REDIS_CACHE_TTL, help='seconds a user stays in redis')
+    parser.add_argument('--idempotency-ttl', type=int, default=setting.IDEMPOTENCY_TTL, help='seconds a CreateUser idempotency key is remembered, 0 to disable')
+    parser.add_argument('--log-json', action='store_true', default=setting.LOG_JSON, help='write logs as one JSON object per line')
+    parser.add_argument('--log-sample', type=setting.log_sample_rates, default=setting.LOG_SAMPLE, help='fraction of successful RPCs to access-log per method, e.g. GetUserById=0.01,*=0.001')
+    parser.add_argument('--log-error-interval', type=float, default=setting.LOG_ERROR_INTERVAL, help='log the traceback of a repeated exception at most once per this many seconds')
+    parser.add_argument('--admission-queue', type=int, default=setting.ADMISSION_QUEUE, help='RPCs accepted beyond the ones running before new ones get RESOURCE_EXHAUSTED')
+    parser.add_argument('--min-deadline-ms', type=int, default=setting.MIN_DEADLINE_MS, help='reject RPCs with less than this much of their deadline left when they start, with DEADLINE_EXCEEDED')
+    parser.add_argument('--slow-query-ms', type=int, default=setting.SLOW_QUERY_MS, help='log SQL statements slower than this to the slow query log, 0 to disable')
+    parser.add_argument('--metrics-port', type=int, default=setting.METRICS_PORT, help='serve Prometheus metrics on this port, 0 to disable')
+    parser.add_argument('--shutdown-delay', type=float, default=setting.SHUTDOWN_DELAY, help='seconds to keep serving after SIGTERM with health NOT_SERVING, so load balancers stop routing here')
+    parser.add_argument('--shutdown-grace', type=float, default=setting.SHUTDOWN_GRACE, help='seconds in-flight RPCs get to finish after the server stops accepting new ones')
+    parser.add_argument('--workers', type=int, default=setting.WORKERS, help='server processes sharing the port via SO_REUSEPORT, supervised by this process; each keeps its own in-process cache and --replicas read-your-writes state')
+    parser.add_argument('--profile-startup', action='store_true', help='log the slowest module imports once the server is ready')
     args = parser.parse_args()
+    if args.shards and args.replicas:
+        # 读写分离按主库记录最近的写，不知道用户在哪个分片上
+        parser.error("--shards and --replicas cannot be used together")
+    if args.replicas and args.replica_sticky_seconds < setting.REPLICA_MAX_STALENESS:
+        # 刚写过的用户会在副本追上之前从副本读到旧数据，并写进进程内缓存和 Redis
+        parser.error(f"--replica-sticky-seconds must be at least {setting.REPLICA_MAX_STALENESS} "
+                     f"(REPLICA_MAX_LAG + REPLICA_CHECK_INTERVAL)")
 
-    logger.add("user_srv/logs/server_{time}.log", rotation="10 MB", retention="10 days")
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    user_pb2_grpc.add_UserServicer_to_server(UserServicer(), server)
-    server.add_insecure_port(f'{args.host}:{args.port}')
+    setup_logging(args)
+    if args.workers > 1:
+        serve_workers(args)
+    else:
+        run(args)
+
+def setup_logging(args):
+    log.setup("user_srv/logs/server_{time}.log", "user_srv/logs/slow_query_{time}.log", args.log_json)
+
+def run(args):
+    PHASES.mark("boot")
     signal.signal(signal.SIGINT, on_exit)
     signal.signal(signal.SIGTERM, on_exit)
-    logger.info(f"Starting server on {args.host}:{args.port}")
-    server.start()
-    server.wait_for_termination()
+    if args.use_async:
+        asyncio.run(serve_async(args))
+    else:
+        serve(args)
+    logger.info("Server stopped")
+    # 日志 sink 是 enqueue 的，等后台线程把队列里的日志写完再退出
+    logger.complete()
+
+def run_worker(index, args):
+    """--workers 模式下的工作进程：自己的 gRPC server、数据库连接池和密码哈希进程池"""
+    logging.basicConfig()
+    setup_logging(args)
+    if args.metrics_port:
+        # 每个工作进程单独暴露指标，端口依次加一
+        args.metrics_port += index
+    logger.info(f"Worker {index} running in pid {os.getpid()}")
+    run(args)
+
+def serve_workers(args):
+    if args.hash_workers is None:
+        # 各工作进程的哈希进程池平分 CPU，避免 N 个进程各开 cpu_count 个哈希进程
+        args.hash_workers = max(1, (os.cpu_count() or 1) // args.workers)
+    from user_srv.common.workers import Supervisor
+
+    logger.info(f"Starting {args.workers} workers on {args.host}:{args.port}")
+    Supervisor(run_worker, args.workers, (args,), grace=setting.WORKER_STOP_GRACE).run()
 
 if __name__ == '__main__':
     logging.basicConfig()
-    server()
\ No newline at end of file
+    server()
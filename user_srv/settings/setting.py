@@ -1,12 +1,217 @@
-from playhouse.pool import PooledMySQLDatabase
-from playhouse.shortcuts import ReconnectMixin
-
-class ReconnectMysqlDatabase(PooledMySQLDatabase, ReconnectMixin):
-    pass
-
-MYSQL_DB="user_srv"
-MYSQL_HOST="127.0.0.1"
-MYSQL_PORT=3306
-MYSQL_USER="root"
-MYSQL_PASSWORD="123456"
-DB = ReconnectMysqlDatabase(MYSQL_DB, host=MYSQL_HOST, port=MYSQL_PORT, user=MYSQL_USER, password=MYSQL_PASSWORD)
+import functools
+import os
+
+
+def env(name, default, cast=str):
+    """读环境变量，未设置或为空时用默认值；docker-compose 通过环境变量传入 MySQL 地址和账号"""
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return cast(value)
+
+
+MYSQL_DB = env("MYSQL_DB", "user_srv")
+MYSQL_HOST = env("MYSQL_HOST", "127.0.0.1")
+MYSQL_PORT = env("MYSQL_PORT", 3306, int)
+MYSQL_USER = env("MYSQL_USER", "root")
+MYSQL_PASSWORD = env("MYSQL_PASSWORD", "123456")
+
+# 服务进程数，大于 1 时由父进程启动并看护这么多个共用端口的工作进程
+WORKERS = env("WORKERS", 1, int)
+# 收到 SIGTERM 后健康检查先改为 NOT_SERVING，继续服务这么多秒让负载均衡摘掉这个实例，再停止接收新请求
+SHUTDOWN_DELAY = env("SHUTDOWN_DELAY", 0.0, float)
+# 停止接收新请求后等待进行中的 RPC 结束的秒数，超时取消
+SHUTDOWN_GRACE = env("SHUTDOWN_GRACE", 20.0, float)
+# 父进程转发 SIGTERM 后等待工作进程退出的秒数，超时强制结束；应大于 SHUTDOWN_DELAY + SHUTDOWN_GRACE
+WORKER_STOP_GRACE = env("WORKER_STOP_GRACE", 30, int)
+# 同步模式下 gRPC 工作线程数
+GRPC_THREADS = env("GRPC_THREADS", 10, int)
+# 连接池最大连接数，0 表示按 gRPC 工作线程数自动确定（--async 模式下为 ASYNC_POOL_SIZE）
+DB_POOL_SIZE = env("DB_POOL_SIZE", 0, int)
+# 连接用满时等待空闲连接的秒数，超时的请求直接返回 UNAVAILABLE；0 表示一直等
+DB_POOL_TIMEOUT = env("DB_POOL_TIMEOUT", 1.0, float)
+# 建立超过这么多秒的连接归还时关闭、不再复用，应小于 MySQL 的 wait_timeout，避免拿到已被断开的连接
+DB_STALE_TIMEOUT = env("DB_STALE_TIMEOUT", 300, int)
+# 启动时每个连接池（主库、副本）预先建立的连接数，不超过连接池大小，0 表示不预热；
+# 同步模式默认建满，第一批并发请求都有现成的连接。分片时这么多个连接分给所有逻辑分片，
+# 否则 SHARD_SLOTS 个连接池各建一遍，再乘上 WORKERS，会超过 MySQL 的 max_connections
+DB_POOL_WARM = env("DB_POOL_WARM", GRPC_THREADS, int)
+
+
+@functools.cache
+def reconnect_mysql_database():
+    """peewee 和 pymysql 在第一次创建连接池时才导入，--workers 的父进程只读配置，不加载它们"""
+    from playhouse.pool import PooledMySQLDatabase
+    from playhouse.shortcuts import ReconnectMixin
+
+    class ReconnectMysqlDatabase(PooledMySQLDatabase, ReconnectMixin):
+        def _is_closed(self, conn):
+            # 每个 RPC 都从池里取一次连接，不再每次 ping 一个来回；可能已被 MySQL 断开的老连接由 stale_timeout 淘汰
+            return not conn.open
+
+    return ReconnectMysqlDatabase
+
+
+def mysql_database(host=MYSQL_HOST, port=MYSQL_PORT, name=MYSQL_DB, **kwargs):
+    from pymysql.constants import CLIENT
+
+    # FOUND_ROWS：UPDATE 返回匹配的行数而不是实际改动的行数，值没变时也能据此判断记录是否存在
+    return reconnect_mysql_database()(
+        name, host=host, port=port, user=MYSQL_USER, password=MYSQL_PASSWORD,
+        client_flag=CLIENT.FOUND_ROWS, max_connections=DB_POOL_SIZE or GRPC_THREADS,
+        stale_timeout=DB_STALE_TIMEOUT, timeout=DB_POOL_TIMEOUT, **kwargs)
+
+
+def __getattr__(name):
+    # 主库连接池 DB 在第一次用到时创建（导入 models 时），之后就是普通的模块属性
+    if name == "DB":
+        database = globals()["DB"] = mysql_database()
+        return database
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# 只读副本 "host:port,host:port"，账号和库名与主库相同；为空时读写都走主库
+MYSQL_REPLICAS = env("MYSQL_REPLICAS", "")
+# 副本健康检查的间隔秒数；复制延迟超过 REPLICA_MAX_LAG 秒的副本暂停使用
+REPLICA_CHECK_INTERVAL = 2
+REPLICA_MAX_LAG = 10
+# 延迟超过 REPLICA_MAX_LAG 后最多再过一个检查间隔副本才被暂停，从副本读到的数据最多落后主库这么多秒
+REPLICA_MAX_STALENESS = REPLICA_MAX_LAG + REPLICA_CHECK_INTERVAL
+# 写过的用户在这么多秒内的读请求走主库，Redis 缓存在这段时间内也不回填这个用户，
+# 不能小于 REPLICA_MAX_STALENESS，否则从副本读到的旧数据会写进缓存
+REPLICA_STICKY_SECONDS = env("REPLICA_STICKY_SECONDS", float(REPLICA_MAX_STALENESS), float)
+# 查询出错的副本暂停使用的秒数，之后由健康检查决定是否恢复
+REPLICA_COOLDOWN = 10
+
+
+def replica_addresses(text):
+    """"10.0.0.2:3306,10.0.0.3" -> [("10.0.0.2", 3306), ("10.0.0.3", 3306)]"""
+    addresses = []
+    for item in text.split(","):
+        item = item.strip()
+        if item:
+            host, _, port = item.partition(":")
+            addresses.append((host, int(port or MYSQL_PORT)))
+    return addresses
+
+# 逻辑分片数，写进了用户 id（(id - 1) % SHARD_SLOTS 就是分片号），有数据之后不能再改
+SHARD_SLOTS = env("SHARD_SLOTS", 16, int)
+# 逻辑分片到 MySQL 实例的映射 "0-7=10.0.0.2:3306,8-15=10.0.0.3:3306"，为空表示不分片；
+# 每个逻辑分片是实例上单独的库 {MYSQL_DB}_{slot:02d}，账号与主库相同
+MYSQL_SHARDS = env("MYSQL_SHARDS", "")
+
+
+def shard_name(slot):
+    return f"{MYSQL_DB}_{slot:02d}"
+
+
+def shard_addresses(text, slots=SHARD_SLOTS):
+    """"0-7=10.0.0.2:3306,8-15=10.0.0.3" -> 按分片号排列的 [(host, port)]，必须覆盖全部逻辑分片"""
+    addresses = [None] * slots
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        slot_range, _, address = item.partition("=")
+        first, _, last = slot_range.partition("-")
+        host, _, port = address.partition(":")
+        for slot in range(int(first), int(last or first) + 1):
+            if not 0 <= slot < slots:
+                raise ValueError(f"shard slot {slot} out of range 0-{slots - 1}")
+            addresses[slot] = (host, int(port or MYSQL_PORT))
+    missing = [slot for slot, address in enumerate(addresses) if address is None]
+    if missing:
+        raise ValueError(f"MYSQL_SHARDS does not map slots {missing}")
+    return addresses
+
+
+# --async 模式下 aiomysql 连接池的最大连接数
+ASYNC_POOL_SIZE = env("ASYNC_POOL_SIZE", 50, int)
+
+# GetUserList 默认的 total 统计方式: exact / cached / approx / skip
+USER_LIST_TOTAL_MODE = "exact"
+# cached 模式下 total 的缓存秒数
+USER_COUNT_CACHE_TTL = 30
+
+# 密码哈希进程池的进程数，None 表示使用 CPU 核数
+PASSWORD_HASH_WORKERS = None
+# 启动时按目标耗时校准 pbkdf2 的 rounds，0 表示不校准、使用 passlib 默认值
+PASSWORD_HASH_TARGET_MS = 50
+PASSWORD_HASH_MIN_ROUNDS = 29000
+PASSWORD_HASH_MAX_ROUNDS = 2000000
+
+# 进程内用户缓存的内存上限（字节）与过期秒数，上限为 0 表示关闭缓存
+USER_CACHE_MAX_BYTES = 64 * 1024 * 1024
+USER_CACHE_TTL = 60
+
+# 多副本共享的 Redis 二级缓存，为空表示不启用；memory:// 使用进程内替身
+REDIS_URL = ""
+REDIS_CACHE_TTL = 300
+
+# BatchGetUsers* 单次请求的最大键数，以及每条 IN (...) 查询的分块大小
+BATCH_MAX_SIZE = 1000
+BATCH_CHUNK_SIZE = 500
+
+# CreateUsers 每攒够这么多行做一次查重和多行 INSERT
+CREATE_USERS_BATCH_SIZE = 200
+
+# StreamUsers 每次查库的默认行数和上限
+STREAM_CHUNK_SIZE = 500
+STREAM_MAX_CHUNK_SIZE = 5000
+
+# CreateUser 幂等键记住响应的时长（秒，0 表示不记住）和进程内最多保存的键数
+IDEMPOTENCY_TTL = 600
+IDEMPOTENCY_MAX_KEYS = 100000
+
+# Prometheus 指标的 HTTP 端口，0 表示不开启
+METRICS_PORT = 0
+
+# 准入控制：正在执行的 RPC 之外最多再接收这么多个排队，更多的请求直接返回 RESOURCE_EXHAUSTED
+ADMISSION_QUEUE = env("ADMISSION_QUEUE", 50, int)
+# 慢方法单独限制 (同时执行数, 排队数)，导出和批量创建不会占满工作线程；同步模式下两者之和应小于 GRPC_THREADS
+ADMISSION_LIMITS = {
+    "StreamUsers": (2, 2),
+    "CreateUsers": (2, 2),
+}
+# 开始执行时离截止时间不到这么多毫秒的请求不再执行，直接返回 DEADLINE_EXCEEDED
+MIN_DEADLINE_MS = env("MIN_DEADLINE_MS", 5, int)
+
+# 单条 SQL 超过这个毫秒数写入慢查询日志，0 表示关闭
+SLOW_QUERY_MS = 100
+
+# 每个 RPC 最多执行的 SQL 条数，超过时告警并计入 user_srv_query_budget_exceeded_total
+QUERY_BUDGETS = {
+    "GetUserById": 1,
+    "GetUserByMobile": 1,
+    "GetUserList": 2,
+    "CreateUser": 1,
+    "UpdateUser": 1,
+    "CheckPassword": 2,
+    "BatchGetUsersById": 2,
+    "BatchGetUsersByMobile": 2,
+}
+
+# 日志输出为一行一条 JSON，便于采集；默认是便于阅读的文本格式
+LOG_JSON = env("LOG_JSON", False, lambda value: value.lower() in ("1", "true", "yes"))
+# 正常结束的 RPC 按方法采样写访问日志 "GetUserById=0.01,CreateUser=1,*=0.001"，* 是其余方法，为空表示不记
+LOG_SAMPLE = env("LOG_SAMPLE", "")
+# 同一个异常（方法、类型、抛出位置相同）每这么多秒只记一次堆栈，其余只计数
+LOG_ERROR_INTERVAL = env("LOG_ERROR_INTERVAL", 60.0, float)
+
+
+def log_sample_rates(text):
+    """"GetUserById=0.01,*=0.001" -> {"GetUserById": 0.01, "*": 0.001}"""
+    rates = {}
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        method, sep, rate = item.partition("=")
+        if not sep:
+            # 只写一个数表示所有方法
+            method, rate = "*", method
+        rate = float(rate)
+        if not 0 <= rate <= 1:
+            raise ValueError(f"sample rate {item!r} must be between 0 and 1")
+        rates[method.strip()] = rate
+    return rates
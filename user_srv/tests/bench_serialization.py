@@ -0,0 +1,65 @@
+import time
+from datetime import date, timedelta
+
+from user_srv.handler.user import USER_NAMES, UserServicer, fill_users
+from user_srv.model.models import User
+from user_srv.proto import user_pb2
+
+
+class BenchSerialization:
+    """对比 GetUserList 两种序列化方式的吞吐（不需要启动服务和数据库）
+
+    model: 行 -> peewee User -> convUserToRsp -> append，改造前的做法（生日换算已共用缓存，结果偏保守）
+    tuple: 行元组直接 data.add(...)，生日时间戳走缓存
+    """
+
+    def __init__(self, repeat=200):
+        self.repeat = repeat
+        # convUserToRsp 用不到 counter/hasher/cache，传占位对象避免启动哈希进程池
+        self.servicer = UserServicer(counter=object(), hasher=object(), cache=object(), idempotency=object())
+
+    def make_rows(self, n):
+        """生成 n 行与 USER_NAMES 顺序一致的数据，生日分布在几十年里"""
+        start = date(1970, 1, 1)
+        return [(i + 1, "138%08d" % i, 1, f"用户{i}", "male" if i % 2 else "female",
+                 start + timedelta(days=i * 37 % 15000)) for i in range(n)]
+
+    def model_path(self, rows):
+        rsp = user_pb2.UserListResponse()
+        for row in rows:
+            user = User(**dict(zip(['id', 'mobile', 'role', 'nick_name', 'gender', 'birthday'], row)))
+            rsp.data.append(self.servicer.convUserToRsp(user))
+        return rsp.SerializeToString()
+
+    def tuple_path(self, rows):
+        rsp = user_pb2.UserListResponse()
+        fill_users(rsp.data, rows, USER_NAMES)
+        return rsp.SerializeToString()
+
+    def measure(self, fn, rows):
+        """返回每秒处理的行数"""
+        fn(rows)  # 预热，填充生日缓存
+        start = time.perf_counter()
+        for _ in range(self.repeat):
+            fn(rows)
+        return len(rows) * self.repeat / (time.perf_counter() - start)
+
+    def run_all(self, sizes=(10, 100, 1000)):
+        print("🚀 GetUserList 序列化基准（rows/sec）")
+        print("=" * 50)
+        print(f"{'行数':>6} {'model':>12} {'tuple':>12} {'加速':>8}")
+        results = {}
+        for n in sizes:
+            rows = self.make_rows(n)
+            if self.model_path(rows) != self.tuple_path(rows):
+                print(f"❌ {n} 行时两种方式的输出不一致")
+                return None
+            model = self.measure(self.model_path, rows)
+            fast = self.measure(self.tuple_path, rows)
+            results[n] = (model, fast)
+            print(f"{n:>6} {model:>12,.0f} {fast:>12,.0f} {fast / model:>7.1f}x")
+        return results
+
+
+if __name__ == "__main__":
+    BenchSerialization().run_all()
@@ -0,0 +1,126 @@
+import grpc
+from user_srv.proto import user_pb2_grpc, user_pb2, health_pb2_grpc, health_pb2
+from user_srv.settings import setting
+import random
+import string
+import threading
+import time
+
+
+class TestAdmission:
+    """测试准入控制
+
+    用一直不结束的 CreateUsers 请求流占满这个方法的名额（ADMISSION_LIMITS，默认同时执行 2 个、排队 2 个），
+    服务端用默认参数启动即可；同步模式下 --threads 要大于名额总数。
+    """
+
+    def __init__(self):
+        # 连接到 gRPC 服务器
+        channel = grpc.insecure_channel('localhost:50051')
+        self.stub = user_pb2_grpc.UserStub(channel)
+        self.health = health_pb2_grpc.HealthStub(channel)
+        self.concurrency, self.queue = setting.ADMISSION_LIMITS["CreateUsers"]
+        self.release = threading.Event()
+        self.held = []
+
+    def generate_random_mobile(self):
+        """生成随机手机号"""
+        return "135" + "".join(random.choices(string.digits, k=8))
+
+    def stream(self, wait=True):
+        yield user_pb2.CreateUserInfo(nickName="准入测试", passWord="test123456", mobile=self.generate_random_mobile())
+        if wait:
+            self.release.wait(10)
+
+    def test_queue_full(self):
+        """名额用满后的请求立即返回 RESOURCE_EXHAUSTED"""
+        print("\n=== 测试用例1: 排队已满 ===")
+        self.held = [self.stub.CreateUsers.future(self.stream()) for _ in range(self.concurrency + self.queue)]
+        time.sleep(0.5)
+        try:
+            start = time.perf_counter()
+            self.stub.CreateUsers(self.stream(wait=False), timeout=5)
+            print("❌ 应该返回 RESOURCE_EXHAUSTED")
+            return False
+        except grpc.RpcError as e:
+            elapsed = (time.perf_counter() - start) * 1000
+            if e.code() == grpc.StatusCode.RESOURCE_EXHAUSTED and elapsed < 1000:
+                print(f"✅ {elapsed:.0f}ms 内被拒绝: {e.details()}")
+                return True
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}, {elapsed:.0f}ms")
+            return False
+
+    def test_health_exempt(self):
+        """过载时健康检查不受影响"""
+        print("\n=== 测试用例2: 健康检查不受准入控制 ===")
+        try:
+            response = self.health.Check(health_pb2.HealthCheckRequest(), timeout=2)
+            if response.status != health_pb2.HealthCheckResponse.SERVING:
+                print(f"❌ 状态不是 SERVING: {response.status}")
+                return False
+            print("✅ SERVING")
+            return True
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+
+    def test_queued_until_deadline(self):
+        """排队等名额时截止时间到了，返回 DEADLINE_EXCEEDED，排队的请求随后都能完成"""
+        print("\n=== 测试用例3: 排队超过截止时间 ===")
+        # 让出一个排队的位置：结束一个正在执行的请求，排队的请求补上
+        self.release.set()
+        results = [future.result(timeout=10) for future in self.held]
+        self.release.clear()
+        self.held = [self.stub.CreateUsers.future(self.stream()) for _ in range(self.concurrency)]
+        time.sleep(0.5)
+        try:
+            self.stub.CreateUsers(self.stream(wait=False), timeout=0.5)
+            print("❌ 应该返回 DEADLINE_EXCEEDED")
+            return False
+        except grpc.RpcError as e:
+            if e.code() != grpc.StatusCode.DEADLINE_EXCEEDED:
+                print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+                return False
+            if not all(result.created == 1 for result in results):
+                print(f"❌ 排队的请求没有完成: {[result.created for result in results]}")
+                return False
+            print(f"✅ {e.details()}，之前排队的 {len(results)} 个请求都已完成")
+            return True
+        finally:
+            self.release.set()
+            for future in self.held:
+                future.result(timeout=10)
+
+    def run_all_tests(self):
+        """运行所有测试用例"""
+        print("🚀 开始运行准入控制测试用例")
+        print("=" * 50)
+
+        test_results = []
+
+        # 运行各个测试用例
+        test_results.append(self.test_queue_full())
+        test_results.append(self.test_health_exempt())
+        test_results.append(self.test_queued_until_deadline())
+
+        # 统计结果
+        passed = sum(test_results)
+        total = len(test_results)
+
+        print("\n" + "=" * 50)
+        print(f"📊 测试结果统计:")
+        print(f"   通过: {passed}/{total}")
+        print(f"   失败: {total - passed}/{total}")
+
+        if passed == total:
+            print("🎉 所有测试用例通过!")
+        else:
+            print("⚠️  部分测试用例失败，请检查实现")
+
+        return passed == total
+
+
+if __name__ == "__main__":
+    # 创建测试实例并运行所有测试
+    test = TestAdmission()
+    test.run_all_tests()
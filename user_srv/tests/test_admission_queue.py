@@ -0,0 +1,147 @@
+import grpc
+from user_srv.proto import user_pb2_grpc, user_pb2
+from user_srv.settings import setting
+import random
+import string
+import threading
+import time
+
+
+class TestAdmissionQueue:
+    """测试在工作线程池里排队时超时的请求不会一直占着准入名额
+
+    服务端用同步模式、--threads 4 --admission-queue 4 启动：4 个不结束的 CreateUsers 请求流
+    （ADMISSION_LIMITS 默认同时执行 2 个、排队 2 个）正好占满工作线程，之后的请求只能在线程池里排队。
+    """
+
+    def __init__(self):
+        # 连接到 gRPC 服务器
+        channel = grpc.insecure_channel('localhost:50051')
+        self.stub = user_pb2_grpc.UserStub(channel)
+        self.threads = sum(setting.ADMISSION_LIMITS["CreateUsers"])
+        self.queue = 4
+        self.release = threading.Event()
+
+    def generate_random_mobile(self):
+        """生成随机手机号"""
+        return "135" + "".join(random.choices(string.digits, k=8))
+
+    def stream(self):
+        yield user_pb2.CreateUserInfo(nickName="准入测试", passWord="test123456", mobile=self.generate_random_mobile())
+        self.release.wait(10)
+
+    def hold(self):
+        """占满工作线程，返回这些请求的 future"""
+        self.release.clear()
+        held = [self.stub.CreateUsers.future(self.stream()) for _ in range(self.threads)]
+        time.sleep(0.5)
+        return held
+
+    def finish(self, held):
+        self.release.set()
+        for future in held:
+            future.result(timeout=10)
+        # 排队时已经超时的请求随后在空出来的线程上结束
+        time.sleep(0.5)
+
+    def test_expired_in_queue(self):
+        """排队时截止时间就到了的请求返回 DEADLINE_EXCEEDED"""
+        print("\n=== 测试用例1: 在线程池里排队超时 ===")
+        held = self.hold()
+        try:
+            queued = [self.stub.GetUserById.future(user_pb2.IdRequest(id=1), timeout=0.3) for _ in range(self.queue)]
+            codes = []
+            for future in queued:
+                try:
+                    future.result()
+                    codes.append(grpc.StatusCode.OK)
+                except grpc.RpcError as e:
+                    codes.append(e.code())
+            if any(code != grpc.StatusCode.DEADLINE_EXCEEDED for code in codes):
+                print(f"❌ 应该都是 DEADLINE_EXCEEDED: {codes}")
+                return False
+            print(f"✅ {len(codes)} 个排队的请求超时")
+            return True
+        finally:
+            self.finish(held)
+
+    def test_capacity_restored(self):
+        """超时的请求结束后，排队名额全部还回来"""
+        print("\n=== 测试用例2: 排队名额没有泄漏 ===")
+        held = self.hold()
+        try:
+            queued = [self.stub.GetUserById.future(user_pb2.IdRequest(id=1), timeout=5) for _ in range(self.queue)]
+            time.sleep(0.5)
+        finally:
+            self.finish(held)
+        codes = []
+        for future in queued:
+            try:
+                future.result()
+                codes.append(grpc.StatusCode.OK)
+            except grpc.RpcError as e:
+                codes.append(e.code())
+        rejected = [code for code in codes if code in (grpc.StatusCode.RESOURCE_EXHAUSTED, grpc.StatusCode.DEADLINE_EXCEEDED)]
+        if rejected:
+            print(f"❌ 排队名额被占着: {codes}")
+            return False
+        print(f"✅ {len(codes)} 个请求排队后都执行了: {[code.name for code in codes]}")
+        return True
+
+    def test_rejected_immediately(self):
+        """线程和排队名额都用满后，多出来的请求不等工作线程空出来，立即返回 RESOURCE_EXHAUSTED"""
+        print("\n=== 测试用例3: 超过上限立即拒绝 ===")
+        held = self.hold()
+        try:
+            queued = [self.stub.GetUserById.future(user_pb2.IdRequest(id=1), timeout=5) for _ in range(self.queue)]
+            time.sleep(0.5)
+            start = time.perf_counter()
+            try:
+                self.stub.GetUserById(user_pb2.IdRequest(id=1), timeout=5)
+                print("❌ 应该返回 RESOURCE_EXHAUSTED")
+                return False
+            except grpc.RpcError as e:
+                elapsed = (time.perf_counter() - start) * 1000
+                if e.code() == grpc.StatusCode.RESOURCE_EXHAUSTED and elapsed < 500:
+                    print(f"✅ {elapsed:.0f}ms 内被拒绝: {e.details()}")
+                    return True
+                print(f"❌ gRPC 错误: {e.code()}, {e.details()}, {elapsed:.0f}ms")
+                return False
+        finally:
+            self.finish(held)
+            for future in queued:
+                future.exception()
+
+    def run_all_tests(self):
+        """运行所有测试用例"""
+        print("🚀 开始运行准入排队测试用例")
+        print("=" * 50)
+
+        test_results = []
+
+        # 运行各个测试用例
+        test_results.append(self.test_expired_in_queue())
+        test_results.append(self.test_capacity_restored())
+        test_results.append(self.test_rejected_immediately())
+
+        # 统计结果
+        passed = sum(test_results)
+        total = len(test_results)
+
+        print("\n" + "=" * 50)
+        print(f"📊 测试结果统计:")
+        print(f"   通过: {passed}/{total}")
+        print(f"   失败: {total - passed}/{total}")
+
+        if passed == total:
+            print("🎉 所有测试用例通过!")
+        else:
+            print("⚠️  部分测试用例失败，请检查实现")
+
+        return passed == total
+
+
+if __name__ == "__main__":
+    # 创建测试实例并运行所有测试
+    test = TestAdmissionQueue()
+    test.run_all_tests()
@@ -0,0 +1,158 @@
+import grpc
+from user_srv.proto import user_pb2_grpc, user_pb2
+import random
+import string
+
+
+class TestBatchGetUsers:
+    """测试 BatchGetUsersById / BatchGetUsersByMobile 函数的测试用例"""
+
+    def __init__(self):
+        # 连接到 gRPC 服务器
+        channel = grpc.insecure_channel('localhost:50051')
+        self.stub = user_pb2_grpc.UserStub(channel)
+        self.users = []  # [(id, mobile)]
+
+    def generate_random_mobile(self):
+        """生成随机手机号"""
+        return "137" + "".join(random.choices(string.digits, k=8))
+
+    def setup_users(self, count=3):
+        """创建几个用于批量查询的用户"""
+        for i in range(count):
+            mobile = self.generate_random_mobile()
+            response = self.stub.CreateUser(user_pb2.CreateUserInfo(
+                nickName=f"批量测试用户{i}",
+                passWord="test123456",
+                mobile=mobile
+            ))
+            self.users.append((response.id, mobile))
+        print(f"创建测试用户: {self.users}")
+
+    def test_batch_by_id(self):
+        """测试按 id 批量查询，结果顺序与请求一致"""
+        print("\n=== 测试用例1: 按 id 批量查询 ===")
+
+        try:
+            ids = [user_id for user_id, _ in reversed(self.users)]
+            response = self.stub.BatchGetUsersById(user_pb2.BatchIdRequest(ids=ids))
+
+            if [user.id for user in response.data] == ids and all(response.found):
+                print(f"✅ 查询成功: {len(response.data)} 个用户，顺序正确")
+                return True
+            else:
+                print(f"❌ 测试失败: ids={[user.id for user in response.data]}, found={list(response.found)}")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_batch_by_mobile(self):
+        """测试按手机号批量查询"""
+        print("\n=== 测试用例2: 按手机号批量查询 ===")
+
+        try:
+            mobiles = [mobile for _, mobile in self.users]
+            response = self.stub.BatchGetUsersByMobile(user_pb2.BatchMobileRequest(mobiles=mobiles))
+
+            if [user.mobile for user in response.data] == mobiles and all(response.found):
+                print(f"✅ 查询成功: {len(response.data)} 个用户，顺序正确")
+                return True
+            else:
+                print(f"❌ 测试失败: mobiles={[user.mobile for user in response.data]}, found={list(response.found)}")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_missing_and_duplicate(self):
+        """测试不存在的 id 和重复的 id"""
+        print("\n=== 测试用例3: 不存在和重复的 id ===")
+
+        try:
+            user_id = self.users[0][0]
+            ids = [user_id, 999999999, user_id]
+            response = self.stub.BatchGetUsersById(user_pb2.BatchIdRequest(ids=ids))
+
+            if list(response.found) == [True, False, True] and response.data[2].id == user_id:
+                print("✅ 正确处理：不存在的 id 标记为 found=false，重复的 id 各返回一次")
+                return True
+            else:
+                print(f"❌ 测试失败: found={list(response.found)}")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_too_many_keys(self):
+        """测试超过单次上限的请求"""
+        print("\n=== 测试用例4: 超过单次上限 ===")
+
+        try:
+            response = self.stub.BatchGetUsersById(user_pb2.BatchIdRequest(ids=range(1, 100002)))
+            print(f"⚠️  超大请求未被拒绝: 返回 {len(response.data)} 条")
+            return False
+
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+                print("✅ 正确处理：返回 INVALID_ARGUMENT 状态码")
+                return True
+            else:
+                print(f"❌ 意外的 gRPC 错误: {e.code()}, {e.details()}")
+                return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def run_all_tests(self):
+        """运行所有测试用例"""
+        print("🚀 开始运行 BatchGetUsers 函数测试用例")
+        print("=" * 50)
+
+        test_results = []
+
+        try:
+            self.setup_users()
+        except grpc.RpcError as e:
+            print(f"❌ 创建测试用户失败: {e.code()}, {e.details()}")
+            return False
+
+        # 运行各个测试用例
+        test_results.append(self.test_batch_by_id())
+        test_results.append(self.test_batch_by_mobile())
+        test_results.append(self.test_missing_and_duplicate())
+        test_results.append(self.test_too_many_keys())
+
+        # 统计结果
+        passed = sum(test_results)
+        total = len(test_results)
+
+        print("\n" + "=" * 50)
+        print(f"📊 测试结果统计:")
+        print(f"   通过: {passed}/{total}")
+        print(f"   失败: {total - passed}/{total}")
+
+        if passed == total:
+            print("🎉 所有测试用例通过!")
+        else:
+            print("⚠️  部分测试用例失败，请检查实现")
+
+        return passed == total
+
+
+if __name__ == "__main__":
+    # 创建测试实例并运行所有测试
+    test = TestBatchGetUsers()
+    test.run_all_tests()
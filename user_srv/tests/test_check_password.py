@@ -0,0 +1,162 @@
+import grpc
+from user_srv.proto import user_pb2_grpc, user_pb2
+import random
+import string
+
+
+class TestCheckPassword:
+    """测试 CheckPassword 函数的测试用例"""
+
+    def __init__(self):
+        # 连接到 gRPC 服务器
+        channel = grpc.insecure_channel('localhost:50051')
+        self.stub = user_pb2_grpc.UserStub(channel)
+        self.mobile = None
+        self.password = "test123456"
+
+    def generate_random_mobile(self):
+        """生成随机手机号"""
+        return "139" + "".join(random.choices(string.digits, k=8))
+
+    def setup_user(self):
+        """创建一个用于校验密码的用户"""
+        self.mobile = self.generate_random_mobile()
+        response = self.stub.CreateUser(user_pb2.CreateUserInfo(
+            nickName="密码测试用户",
+            passWord=self.password,
+            mobile=self.mobile
+        ))
+        print(f"创建测试用户: ID={response.id}, 手机号={self.mobile}")
+        return response.id
+
+    def test_correct_password(self, user_id):
+        """测试正确的密码"""
+        print("\n=== 测试用例1: 正确的密码 ===")
+
+        try:
+            response = self.stub.CheckPassword(user_pb2.PasswordCheckInfo(
+                mobile=self.mobile, passWord=self.password))
+
+            if response.success and response.id == user_id:
+                print(f"✅ 密码校验通过: ID={response.id}")
+                return True
+            else:
+                print(f"❌ 测试失败: success={response.success}, id={response.id}")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_wrong_password(self):
+        """测试错误的密码"""
+        print("\n=== 测试用例2: 错误的密码 ===")
+
+        try:
+            response = self.stub.CheckPassword(user_pb2.PasswordCheckInfo(
+                mobile=self.mobile, passWord="wrong-password"))
+
+            if not response.success and not response.id:
+                print("✅ 正确处理：密码错误")
+                return True
+            else:
+                print(f"❌ 测试失败: 错误密码通过了校验 ID={response.id}")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_repeated_check(self, user_id):
+        """测试多次校验结果一致（首次校验可能触发重新哈希）"""
+        print("\n=== 测试用例3: 多次校验 ===")
+
+        try:
+            for i in range(3):
+                response = self.stub.CheckPassword(user_pb2.PasswordCheckInfo(
+                    mobile=self.mobile, passWord=self.password))
+                if not response.success or response.id != user_id:
+                    print(f"❌ 第 {i + 1} 次校验失败")
+                    return False
+            print("✅ 多次校验结果一致")
+            return True
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_nonexistent_user(self):
+        """测试不存在的用户"""
+        print("\n=== 测试用例4: 不存在的用户 ===")
+
+        try:
+            response = self.stub.CheckPassword(user_pb2.PasswordCheckInfo(
+                mobile="00000000000", passWord=self.password))
+
+            if response.success:
+                print("⚠️  不存在的用户通过了校验")
+                return False
+            else:
+                print("✅ 正确处理：校验失败")
+                return True
+
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.NOT_FOUND:
+                print("✅ 正确处理：返回 NOT_FOUND 状态码")
+                return True
+            else:
+                print(f"❌ 意外的 gRPC 错误: {e.code()}, {e.details()}")
+                return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def run_all_tests(self):
+        """运行所有测试用例"""
+        print("🚀 开始运行 CheckPassword 函数测试用例")
+        print("=" * 50)
+
+        test_results = []
+
+        try:
+            user_id = self.setup_user()
+        except grpc.RpcError as e:
+            print(f"❌ 创建测试用户失败: {e.code()}, {e.details()}")
+            return False
+
+        # 运行各个测试用例
+        test_results.append(self.test_correct_password(user_id))
+        test_results.append(self.test_wrong_password())
+        test_results.append(self.test_repeated_check(user_id))
+        test_results.append(self.test_nonexistent_user())
+
+        # 统计结果
+        passed = sum(test_results)
+        total = len(test_results)
+
+        print("\n" + "=" * 50)
+        print(f"📊 测试结果统计:")
+        print(f"   通过: {passed}/{total}")
+        print(f"   失败: {total - passed}/{total}")
+
+        if passed == total:
+            print("🎉 所有测试用例通过!")
+        else:
+            print("⚠️  部分测试用例失败，请检查实现")
+
+        return passed == total
+
+
+if __name__ == "__main__":
+    # 创建测试实例并运行所有测试
+    test = TestCheckPassword()
+    test.run_all_tests()
@@ -215,6 +215,61 @@ class TestCreateUser:
             print(f"❌ 其他错误: {e}")
             return False
     
+    def test_idempotent_retry(self):
+        """测试带幂等键的重试返回第一次的结果"""
+        print("\n=== 测试用例6: 幂等键重试 ===")
+        
+        try:
+            request = user_pb2.CreateUserInfo(
+                nickName="幂等测试用户",
+                passWord="test123456",
+                mobile=self.generate_random_mobile(),
+                idempotencyKey="".join(random.choices(string.ascii_letters, k=16))
+            )
+            
+            first = self.stub.CreateUser(request)
+            retry = self.stub.CreateUser(request)
+            
+            if first.id and retry == first:
+                print(f"✅ 重试返回第一次的结果: ID={retry.id}")
+                return True
+            else:
+                print(f"❌ 测试失败: 第一次 ID={first.id}, 重试 ID={retry.id}")
+                return False
+                
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+    
+    def test_duplicate_without_key(self):
+        """测试不带幂等键重复创建同一个手机号"""
+        print("\n=== 测试用例7: 不带幂等键重复创建 ===")
+        
+        try:
+            request = user_pb2.CreateUserInfo(
+                nickName="重复用户",
+                passWord="test123456",
+                mobile=self.generate_random_mobile()
+            )
+            self.stub.CreateUser(request)
+            response = self.stub.CreateUser(request)
+            print(f"⚠️  意外创建了重复用户: ID={response.id}")
+            return False
+                
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.ALREADY_EXISTS:
+                print("✅ 正确处理：返回 ALREADY_EXISTS 状态码")
+                return True
+            else:
+                print(f"❌ 意外的 gRPC 错误: {e.code()}, {e.details()}")
+                return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+    
     def run_all_tests(self):
         """运行所有测试用例"""
         print("🚀 开始运行 CreateUser 函数测试用例")
@@ -237,6 +292,8 @@ class TestCreateUser:
         created_users.extend([user['id'] for user in batch_users])
         
         test_results.append(self.test_password_encryption())
+        test_results.append(self.test_idempotent_retry())
+        test_results.append(self.test_duplicate_without_key())
         
         # 统计结果
         passed = sum(test_results)
@@ -0,0 +1,154 @@
+import grpc
+from user_srv.proto import user_pb2_grpc, user_pb2
+import random
+import string
+
+
+class TestCreateUsers:
+    """测试 CreateUsers 函数的测试用例"""
+
+    def __init__(self):
+        # 连接到 gRPC 服务器
+        channel = grpc.insecure_channel('localhost:50051')
+        self.stub = user_pb2_grpc.UserStub(channel)
+        self.password = "test123456"
+
+    def generate_random_mobile(self):
+        """生成随机手机号"""
+        return "136" + "".join(random.choices(string.digits, k=8))
+
+    def stream(self, mobiles):
+        for i, mobile in enumerate(mobiles):
+            yield user_pb2.CreateUserInfo(nickName=f"批量用户{i}", passWord=self.password, mobile=mobile)
+
+    def test_bulk_create(self):
+        """测试跨多个批次的批量创建"""
+        print("\n=== 测试用例1: 批量创建 ===")
+
+        try:
+            mobiles = list({self.generate_random_mobile() for _ in range(450)})
+            response = self.stub.CreateUsers(self.stream(mobiles))
+
+            ids = [result.id for result in response.results]
+            if (response.created == len(mobiles) and response.failed == 0
+                    and [result.index for result in response.results] == list(range(len(mobiles)))
+                    and all(ids) and len(set(ids)) == len(ids)):
+                print(f"✅ 创建成功: {response.created} 个用户")
+                return True
+            else:
+                print(f"❌ 测试失败: created={response.created}, failed={response.failed}")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_duplicates(self):
+        """测试已存在的手机号和流内重复的手机号只影响对应的行"""
+        print("\n=== 测试用例2: 重复的手机号 ===")
+
+        try:
+            existing = self.generate_random_mobile()
+            self.stub.CreateUser(user_pb2.CreateUserInfo(nickName="已存在用户", passWord=self.password, mobile=existing))
+
+            fresh = self.generate_random_mobile()
+            other = self.generate_random_mobile()
+            response = self.stub.CreateUsers(self.stream([fresh, existing, fresh, other]))
+
+            created = [result.created for result in response.results]
+            if created == [True, False, False, True] and all(r.error for r in response.results if not r.created):
+                print(f"✅ 正确处理：{response.failed} 行报错，其余 {response.created} 行创建成功")
+                return True
+            else:
+                print(f"❌ 测试失败: {created}")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_created_user_usable(self):
+        """测试批量创建的用户可以查询和登录"""
+        print("\n=== 测试用例3: 创建后查询和校验密码 ===")
+
+        try:
+            mobile = self.generate_random_mobile()
+            result = self.stub.CreateUsers(self.stream([mobile])).results[0]
+            user = self.stub.GetUserByMobile(user_pb2.MobileRequest(mobile=mobile))
+            check = self.stub.CheckPassword(user_pb2.PasswordCheckInfo(mobile=mobile, passWord=self.password))
+
+            if user.id == result.id and check.success:
+                print(f"✅ 用户可用: ID={user.id}")
+                return True
+            else:
+                print(f"❌ 测试失败: id={user.id}/{result.id}, success={check.success}")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_empty_stream(self):
+        """测试空的请求流"""
+        print("\n=== 测试用例4: 空的请求流 ===")
+
+        try:
+            response = self.stub.CreateUsers(iter([]))
+
+            if response.created == 0 and response.failed == 0 and not response.results:
+                print("✅ 正确处理：空结果")
+                return True
+            else:
+                print(f"❌ 测试失败: {response}")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def run_all_tests(self):
+        """运行所有测试用例"""
+        print("🚀 开始运行 CreateUsers 函数测试用例")
+        print("=" * 50)
+
+        test_results = []
+
+        # 运行各个测试用例
+        test_results.append(self.test_bulk_create())
+        test_results.append(self.test_duplicates())
+        test_results.append(self.test_created_user_usable())
+        test_results.append(self.test_empty_stream())
+
+        # 统计结果
+        passed = sum(test_results)
+        total = len(test_results)
+
+        print("\n" + "=" * 50)
+        print(f"📊 测试结果统计:")
+        print(f"   通过: {passed}/{total}")
+        print(f"   失败: {total - passed}/{total}")
+
+        if passed == total:
+            print("🎉 所有测试用例通过!")
+        else:
+            print("⚠️  部分测试用例失败，请检查实现")
+
+        return passed == total
+
+
+if __name__ == "__main__":
+    # 创建测试实例并运行所有测试
+    test = TestCreateUsers()
+    test.run_all_tests()
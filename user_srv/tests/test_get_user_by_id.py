@@ -1,5 +1,6 @@
 import grpc
 from user_srv.proto import user_pb2_grpc, user_pb2
+from google.protobuf import field_mask_pb2
 
 
 class TestGetUserById:
@@ -128,6 +129,39 @@ class TestGetUserById:
         print(f"总共找到 {found_users} 个用户")
         return found_users > 0
     
+    def test_read_mask(self):
+        """测试 readMask 只返回指定字段"""
+        print("\n=== 测试用例5: readMask 只返回指定字段 ===")
+        
+        try:
+            full = self.stub.GetUserById(user_pb2.IdRequest(id=1))
+            request = user_pb2.IdRequest(id=1, readMask=field_mask_pb2.FieldMask(paths=["nickName"]))
+            response = self.stub.GetUserById(request)
+            
+            if response.id == full.id and response.nickName == full.nickName and not response.mobile:
+                print(f"✅ 只返回了 id 和昵称: {response.id}, {response.nickName}")
+            else:
+                print(f"❌ 测试失败: {response}")
+                return False
+            
+            try:
+                self.stub.GetUserById(user_pb2.IdRequest(id=1, readMask=field_mask_pb2.FieldMask(paths=["password"])))
+                print("⚠️  未知字段被接受了")
+                return False
+            except grpc.RpcError as e:
+                if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+                    print("✅ 正确处理：未知字段返回 INVALID_ARGUMENT 状态码")
+                    return True
+                print(f"❌ 意外的 gRPC 错误: {e.code()}, {e.details()}")
+                return False
+                
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+    
     def run_all_tests(self):
         """运行所有测试用例"""
         print("🚀 开始运行 GetUserById 函数测试用例")
@@ -140,6 +174,7 @@ class TestGetUserById:
         test_results.append(self.test_get_nonexistent_user())
         test_results.append(self.test_get_user_with_invalid_id())
         test_results.append(self.test_multiple_users())
+        test_results.append(self.test_read_mask())
         
         # 统计结果
         passed = sum(test_results)
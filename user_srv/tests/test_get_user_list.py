@@ -0,0 +1,208 @@
+import grpc
+from user_srv.proto import user_pb2_grpc, user_pb2
+from google.protobuf import field_mask_pb2
+
+
+class TestGetUserList:
+    """测试 GetUserList 函数的测试用例"""
+
+    def __init__(self):
+        # 连接到 gRPC 服务器
+        channel = grpc.insecure_channel('localhost:50051')
+        self.stub = user_pb2_grpc.UserStub(channel)
+
+    def test_page_number(self):
+        """测试老的 pn/pSize 分页"""
+        print("=== 测试用例1: pn/pSize 分页 ===")
+
+        try:
+            response = self.stub.GetUserList(user_pb2.PageInfo(pn=1, pSize=2))
+            print(f"   总数: {response.total}, 本页: {len(response.data)}")
+
+            if len(response.data) <= 2 and response.total >= len(response.data):
+                print("✅ pn/pSize 分页正常")
+                return True
+            else:
+                print("❌ 测试失败: 返回条数与 pSize 不符")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_cursor_walk(self):
+        """测试用 nextCursor 遍历全部用户"""
+        print("\n=== 测试用例2: cursor 遍历 ===")
+
+        try:
+            ids = []
+            cursor = ""
+            pages = 0
+            while True:
+                response = self.stub.GetUserList(user_pb2.PageInfo(pSize=3, cursor=cursor))
+                ids.extend(user.id for user in response.data)
+                pages += 1
+                if not response.nextCursor:
+                    break
+                cursor = response.nextCursor
+
+            print(f"   共 {pages} 页, {len(ids)} 个用户")
+            if ids == sorted(set(ids)):
+                print("✅ cursor 遍历结果按 id 递增且无重复")
+                return True
+            else:
+                print("❌ 测试失败: cursor 遍历结果有重复或乱序")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_cursor_matches_page_number(self):
+        """测试 cursor 分页与 pn 分页结果一致"""
+        print("\n=== 测试用例3: cursor 与 pn 结果一致 ===")
+
+        try:
+            first = self.stub.GetUserList(user_pb2.PageInfo(pn=1, pSize=2))
+            if not first.nextCursor:
+                print("ℹ️  用户数不足两页，跳过")
+                return True
+
+            by_pn = self.stub.GetUserList(user_pb2.PageInfo(pn=2, pSize=2))
+            by_cursor = self.stub.GetUserList(user_pb2.PageInfo(pSize=2, cursor=first.nextCursor))
+
+            if [u.id for u in by_pn.data] == [u.id for u in by_cursor.data]:
+                print("✅ 第二页结果一致")
+                return True
+            else:
+                print("❌ 测试失败: 第二页结果不一致")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_invalid_cursor(self):
+        """测试非法 cursor"""
+        print("\n=== 测试用例4: 非法 cursor ===")
+
+        try:
+            self.stub.GetUserList(user_pb2.PageInfo(cursor="not-a-cursor"))
+            print("❌ 测试失败: 非法 cursor 未报错")
+            return False
+
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+                print("✅ 正确处理：返回 INVALID_ARGUMENT 状态码")
+                return True
+            else:
+                print(f"❌ 意外的 gRPC 错误: {e.code()}, {e.details()}")
+                return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_total_modes(self):
+        """测试 total 的各种统计方式"""
+        print("\n=== 测试用例5: total 统计方式 ===")
+
+        try:
+            exact = self.stub.GetUserList(user_pb2.PageInfo(pSize=1, totalMode=user_pb2.TOTAL_EXACT))
+            cached = self.stub.GetUserList(user_pb2.PageInfo(pSize=1, totalMode=user_pb2.TOTAL_CACHED))
+            approx = self.stub.GetUserList(user_pb2.PageInfo(pSize=1, totalMode=user_pb2.TOTAL_APPROX))
+            skip = self.stub.GetUserList(user_pb2.PageInfo(pSize=1, totalMode=user_pb2.TOTAL_SKIP))
+            print(f"   exact={exact.total}, cached={cached.total}, approx={approx.total}, skip={skip.total}")
+
+            if cached.total != exact.total:
+                print("❌ 测试失败: cached 与 exact 结果不一致")
+                return False
+            if skip.totalMode != user_pb2.TOTAL_SKIP or skip.total != 0:
+                print("❌ 测试失败: skip 模式仍然返回了 total")
+                return False
+            if approx.totalMode != user_pb2.TOTAL_APPROX:
+                print("❌ 测试失败: 返回的 totalMode 不对")
+                return False
+            print("✅ total 统计方式正常")
+            return True
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_read_mask(self):
+        """测试 readMask 只返回指定字段，且不影响游标分页"""
+        print("\n=== 测试用例6: readMask ===")
+
+        try:
+            mask = field_mask_pb2.FieldMask(paths=["nickName", "gender"])
+            full = self.stub.GetUserList(user_pb2.PageInfo(pSize=3))
+            response = self.stub.GetUserList(user_pb2.PageInfo(pSize=3, readMask=mask))
+
+            if ([user.id for user in response.data] != [user.id for user in full.data]
+                    or response.nextCursor != full.nextCursor):
+                print("❌ 测试失败: 加了 readMask 后分页结果不一致")
+                return False
+            if any(user.mobile or user.role for user in response.data):
+                print("❌ 测试失败: 返回了 readMask 以外的字段")
+                return False
+            if [user.nickName for user in response.data] != [user.nickName for user in full.data]:
+                print("❌ 测试失败: readMask 内的字段不正确")
+                return False
+            print("✅ readMask 正常")
+            return True
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def run_all_tests(self):
+        """运行所有测试用例"""
+        print("🚀 开始运行 GetUserList 函数测试用例")
+        print("=" * 50)
+
+        test_results = []
+
+        # 运行各个测试用例
+        test_results.append(self.test_page_number())
+        test_results.append(self.test_cursor_walk())
+        test_results.append(self.test_cursor_matches_page_number())
+        test_results.append(self.test_invalid_cursor())
+        test_results.append(self.test_total_modes())
+        test_results.append(self.test_read_mask())
+
+        # 统计结果
+        passed = sum(test_results)
+        total = len(test_results)
+
+        print("\n" + "=" * 50)
+        print(f"📊 测试结果统计:")
+        print(f"   通过: {passed}/{total}")
+        print(f"   失败: {total - passed}/{total}")
+
+        if passed == total:
+            print("🎉 所有测试用例通过!")
+        else:
+            print("⚠️  部分测试用例失败，请检查实现")
+
+        return passed == total
+
+
+if __name__ == "__main__":
+    # 创建测试实例并运行所有测试
+    test = TestGetUserList()
+    test.run_all_tests()
@@ -0,0 +1,87 @@
+import grpc
+from user_srv.proto import health_pb2_grpc, health_pb2
+
+
+class TestHealth:
+    """测试 grpc.health.v1.Health 的 Check"""
+
+    def __init__(self):
+        # 连接到 gRPC 服务器
+        channel = grpc.insecure_channel('localhost:50051')
+        self.stub = health_pb2_grpc.HealthStub(channel)
+
+    def test_server_serving(self):
+        """服务启动完成后整个进程是 SERVING"""
+        print("\n=== 测试用例1: 整体健康状态 ===")
+        try:
+            response = self.stub.Check(health_pb2.HealthCheckRequest())
+            if response.status != health_pb2.HealthCheckResponse.SERVING:
+                print(f"❌ 状态不是 SERVING: {response.status}")
+                return False
+            print("✅ SERVING")
+            return True
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+
+    def test_user_service_serving(self):
+        """按服务名查询 User 服务"""
+        print("\n=== 测试用例2: User 服务健康状态 ===")
+        try:
+            response = self.stub.Check(health_pb2.HealthCheckRequest(service="User"))
+            if response.status != health_pb2.HealthCheckResponse.SERVING:
+                print(f"❌ 状态不是 SERVING: {response.status}")
+                return False
+            print("✅ User 服务 SERVING")
+            return True
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+
+    def test_unknown_service(self):
+        """未知的服务名返回 NOT_FOUND"""
+        print("\n=== 测试用例3: 未知服务 ===")
+        try:
+            self.stub.Check(health_pb2.HealthCheckRequest(service="NoSuchService"))
+            print("❌ 应该返回 NOT_FOUND")
+            return False
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.NOT_FOUND:
+                print("✅ 正确返回 NOT_FOUND")
+                return True
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+
+    def run_all_tests(self):
+        """运行所有测试用例"""
+        print("🚀 开始运行健康检查测试用例")
+        print("=" * 50)
+
+        test_results = []
+
+        # 运行各个测试用例
+        test_results.append(self.test_server_serving())
+        test_results.append(self.test_user_service_serving())
+        test_results.append(self.test_unknown_service())
+
+        # 统计结果
+        passed = sum(test_results)
+        total = len(test_results)
+
+        print("\n" + "=" * 50)
+        print(f"📊 测试结果统计:")
+        print(f"   通过: {passed}/{total}")
+        print(f"   失败: {total - passed}/{total}")
+
+        if passed == total:
+            print("🎉 所有测试用例通过!")
+        else:
+            print("⚠️  部分测试用例失败，请检查实现")
+
+        return passed == total
+
+
+if __name__ == "__main__":
+    # 创建测试实例并运行所有测试
+    test = TestHealth()
+    test.run_all_tests()
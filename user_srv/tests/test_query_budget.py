@@ -0,0 +1,109 @@
+import grpc
+from user_srv.proto import user_pb2_grpc, user_pb2
+from google.protobuf import field_mask_pb2
+import random
+import string
+
+# 请求元数据里带上它，服务端会在 trailing metadata 里返回本次执行的 SQL 条数
+TRACE_METADATA = (("x-sql-trace", "1"),)
+
+
+class TestQueryBudget:
+    """检查各个 RPC 执行的 SQL 条数，防止多查一次库的回归"""
+
+    def __init__(self):
+        # 连接到 gRPC 服务器
+        channel = grpc.insecure_channel('localhost:50051')
+        self.stub = user_pb2_grpc.UserStub(channel)
+        self.mobile = "134" + "".join(random.choices(string.digits, k=8))
+        self.user_id = None
+
+    def statements(self, rpc, request):
+        """调用 rpc，返回 (响应, SQL 条数)"""
+        response, call = rpc.with_call(request, metadata=TRACE_METADATA)
+        trailing = dict(call.trailing_metadata() or ())
+        return response, int(trailing.get("x-sql-statements", -1))
+
+    def check(self, desc, rpc, request, budget):
+        print(f"\n=== {desc} ===")
+        try:
+            response, n = self.statements(rpc, request)
+            if n < 0:
+                print("❌ 测试失败: 服务端没有返回 x-sql-statements")
+                return False, response
+            if n > budget:
+                print(f"❌ 执行了 {n} 条 SQL，超过预算 {budget}")
+                return False, response
+            print(f"✅ 执行了 {n} 条 SQL（预算 {budget}）")
+            return True, response
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False, None
+
+    def test_create_user(self):
+        ok, response = self.check("测试用例1: CreateUser 只执行一条 INSERT", self.stub.CreateUser,
+                                  user_pb2.CreateUserInfo(nickName="预算测试", passWord="test123456", mobile=self.mobile), 1)
+        if response is not None:
+            self.user_id = response.id
+        return ok
+
+    def test_get_user_by_id(self):
+        request = user_pb2.IdRequest(id=self.user_id)
+        ok, _ = self.check("测试用例2: GetUserById 首次查询", self.stub.GetUserById, request, 1)
+        cached, _ = self.check("测试用例3: GetUserById 命中缓存", self.stub.GetUserById, request, 0)
+        return ok and cached
+
+    def test_update_user(self):
+        request = user_pb2.UpdateUserInfo(id=self.user_id, nickName="预算测试2",
+                                          updateMask=field_mask_pb2.FieldMask(paths=["nickName"]))
+        ok, _ = self.check("测试用例4: UpdateUser 只执行一条 UPDATE", self.stub.UpdateUser, request, 1)
+        return ok
+
+    def test_get_user_list(self):
+        request = user_pb2.PageInfo(pSize=5, totalMode=user_pb2.TOTAL_EXACT)
+        ok, _ = self.check("测试用例5: GetUserList 分页 + COUNT", self.stub.GetUserList, request, 2)
+        skip, _ = self.check("测试用例6: GetUserList 不统计 total", self.stub.GetUserList,
+                             user_pb2.PageInfo(pSize=5, totalMode=user_pb2.TOTAL_SKIP), 1)
+        return ok and skip
+
+    def test_check_password(self):
+        request = user_pb2.PasswordCheckInfo(mobile=self.mobile, passWord="test123456")
+        ok, _ = self.check("测试用例7: CheckPassword", self.stub.CheckPassword, request, 2)
+        return ok
+
+    def run_all_tests(self):
+        """运行所有测试用例"""
+        print("🚀 开始运行 SQL 条数预算测试用例")
+        print("=" * 50)
+
+        test_results = []
+
+        # 运行各个测试用例
+        test_results.append(self.test_create_user())
+        if self.user_id:
+            test_results.append(self.test_get_user_by_id())
+            test_results.append(self.test_update_user())
+        test_results.append(self.test_get_user_list())
+        test_results.append(self.test_check_password())
+
+        # 统计结果
+        passed = sum(test_results)
+        total = len(test_results)
+
+        print("\n" + "=" * 50)
+        print(f"📊 测试结果统计:")
+        print(f"   通过: {passed}/{total}")
+        print(f"   失败: {total - passed}/{total}")
+
+        if passed == total:
+            print("🎉 所有测试用例通过!")
+        else:
+            print("⚠️  部分测试用例失败，请检查实现")
+
+        return passed == total
+
+
+if __name__ == "__main__":
+    # 创建测试实例并运行所有测试
+    test = TestQueryBudget()
+    test.run_all_tests()
@@ -0,0 +1,185 @@
+from user_srv.common.cache import CachedUser
+from user_srv.common.redis_cache import MemoryRedis, RedisError, RedisUserCache, _MemoryPipeline
+from datetime import date
+import threading
+import time
+
+
+class FailingRedis(MemoryRedis):
+    """所有命令都抛出 RedisError，模拟 Redis 不可用"""
+
+    def _fail(self, *args, **kwargs):
+        raise RedisError("connection refused")
+
+    get = mget = set = delete = exists = _fail
+
+    def pipeline(self, transaction=False):
+        pipe = _MemoryPipeline(self)
+        pipe.execute = self._fail
+        return pipe
+
+
+class RacingRedis(MemoryRedis):
+    """第 n 个 pipeline 执行前先调用 hook，模拟 put_many 两次往返之间插进来的 invalidate"""
+
+    def __init__(self, n, hook):
+        super().__init__()
+        self.n = n
+        self.hook = hook
+
+    def pipeline(self, transaction=False):
+        pipe = _MemoryPipeline(self)
+        self.n -= 1
+        if self.n == 0:
+            execute = pipe.execute
+
+            def racing():
+                self.hook()
+                return execute()
+            pipe.execute = racing
+        return pipe
+
+
+class TestRedisCache:
+    """测试 Redis 共享缓存，用进程内的 MemoryRedis 代替 Redis，不需要启动服务端"""
+
+    def user(self, user_id=1, mobile="13500000001", nick_name="缓存测试"):
+        return CachedUser(user_id, mobile, 1, nick_name, "male", date(2000, 1, 1))
+
+    def test_hit(self):
+        """put 之后按 id 和 mobile 都能读到"""
+        print("\n=== 测试用例1: 按 id 和 mobile 命中 ===")
+        cache = RedisUserCache(MemoryRedis())
+        cache.put(self.user())
+        by_id, by_mobile = cache.get_by_id(1), cache.get_by_mobile("13500000001")
+        if by_id is None or by_mobile is None:
+            print(f"❌ 没有命中: {by_id}, {by_mobile}")
+            return False
+        if (by_id.nick_name, by_id.birthday, by_mobile.id) != ("缓存测试", date(2000, 1, 1), 1):
+            print(f"❌ 读到的记录不对: {by_id.nick_name}, {by_id.birthday}, {by_mobile.id}")
+            return False
+        print("✅ 两个键都命中")
+        return True
+
+    def test_tombstone(self):
+        """invalidate 之后墓碑存在期间不回填"""
+        print("\n=== 测试用例2: 墓碑阻止回填 ===")
+        cache = RedisUserCache(MemoryRedis(), tombstone_ttl=0.2)
+        cache.put(self.user())
+        cache.invalidate(user_id=1, mobile="13500000001")
+        cache.put(self.user(nick_name="旧数据"))
+        if cache.get_by_id(1) is not None:
+            print("❌ 墓碑存在期间回填了")
+            return False
+        time.sleep(0.3)
+        cache.put(self.user())
+        if cache.get_by_id(1) is None:
+            print("❌ 墓碑过期后没有回填")
+            return False
+        print("✅ 墓碑期间不回填，过期后正常回填")
+        return True
+
+    def test_invalidate_by_id(self):
+        """只给 id 失效时也删掉 mobile 键"""
+        print("\n=== 测试用例3: 按 id 失效同时删除 mobile 键 ===")
+        cache = RedisUserCache(MemoryRedis())
+        cache.put(self.user())
+        cache.invalidate(user_id=1)
+        if cache.get_by_id(1) is not None or cache.get_by_mobile("13500000001") is not None:
+            print("❌ 失效后还能读到")
+            return False
+        print("✅ 两个键都已删除")
+        return True
+
+    def test_put_races_invalidate(self):
+        """查墓碑和写入之间插进来的 invalidate 不会留下旧数据"""
+        print("\n=== 测试用例4: 回填与失效并发 ===")
+        cache = RedisUserCache(RacingRedis(2, lambda: cache.invalidate(user_id=1, mobile="13500000001")))
+        cache.put(self.user(nick_name="旧数据"))
+        if cache.get_by_id(1) is not None or cache.get_by_mobile("13500000001") is not None:
+            print("❌ 失效之后写入的旧数据留在了缓存里")
+            return False
+        print("✅ 旧数据已删除")
+        return True
+
+    def test_stampede_lock(self):
+        """并发未命中时只有一个请求查库"""
+        print("\n=== 测试用例5: 防击穿锁 ===")
+        cache = RedisUserCache(MemoryRedis())
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.1)
+            return self.user()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.load_by_id(1, loader))) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if len(calls) != 1:
+            print(f"❌ 查库 {len(calls)} 次")
+            return False
+        if len(results) != 10 or any(user is None or user.id != 1 for user in results):
+            print(f"❌ 有请求没拿到结果: {results}")
+            return False
+        print("✅ 10 个并发请求只查库 1 次")
+        return True
+
+    def test_redis_error(self):
+        """Redis 出错时读退回查库，写和失效跳过，不抛异常"""
+        print("\n=== 测试用例6: Redis 不可用时退回查库 ===")
+        cache = RedisUserCache(FailingRedis())
+        try:
+            user = cache.load_by_id(1, self.user)
+            missed = cache.get_by_mobile("13500000001")
+            batch = cache.get_many_by_id([1, 2])
+            cache.put(self.user())
+            cache.invalidate(user_id=1)
+        except RedisError as e:
+            print(f"❌ 抛出了 RedisError: {e}")
+            return False
+        if user is None or user.id != 1 or missed is not None or batch:
+            print(f"❌ 结果不对: {user}, {missed}, {batch}")
+            return False
+        print("✅ 查库拿到了结果，没有抛出异常")
+        return True
+
+    def run_all_tests(self):
+        """运行所有测试用例"""
+        print("🚀 开始运行 Redis 缓存测试用例")
+        print("=" * 50)
+
+        test_results = []
+
+        # 运行各个测试用例
+        test_results.append(self.test_hit())
+        test_results.append(self.test_tombstone())
+        test_results.append(self.test_invalidate_by_id())
+        test_results.append(self.test_put_races_invalidate())
+        test_results.append(self.test_stampede_lock())
+        test_results.append(self.test_redis_error())
+
+        # 统计结果
+        passed = sum(test_results)
+        total = len(test_results)
+
+        print("\n" + "=" * 50)
+        print(f"📊 测试结果统计:")
+        print(f"   通过: {passed}/{total}")
+        print(f"   失败: {total - passed}/{total}")
+
+        if passed == total:
+            print("🎉 所有测试用例通过!")
+        else:
+            print("⚠️  部分测试用例失败，请检查实现")
+
+        return passed == total
+
+
+if __name__ == "__main__":
+    # 创建测试实例并运行所有测试
+    test = TestRedisCache()
+    test.run_all_tests()
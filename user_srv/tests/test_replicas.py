@@ -0,0 +1,115 @@
+import grpc
+from user_srv.proto import user_pb2_grpc, user_pb2
+from google.protobuf import field_mask_pb2
+import random
+import string
+
+
+class TestReplicas:
+    """测试读写分离下的读到自己的写
+
+    服务端用 --replicas 启动。可以拿两个互不复制的本地库测试：一个作主库，另一个作 --replicas，
+    刚写过的用户只在主库里，这些用例只有在读请求按 --replica-sticky-seconds 回到主库时才能通过。
+    """
+
+    def __init__(self):
+        # 连接到 gRPC 服务器
+        channel = grpc.insecure_channel('localhost:50051')
+        self.stub = user_pb2_grpc.UserStub(channel)
+        self.mobile = "135" + "".join(random.choices(string.digits, k=8))
+        self.user_id = None
+
+    def test_read_after_create(self):
+        """创建后立即按 id 读回"""
+        print("\n=== 测试用例1: CreateUser 后立即 GetUserById ===")
+        try:
+            created = self.stub.CreateUser(user_pb2.CreateUserInfo(
+                nickName="副本测试", passWord="test123456", mobile=self.mobile))
+            self.user_id = created.id
+            user = self.stub.GetUserById(user_pb2.IdRequest(id=created.id))
+            if user.mobile != self.mobile:
+                print(f"❌ 读回的手机号不一致: {user.mobile}")
+                return False
+            print(f"✅ 读到刚创建的用户 ID={user.id}")
+            return True
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+
+    def test_read_by_mobile_after_create(self):
+        """创建后立即按手机号读回"""
+        print("\n=== 测试用例2: CreateUser 后立即 GetUserByMobile ===")
+        try:
+            user = self.stub.GetUserByMobile(user_pb2.MobileRequest(mobile=self.mobile))
+            if user.id != self.user_id:
+                print(f"❌ 读回的 ID 不一致: {user.id}")
+                return False
+            print(f"✅ 按手机号读到刚创建的用户 ID={user.id}")
+            return True
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+
+    def test_read_after_update(self):
+        """更新昵称后立即读回，按 id 和按手机号都应该是新值"""
+        print("\n=== 测试用例3: UpdateUser 后立即读回 ===")
+        try:
+            self.stub.UpdateUser(user_pb2.UpdateUserInfo(
+                id=self.user_id, nickName="副本测试2", updateMask=field_mask_pb2.FieldMask(paths=["nickName"])))
+            by_id = self.stub.GetUserById(user_pb2.IdRequest(id=self.user_id))
+            by_mobile = self.stub.GetUserByMobile(user_pb2.MobileRequest(mobile=self.mobile))
+            if by_id.nickName != "副本测试2" or by_mobile.nickName != "副本测试2":
+                print(f"❌ 读到旧数据: 按 id {by_id.nickName}, 按手机号 {by_mobile.nickName}")
+                return False
+            print("✅ 按 id 和手机号都读到了新昵称")
+            return True
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+
+    def test_list_from_replica(self):
+        """GetUserList 走副本，能正常返回"""
+        print("\n=== 测试用例4: GetUserList ===")
+        try:
+            response = self.stub.GetUserList(user_pb2.PageInfo(pn=1, pSize=5))
+            print(f"✅ 返回 {len(response.data)} 条，total={response.total}")
+            return True
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+
+    def run_all_tests(self):
+        """运行所有测试用例"""
+        print("🚀 开始运行读写分离测试用例")
+        print("=" * 50)
+
+        test_results = []
+
+        # 运行各个测试用例
+        test_results.append(self.test_read_after_create())
+        if self.user_id:
+            test_results.append(self.test_read_by_mobile_after_create())
+            test_results.append(self.test_read_after_update())
+        test_results.append(self.test_list_from_replica())
+
+        # 统计结果
+        passed = sum(test_results)
+        total = len(test_results)
+
+        print("\n" + "=" * 50)
+        print(f"📊 测试结果统计:")
+        print(f"   通过: {passed}/{total}")
+        print(f"   失败: {total - passed}/{total}")
+
+        if passed == total:
+            print("🎉 所有测试用例通过!")
+        else:
+            print("⚠️  部分测试用例失败，请检查实现")
+
+        return passed == total
+
+
+if __name__ == "__main__":
+    # 创建测试实例并运行所有测试
+    test = TestReplicas()
+    test.run_all_tests()
@@ -0,0 +1,144 @@
+import grpc
+from user_srv.model.sharding import slot_for_id, slot_for_mobile
+from user_srv.proto import user_pb2_grpc, user_pb2
+from user_srv.settings import setting
+import random
+import string
+
+
+class TestSharding:
+    """测试按手机号分片
+
+    服务端用 --shards 启动，本地可以让所有逻辑分片落在同一个实例上：先
+    python -m user_srv.model.reshard --shards 0-15=127.0.0.1:3306 init 建库，再用同样的 --shards 启动服务。
+    SHARD_SLOTS 要与服务端一致。
+    """
+
+    def __init__(self):
+        # 连接到 gRPC 服务器
+        channel = grpc.insecure_channel('localhost:50051')
+        self.stub = user_pb2_grpc.UserStub(channel)
+        self.slots = setting.SHARD_SLOTS
+        self.users = {}  # 手机号 -> id
+
+    def generate_random_mobile(self):
+        """生成随机手机号"""
+        return "137" + "".join(random.choices(string.digits, k=8))
+
+    def test_create_routes_by_mobile(self):
+        """CreateUser 和 CreateUsers 建出的用户 id 落在手机号对应的分片上"""
+        print("\n=== 测试用例1: 创建的用户按手机号分片 ===")
+        try:
+            for i in range(10):
+                mobile = self.generate_random_mobile()
+                user = self.stub.CreateUser(user_pb2.CreateUserInfo(nickName=f"分片用户{i}", passWord="test123456", mobile=mobile))
+                self.users[mobile] = user.id
+            mobiles = list({self.generate_random_mobile() for _ in range(40)} - set(self.users))
+            response = self.stub.CreateUsers(user_pb2.CreateUserInfo(nickName=f"分片批量{i}", passWord="test123456", mobile=mobile)
+                                             for i, mobile in enumerate(mobiles))
+            self.users.update((result.mobile, result.id) for result in response.results if result.created)
+            wrong = [(mobile, user_id) for mobile, user_id in self.users.items()
+                     if slot_for_id(user_id, self.slots) != slot_for_mobile(mobile, self.slots)]
+            if wrong or response.created != len(mobiles):
+                print(f"❌ 分片不一致: {wrong[:5]}, 批量创建 {response.created}/{len(mobiles)}")
+                return False
+            print(f"✅ {len(self.users)} 个用户都在手机号对应的分片上，用到 {len({slot_for_id(i, self.slots) for i in self.users.values()})} 个分片")
+            return True
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+
+    def test_lookup(self):
+        """按 id、手机号和批量接口都能读回"""
+        print("\n=== 测试用例2: 按 id 和手机号读回 ===")
+        try:
+            for mobile, user_id in self.users.items():
+                by_id = self.stub.GetUserById(user_pb2.IdRequest(id=user_id))
+                by_mobile = self.stub.GetUserByMobile(user_pb2.MobileRequest(mobile=mobile))
+                if by_id.mobile != mobile or by_mobile.id != user_id:
+                    print(f"❌ 读回不一致: {mobile} -> {by_id.mobile}/{by_mobile.id}")
+                    return False
+            batch = self.stub.BatchGetUsersById(user_pb2.BatchIdRequest(ids=list(self.users.values())))
+            if not all(batch.found):
+                print(f"❌ 批量读回 {sum(batch.found)}/{len(batch.found)}")
+                return False
+            print(f"✅ {len(self.users)} 个用户都能读回")
+            return True
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+
+    def test_list_merge(self):
+        """GetUserList 的 pn 分页和 cursor 分页都按 id 全局有序，两种方式结果一致"""
+        print("\n=== 测试用例3: GetUserList 跨分片归并 ===")
+        try:
+            by_pn = []
+            for pn in range(1, 4):
+                by_pn.extend(user.id for user in self.stub.GetUserList(user_pb2.PageInfo(pn=pn, pSize=7)).data)
+            by_cursor, cursor = [], ""
+            while len(by_cursor) < 21:
+                page = self.stub.GetUserList(user_pb2.PageInfo(pSize=7, cursor=cursor))
+                by_cursor.extend(user.id for user in page.data)
+                cursor = page.nextCursor
+                if not cursor:
+                    break
+            total = self.stub.GetUserList(user_pb2.PageInfo(pSize=1, totalMode=user_pb2.TOTAL_EXACT)).total
+            if by_pn != sorted(set(by_pn)) or by_pn != by_cursor or total < len(self.users):
+                print(f"❌ 分页结果不一致: pn {by_pn[:8]}..., cursor {by_cursor[:8]}..., total={total}")
+                return False
+            print(f"✅ 前 {len(by_pn)} 个用户有序，total={total}")
+            return True
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+
+    def test_stream_merge(self):
+        """StreamUsers 按 id 全局有序，包含刚创建的全部用户"""
+        print("\n=== 测试用例4: StreamUsers 跨分片归并 ===")
+        try:
+            ids = [user.id for user in self.stub.StreamUsers(user_pb2.StreamUsersRequest(chunkSize=5))]
+            missing = set(self.users.values()) - set(ids)
+            if ids != sorted(set(ids)) or missing:
+                print(f"❌ 导出无序或缺少用户: 缺少 {len(missing)} 个")
+                return False
+            print(f"✅ 导出 {len(ids)} 个用户，id 有序")
+            return True
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+
+    def run_all_tests(self):
+        """运行所有测试用例"""
+        print("🚀 开始运行分片测试用例")
+        print("=" * 50)
+
+        test_results = []
+
+        # 运行各个测试用例
+        test_results.append(self.test_create_routes_by_mobile())
+        if self.users:
+            test_results.append(self.test_lookup())
+        test_results.append(self.test_list_merge())
+        test_results.append(self.test_stream_merge())
+
+        # 统计结果
+        passed = sum(test_results)
+        total = len(test_results)
+
+        print("\n" + "=" * 50)
+        print(f"📊 测试结果统计:")
+        print(f"   通过: {passed}/{total}")
+        print(f"   失败: {total - passed}/{total}")
+
+        if passed == total:
+            print("🎉 所有测试用例通过!")
+        else:
+            print("⚠️  部分测试用例失败，请检查实现")
+
+        return passed == total
+
+
+if __name__ == "__main__":
+    # 创建测试实例并运行所有测试
+    test = TestSharding()
+    test.run_all_tests()
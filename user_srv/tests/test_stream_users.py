@@ -0,0 +1,135 @@
+import grpc
+from user_srv.proto import user_pb2_grpc, user_pb2
+import random
+import string
+
+
+class TestStreamUsers:
+    """测试 StreamUsers 函数的测试用例"""
+
+    def __init__(self):
+        # 连接到 gRPC 服务器
+        channel = grpc.insecure_channel('localhost:50051')
+        self.stub = user_pb2_grpc.UserStub(channel)
+
+    def setup_users(self, count=25):
+        """批量创建一些用户，保证导出跨越多个分块"""
+        users = (user_pb2.CreateUserInfo(nickName=f"导出用户{i}", passWord="test123456",
+                                         mobile="135" + "".join(random.choices(string.digits, k=8)))
+                 for i in range(count))
+        response = self.stub.CreateUsers(users)
+        print(f"创建测试用户: {response.created} 个")
+
+    def test_full_export(self):
+        """测试导出全部用户，id 严格递增且与列表总数一致"""
+        print("\n=== 测试用例1: 导出全部用户 ===")
+
+        try:
+            ids = [user.id for user in self.stub.StreamUsers(user_pb2.StreamUsersRequest(chunkSize=7))]
+            total = self.stub.GetUserList(user_pb2.PageInfo(pn=1, pSize=1, totalMode=user_pb2.TOTAL_EXACT)).total
+
+            if ids == sorted(set(ids)) and len(ids) == total:
+                print(f"✅ 导出成功: {len(ids)} 个用户")
+                return True
+            else:
+                print(f"❌ 测试失败: 导出 {len(ids)} 个，total={total}")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_resume(self):
+        """测试中途断开后从最后收到的 id 续传"""
+        print("\n=== 测试用例2: 断点续传 ===")
+
+        try:
+            expected = [user.id for user in self.stub.StreamUsers(user_pb2.StreamUsersRequest())]
+
+            received = []
+            stream = self.stub.StreamUsers(user_pb2.StreamUsersRequest(chunkSize=5))
+            for user in stream:
+                received.append(user.id)
+                if len(received) == 12:
+                    stream.cancel()
+                    break
+            for user in self.stub.StreamUsers(user_pb2.StreamUsersRequest(afterId=received[-1], chunkSize=5)):
+                received.append(user.id)
+
+            if received == expected:
+                print(f"✅ 续传成功: 共 {len(received)} 个用户，无重复无遗漏")
+                return True
+            else:
+                print(f"❌ 测试失败: 续传后 {len(received)} 个，期望 {len(expected)} 个")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def test_after_last(self):
+        """测试 afterId 超过最大 id 时返回空流"""
+        print("\n=== 测试用例3: afterId 超过最大 id ===")
+
+        try:
+            users = list(self.stub.StreamUsers(user_pb2.StreamUsersRequest(afterId=2 ** 31 - 1)))
+
+            if not users:
+                print("✅ 正确处理：空流")
+                return True
+            else:
+                print(f"❌ 测试失败: 返回了 {len(users)} 个用户")
+                return False
+
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+
+    def run_all_tests(self):
+        """运行所有测试用例"""
+        print("🚀 开始运行 StreamUsers 函数测试用例")
+        print("=" * 50)
+
+        test_results = []
+
+        try:
+            self.setup_users()
+        except grpc.RpcError as e:
+            print(f"❌ 创建测试用户失败: {e.code()}, {e.details()}")
+            return False
+
+        # 运行各个测试用例
+        test_results.append(self.test_full_export())
+        test_results.append(self.test_resume())
+        test_results.append(self.test_after_last())
+
+        # 统计结果
+        passed = sum(test_results)
+        total = len(test_results)
+
+        print("\n" + "=" * 50)
+        print(f"📊 测试结果统计:")
+        print(f"   通过: {passed}/{total}")
+        print(f"   失败: {total - passed}/{total}")
+
+        if passed == total:
+            print("🎉 所有测试用例通过!")
+        else:
+            print("⚠️  部分测试用例失败，请检查实现")
+
+        return passed == total
+
+
+if __name__ == "__main__":
+    # 创建测试实例并运行所有测试
+    test = TestStreamUsers()
+    test.run_all_tests()
@@ -1,5 +1,6 @@
 import grpc
 from user_srv.proto import user_pb2_grpc, user_pb2
+from google.protobuf import field_mask_pb2
 import time
 from datetime import date, datetime
 
@@ -261,6 +262,86 @@ class TestUpdateUser:
             print(f"❌ 生日转换测试失败: {e}")
             return False
     
+    def test_update_mask(self):
+        """测试 updateMask 只更新指定字段"""
+        print("\n=== 测试用例6: updateMask 只更新指定字段 ===")
+        
+        user_id = self.get_existing_user_id()
+        if not user_id:
+            print("❌ 无法获取测试用户ID，跳过此测试")
+            return False
+        
+        try:
+            get_request = user_pb2.IdRequest(id=user_id)
+            self.stub.UpdateUser(user_pb2.UpdateUserInfo(
+                id=user_id,
+                nickName="掩码测试",
+                gender="female",
+                birthday=int(time.mktime(datetime(1995, 6, 1).timetuple()))
+            ))
+            original_user = self.stub.GetUserById(get_request)
+            
+            # 只更新性别，nickName 和 birthday 即使填了也不应生效
+            self.stub.UpdateUser(user_pb2.UpdateUserInfo(
+                id=user_id,
+                nickName="不应生效",
+                gender="male",
+                updateMask=field_mask_pb2.FieldMask(paths=["gender"])
+            ))
+            updated_user = self.stub.GetUserById(get_request)
+            
+            if (updated_user.gender == "male" and updated_user.nickName == original_user.nickName
+                    and updated_user.birthday == original_user.birthday):
+                print("✅ 只更新了 gender")
+                return True
+            else:
+                print(f"❌ 测试失败: 昵称={updated_user.nickName}, 性别={updated_user.gender}, 生日={updated_user.birthday}")
+                return False
+            
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        except Exception as e:
+            print(f"❌ 其他错误: {e}")
+            return False
+    
+    def test_update_mask_unchanged_and_invalid(self):
+        """测试值未变化时不误报 NOT_FOUND，未知字段返回 INVALID_ARGUMENT"""
+        print("\n=== 测试用例7: 值未变化与未知字段 ===")
+        
+        user_id = self.get_existing_user_id()
+        if not user_id:
+            print("❌ 无法获取测试用户ID，跳过此测试")
+            return False
+        
+        try:
+            request = user_pb2.UpdateUserInfo(
+                id=user_id,
+                gender="male",
+                updateMask=field_mask_pb2.FieldMask(paths=["gender"])
+            )
+            self.stub.UpdateUser(request)
+            self.stub.UpdateUser(request)
+            print("✅ 重复提交相同的值成功")
+        except grpc.RpcError as e:
+            print(f"❌ gRPC 错误: {e.code()}, {e.details()}")
+            return False
+        
+        try:
+            self.stub.UpdateUser(user_pb2.UpdateUserInfo(
+                id=user_id,
+                updateMask=field_mask_pb2.FieldMask(paths=["mobile"])
+            ))
+            print("⚠️  未知字段被接受了")
+            return False
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+                print("✅ 正确处理：返回 INVALID_ARGUMENT 状态码")
+                return True
+            else:
+                print(f"❌ 意外的 gRPC 错误: {e.code()}, {e.details()}")
+                return False
+    
     def run_all_tests(self):
         """运行所有测试用例"""
         print("🚀 开始运行 UpdateUser 函数测试用例")
@@ -274,6 +355,8 @@ class TestUpdateUser:
         test_results.append(self.test_update_with_invalid_data())
         test_results.append(self.test_partial_update())
         test_results.append(self.test_birthday_conversion())
+        test_results.append(self.test_update_mask())
+        test_results.append(self.test_update_mask_unchanged_and_invalid())
         
         # 统计结果
         passed = sum(test_results)
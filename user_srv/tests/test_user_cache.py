@@ -0,0 +1,190 @@
+from user_srv.common.cache import CachedUser, LocalUserCache
+from datetime import date
+import time
+
+
+class TestUserCache:
+    """测试进程内用户缓存 LocalUserCache，不需要启动服务端"""
+
+    def user(self, user_id=1, mobile=None, nick_name="缓存测试"):
+        return CachedUser(user_id, mobile or f"135{user_id:08d}", 1, nick_name, "male", date(2000, 1, 1))
+
+    def entry_size(self):
+        """一条记录按 max_bytes 计算的大小"""
+        cache = LocalUserCache()
+        cache.put(self.user())
+        return cache.stats()["bytes"]
+
+    def test_byte_budget(self):
+        """超过 max_bytes 时淘汰最久没用过的记录"""
+        print("\n=== 测试用例1: 按内存上限淘汰 ===")
+        size = self.entry_size()
+        cache = LocalUserCache(max_bytes=size * 3)
+        for user_id in range(1, 6):
+            cache.put(self.user(user_id))
+        stats = cache.stats()
+        if stats["entries"] != 3 or stats["bytes"] > cache.max_bytes:
+            print(f"❌ 没有按上限淘汰: {stats}")
+            return False
+        if cache.get_by_id(1) is not None or cache.get_by_id(5) is None:
+            print("❌ 淘汰的不是最早写入的记录")
+            return False
+        print(f"✅ 保留 {stats['entries']} 条，{stats['bytes']}/{stats['max_bytes']} 字节")
+        return True
+
+    def test_disabled(self):
+        """max_bytes 为 0 时不缓存"""
+        print("\n=== 测试用例2: max_bytes=0 关闭缓存 ===")
+        cache = LocalUserCache(max_bytes=0)
+        user = cache.put(self.user())
+        if not isinstance(user, CachedUser) or cache.get_by_id(1) is not None or cache.stats()["entries"]:
+            print("❌ 关闭后还在缓存")
+            return False
+        print("✅ put 只返回 CachedUser，不缓存")
+        return True
+
+    def test_ttl(self):
+        """过期的记录读不到，并计入淘汰数"""
+        print("\n=== 测试用例3: TTL 过期 ===")
+        cache = LocalUserCache(ttl=0.1)
+        cache.put(self.user())
+        if cache.get_by_mobile("13500000001") is None:
+            print("❌ 过期前没有命中")
+            return False
+        evictions = cache.stats()["evictions"]
+        time.sleep(0.2)
+        if cache.get_by_id(1) is not None or cache.get_by_mobile("13500000001") is not None:
+            print("❌ 过期后还能读到")
+            return False
+        if cache.stats()["entries"] != 0 or cache.stats()["evictions"] != evictions + 1:
+            print(f"❌ 过期的记录没有清掉: {cache.stats()}")
+            return False
+        print("✅ 过期后按 id 和 mobile 都未命中")
+        return True
+
+    def test_lru(self):
+        """读过的记录移到队尾，淘汰时先淘汰最久没读的"""
+        print("\n=== 测试用例4: LRU 顺序 ===")
+        cache = LocalUserCache(max_bytes=self.entry_size() * 2)
+        cache.put(self.user(1))
+        cache.put(self.user(2))
+        cache.get_by_id(1)
+        cache.put(self.user(3))
+        if cache.get_by_id(1) is None or cache.get_by_id(2) is not None:
+            print("❌ 淘汰了刚读过的记录")
+            return False
+        print("✅ 淘汰的是最久没读的记录")
+        return True
+
+    def test_stale_fill(self):
+        """查库期间这个用户的 id 或 mobile 被失效过，回填被丢弃"""
+        print("\n=== 测试用例5: 丢弃失效前读到的回填 ===")
+        cache = LocalUserCache()
+        version = cache.version
+        cache.invalidate(user_id=1)
+        cache.put(self.user(1, nick_name="旧数据"), version)
+        if cache.get_by_id(1) is not None:
+            print("❌ 按 id 失效后回填了旧数据")
+            return False
+        version = cache.version
+        cache.invalidate(mobile="13500000002")
+        cache.put(self.user(2, nick_name="旧数据"), version)
+        if cache.get_by_mobile("13500000002") is not None:
+            print("❌ 按 mobile 失效后回填了旧数据")
+            return False
+        cache.put(self.user(1), cache.version)
+        if cache.get_by_id(1) is None:
+            print("❌ 失效之后再查库的回填也被丢弃了")
+            return False
+        print("✅ 失效前的回填被丢弃，之后的回填正常")
+        return True
+
+    def test_other_user_fill(self):
+        """别的用户被失效不影响这次回填"""
+        print("\n=== 测试用例6: 其他用户的失效不影响回填 ===")
+        cache = LocalUserCache()
+        version = cache.version
+        cache.invalidate(user_id=2, mobile="13500000002")
+        cache.put(self.user(1), version)
+        if cache.get_by_id(1) is None:
+            print("❌ 别的用户被失效后回填被丢弃")
+            return False
+        print("✅ 回填成功")
+        return True
+
+    def test_invalidation_floor(self):
+        """超过 MAX_INVALIDATIONS 后忘掉的失效记录按下限处理，更早的回填一律丢弃"""
+        print("\n=== 测试用例7: 失效记录的下限 ===")
+        cache = LocalUserCache()
+        cache.MAX_INVALIDATIONS = 3
+        version = cache.version
+        for user_id in range(10, 15):
+            cache.invalidate(user_id=user_id)
+        cache.put(self.user(1), version)
+        if cache.get_by_id(1) is not None:
+            print("❌ 失效记录被忘掉后，更早的回填没有丢弃")
+            return False
+        cache.put(self.user(1), cache.version)
+        if cache.get_by_id(1) is None:
+            print("❌ 下限之后的回填被丢弃了")
+            return False
+        print(f"✅ 只记住 {len(cache._invalidated)} 条失效记录，更早的回填被丢弃")
+        return True
+
+    def test_stats(self):
+        """stats 里的条数和字节数与缓存内容一致"""
+        print("\n=== 测试用例8: stats ===")
+        size = self.entry_size()
+        cache = LocalUserCache(max_bytes=size * 10)
+        cache.put(self.user(1))
+        cache.put(self.user(2))
+        hits, misses = cache.stats()["hits"], cache.stats()["misses"]
+        cache.get_by_id(1)
+        cache.get_by_id(3)
+        cache.invalidate(user_id=2)
+        stats = cache.stats()
+        expected = {"entries": 1, "bytes": size, "max_bytes": size * 10, "hits": hits + 1, "misses": misses + 1}
+        if any(stats[key] != value for key, value in expected.items()):
+            print(f"❌ stats 不对: {stats}, 应为 {expected}")
+            return False
+        print(f"✅ {stats}")
+        return True
+
+    def run_all_tests(self):
+        """运行所有测试用例"""
+        print("🚀 开始运行进程内用户缓存测试用例")
+        print("=" * 50)
+
+        test_results = []
+
+        # 运行各个测试用例
+        test_results.append(self.test_byte_budget())
+        test_results.append(self.test_disabled())
+        test_results.append(self.test_ttl())
+        test_results.append(self.test_lru())
+        test_results.append(self.test_stale_fill())
+        test_results.append(self.test_other_user_fill())
+        test_results.append(self.test_invalidation_floor())
+        test_results.append(self.test_stats())
+
+        # 统计结果
+        passed = sum(test_results)
+        total = len(test_results)
+
+        print("\n" + "=" * 50)
+        print(f"📊 测试结果统计:")
+        print(f"   通过: {passed}/{total}")
+        print(f"   失败: {total - passed}/{total}")
+
+        if passed == total:
+            print("🎉 所有测试用例通过!")
+        else:
+            print("⚠️  部分测试用例失败，请检查实现")
+
+        return passed == total
+
+
+if __name__ == "__main__":
+    # 创建测试实例并运行所有测试
+    test = TestUserCache()
+    test.run_all_tests()